@@ -1,11 +1,25 @@
+import os
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
 import plotly.graph_objects as go
 
+import approximate
+import dashboard_cache
+import figures
+import forecasting
+import memory_profile
+import out_of_core
+import sketches
+import views
+
+# Set to a CSV/Parquet path to stream DV2 queries instead of loading the whole history
+OUT_OF_CORE_SOURCE = os.environ.get("DV2_OUT_OF_CORE")
+
 # ----------------- Page Setup -----------------
 st.set_page_config(page_title="🚗 Car Retailer Dashboard", layout="wide")
+memory_profile.begin_rerun()
 st.title("🚗 Car Retailer Sales Dashboard")
 
 # ----------------- Dark Monochrome Theme -----------------
@@ -38,78 +52,95 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ----------------- Load Data -----------------
-@st.cache_data
-def load_data():
-    url = "https://raw.githubusercontent.com/Dilip1100/Financial_Vizro1100/94d364e98061cd58f8b52224f33037aa7ca3ed5f/DV2.csv"
-    df = pd.read_csv(url, encoding='latin1')
-    df.columns = df.columns.str.strip().str.replace("ï»¿", "", regex=False).str.replace("﻿", "", regex=False)
-    if 'Date' not in df.columns:
-        st.error(f"Expected 'Date' column not found. Columns present: {df.columns.tolist()}")
-        return pd.DataFrame()
-    df['Date'] = pd.to_datetime(df['Date'], dayfirst=True, errors='coerce')
-    df['Year'] = df['Date'].dt.year
-    df['Quarter'] = df['Date'].dt.to_period('Q').astype(str)
-    df['Month'] = df['Date'].dt.to_period('M').astype(str)
-    return df
-
-df = load_data()
-
-if df.empty:
-    st.stop()
+# Loaders and backends live in dashboard_cache so every page shares one copy
+if OUT_OF_CORE_SOURCE:
+    df = None
+    options = dashboard_cache.dv2_filter_options(OUT_OF_CORE_SOURCE)
+else:
+    df = dashboard_cache.load_dv2()
+    if df.empty:
+        st.stop()
+    options = out_of_core.options_for_frame(df)
+    date_rejects = dashboard_cache.dv2_date_rejects()
+    if not date_rejects.empty:
+        with st.expander(f"⚠️ {len(date_rejects):,} sales rows have no readable Date and are left out of the period charts"):
+            st.dataframe(date_rejects, use_container_width=True)
 
 # ----------------- Filters -----------------
 with st.container():
     col1, col2, col3, col4 = st.columns([3, 3, 2, 2])
     with col1:
-        salespeople = st.multiselect("Salesperson", sorted(df['Salesperson'].dropna().unique()))
+        salespeople = st.multiselect("Salesperson", options['Salesperson'])
     with col2:
-        car_makes = st.multiselect("Car Make", sorted(df['Car Make'].dropna().unique()))
+        car_makes = st.multiselect("Car Make", options['Car Make'])
     with col3:
-        car_years = st.multiselect("Car Year", sorted(df['Car Year'].dropna().unique()))
+        car_years = st.multiselect("Car Year", options['Car Year'])
     with col4:
         selected_metric = st.radio("Metric", ["Sale Price", "Commission Earned"], index=0, horizontal=True)
 
 # Optional Car Model Slicer
 selected_model = None
 if car_makes and len(car_makes) == 1:
-    model_options = df[df['Car Make'] == car_makes[0]]['Car Model'].dropna().unique()
-    selected_model = st.selectbox(f"Model for {car_makes[0]}", sorted(model_options))
+    model_options = options['models'].get(car_makes[0], [])
+    selected_model = st.selectbox(f"Model for {car_makes[0]}", model_options)
 
 # Apply Filters
-filtered_df = df.copy()
-if salespeople:
-    filtered_df = filtered_df[filtered_df['Salesperson'].isin(salespeople)]
-if car_makes:
-    filtered_df = filtered_df[filtered_df['Car Make'].isin(car_makes)]
-if selected_model:
-    filtered_df = filtered_df[filtered_df['Car Model'] == selected_model]
-if car_years:
-    filtered_df = filtered_df[filtered_df['Car Year'].astype(str).isin(car_years)]
+# An empty multiselect means "all", i.e. no filter on that column
+filters = {
+    'Salesperson': salespeople or None,
+    'Car Make': car_makes or None,
+    'Car Model': [selected_model] if selected_model else None,
+    'Car Year': car_years or None,
+}
+if OUT_OF_CORE_SOURCE:
+    filtered_df = None
+    results = dashboard_cache.scan_dv2(OUT_OF_CORE_SOURCE, filters)
+    margins = None
+else:
+    # One combined mask over the shared frame: a row index per rerun, no copies
+    filtered_df = views.FilteredView(df, filters)
+    # Approximate mode answers from a stratified sample until the exact query lands
+    results, margins = dashboard_cache.dv2_results(filters)
+kpi = out_of_core.kpis(results)
+# Monthly/quarterly rollup shared by every time-based chart below
+periods = out_of_core.period_table(results)
 
 # ----------------- Summary Metrics -----------------
 st.markdown("### 📌 Summary Metrics")
-k1, k2, k3, k4 = st.columns(4)
+k1, k2, k3, k4, k5, k6 = st.columns(6)
 with k1:
-    st.metric("💰 Total Sales", f"${filtered_df['Sale Price'].sum():,.0f}")
+    st.metric("💰 Total Sales", f"${kpi['total_sales']:,.0f}{approximate.format_margin(kpi, margins, 'total_sales')}")
 with k2:
-    st.metric("🏆 Total Commission", f"${filtered_df['Commission Earned'].sum():,.0f}")
+    st.metric("🏆 Total Commission", f"${kpi['total_commission']:,.0f}{approximate.format_margin(kpi, margins, 'total_commission')}")
 with k3:
-    avg_price = filtered_df['Sale Price'].mean() if not filtered_df.empty else 0
-    st.metric("📊 Avg Sale Price", f"${avg_price:,.0f}")
+    st.metric("📊 Avg Sale Price", f"${kpi['avg_price']:,.0f}{approximate.format_margin(kpi, margins, 'avg_price')}")
 with k4:
-    st.metric("📦 Transactions", f"{filtered_df.shape[0]:,}")
+    st.metric("📦 Transactions", f"{kpi['transactions']:,}{approximate.format_margin(kpi, margins, 'transactions')}")
+# Distinct and top buyers are merged from per-member/month customer sketches
+unique_buyers, buyers_estimated, top_buyer = dashboard_cache.dv2_customer_kpis(filters, OUT_OF_CORE_SOURCE, filtered_df)
+with k5:
+    st.metric("🧑‍🤝‍🧑 Unique Buyers", "n/a" if unique_buyers is None else f"{'≈' if buyers_estimated else ''}{unique_buyers:,.0f}")
+with k6:
+    if top_buyer is not None and not top_buyer.empty:
+        st.metric("🔥 Top Buyer", top_buyer.iat[0, 0], sketches.format_count(top_buyer, "purchases"), delta_color="off")
+    else:
+        st.metric("🔥 Top Buyer", "n/a")
+if margins:
+    st.caption("⚡ Approximate figures (stratified sample, 95% margins); exact figures replace them when you pause.")
 
 # ----------------- Download Button -----------------
 st.markdown("### 📅 Download Filtered Data")
-csv = filtered_df.to_csv(index=False).encode("utf-8")
-st.download_button("Download CSV", csv, "filtered_car_sales.csv", "text/csv")
+if filtered_df is not None:
+    views.download_button(filtered_df, "Download CSV", "filtered_car_sales.csv", "car-sales-csv", filters)
+else:
+    st.caption("Row export is not available in out-of-core mode.")
 
 # ----------------- Charts -----------------
+# plotly.express is imported here rather than at the top (see startup_bench.py)
+import plotly.express as px
+
 st.subheader(f"📊 Top 10 Salespeople by {selected_metric}")
-top_salespeople = (
-    filtered_df.groupby('Salesperson')[selected_metric]
-    .sum().nlargest(10).reset_index().sort_values(by=selected_metric)
-)
+top_salespeople = out_of_core.top_n(results, 'salesperson', selected_metric).sort_values(by=selected_metric)
 
 bar_fig = go.Figure(data=[
     go.Bar(
@@ -120,39 +151,65 @@ bar_fig = go.Figure(data=[
     )
 ])
 bar_fig.update_layout(template='plotly_dark', xaxis_title="Salesperson", yaxis_title=selected_metric, height=500)
-st.plotly_chart(bar_fig, use_container_width=True)
+st.plotly_chart(figures.optimize(bar_fig), use_container_width=True)
+
+with st.expander("🔮 Next-Month Forecast for Top Salespeople", expanded=False):
+    member_forecast = forecasting.get_member_forecasts(
+        "dv2_salesperson",
+        forecasting.fast_forecast.member_panel(results['salesperson_month'].reset_index(), 'Salesperson', selected_metric),
+        periods=1,
+        freq='MS'
+    )
+    member_forecast = member_forecast[member_forecast['member'].isin(top_salespeople['Salesperson'])]
+    st.dataframe(member_forecast.rename(columns={'member': 'Salesperson', 'ds': 'Month', 'yhat': 'Forecast',
+                                                 'yhat_lower': 'Low', 'yhat_upper': 'High'}), use_container_width=True)
 
 st.subheader("🧹 Top 10 Car Makes and Models by Sale Price")
 col_left, col_right = st.columns(2)
 
 with col_left:
-    car_make_metric = filtered_df.groupby('Car Make')['Sale Price'].sum().nlargest(10).reset_index()
+    car_make_metric = out_of_core.top_n(results, 'make', 'Sale Price')
     pie_fig_make = px.pie(car_make_metric, names='Car Make', values='Sale Price', hole=0.2, color_discrete_sequence=px.colors.sequential.Greys)
     pie_fig_make.update_layout(template='plotly_dark', height=700, title="Top Car Makes by Sale Price")
-    st.plotly_chart(pie_fig_make, use_container_width=True)
+    st.plotly_chart(figures.optimize(pie_fig_make), use_container_width=True)
 
 with col_right:
-    car_model_metric = filtered_df.groupby('Car Model')['Sale Price'].sum().nlargest(10).reset_index()
+    car_model_metric = out_of_core.top_n(results, 'model', 'Sale Price')
     pie_fig_model = px.pie(car_model_metric, names='Car Model', values='Sale Price', hole=0.2, color_discrete_sequence=px.colors.sequential.Greys[::-1])
     pie_fig_model.update_layout(template='plotly_dark', height=700, title="Top Car Models by Sale Price")
-    st.plotly_chart(pie_fig_model, use_container_width=True)
+    st.plotly_chart(figures.optimize(pie_fig_model), use_container_width=True)
 
 st.subheader("📈 Sales and Commission Trend by Quarter")
-trend_df = filtered_df.groupby('Quarter')[['Sale Price', 'Commission Earned']].sum().reset_index()
+trend_df = out_of_core.period_trend(periods, 'Quarter')
 trend_df['Sale Price QoQ %'] = trend_df['Sale Price'].pct_change().fillna(0) * 100
 trend_df['Commission QoQ %'] = trend_df['Commission Earned'].pct_change().fillna(0) * 100
 trend_fig = px.line(trend_df, x='Quarter', y=['Sale Price', 'Commission Earned'], markers=True, template='plotly_dark', color_discrete_sequence=['#AAAAAA', '#555555'])
-st.plotly_chart(trend_fig, use_container_width=True)
+st.plotly_chart(figures.optimize(trend_fig), use_container_width=True)
 
 with st.expander("🔍 View Quarter-over-Quarter % Change Table", expanded=True):
     st.dataframe(trend_df[['Quarter', 'Sale Price QoQ %', 'Commission QoQ %']].style.format({'Sale Price QoQ %': '{:.2f}%', 'Commission QoQ %': '{:.2f}%'}), use_container_width=True)
 
 with st.expander("🎞️ View Monthly Animated Trend", expanded=True):
-    monthly_trend = filtered_df.groupby('Month')[['Sale Price', 'Commission Earned']].sum().reset_index()
+    monthly_trend = out_of_core.period_trend(periods, 'Month')
     melted = monthly_trend.melt(id_vars='Month', var_name='Metric', value_name='Amount')
     animated_fig = px.bar(melted, x='Metric', y='Amount', animation_frame='Month', template='plotly_dark', color='Metric', color_discrete_sequence=['#AAAAAA', '#555555'])
     animated_fig.update_layout(yaxis_tickprefix="$", height=500)
-    st.plotly_chart(animated_fig, use_container_width=True)
+    st.plotly_chart(figures.optimize(animated_fig), use_container_width=True)
+
+with st.expander("🔮 View Monthly Sales Forecast", expanded=False):
+    sales_forecast = forecasting.get_forecast(
+        "dv2_sale_price", forecasting.monthly_history(monthly_trend, 'Sale Price'), periods=6, freq='MS', fallback='fast'
+    )
+    if sales_forecast is not None:
+        forecast_fig = px.line(sales_forecast, x='ds', y=['yhat', 'yhat_lower', 'yhat_upper'], template='plotly_dark',
+                               labels={'ds': 'Month', 'value': 'Sale Price'}, color_discrete_sequence=['#AAAAAA', '#555555', '#555555'])
+        st.plotly_chart(figures.optimize(forecast_fig), use_container_width=True)
+        if sales_forecast['status'].iat[0] == 'pending':
+            st.caption("Showing a quick trend forecast while the Prophet model fits in the background.")
+        elif sales_forecast['status'].iat[0] == 'failed':
+            st.caption("Showing a quick trend forecast: the Prophet fit failed and will be retried later.")
+    else:
+        st.caption("Not enough months in this selection to forecast.")
 
 # ----------------- Additional Tabs: HR, Inventory, CRM -----------------
 st.markdown("---")
@@ -173,14 +230,14 @@ with tab1:
     })
     st.dataframe(hr_data, use_container_width=True)
     st.markdown("#### 📈 Performance Distribution")
-    st.plotly_chart(px.histogram(hr_data, x="Performance Score", nbins=5, template="plotly_dark"), use_container_width=True)
+    st.plotly_chart(figures.optimize(px.histogram(hr_data, x="Performance Score", nbins=5, template="plotly_dark")), use_container_width=True)
 
 with tab2:
     st.subheader("📦 Inventory Status")
     inventory_data = pd.DataFrame({
         "Part ID": [f"P{i:03d}" for i in range(1, 11)],
         "Part Name": [f"Part {i}" for i in range(1, 11)],
-        "Car Make": np.random.choice(df['Car Make'].dropna().unique(), size=10),
+        "Car Make": np.random.choice(options['Car Make'], size=10),
         "Stock Level": np.random.randint(0, 100, size=10),
         "Reorder Level": np.random.randint(10, 50, size=10),
         "Unit Cost": [round(x, 2) for x in np.random.uniform(50, 500, 10)]
@@ -197,9 +254,15 @@ with tab3:
         "Customer Name": [f"Customer {chr(65+i)}" for i in range(10)],
         "Contact Date": pd.date_range(end=pd.to_datetime("today"), periods=10),
         "Interaction Type": np.random.choice(["Inquiry", "Complaint", "Follow-up", "Feedback"], size=10),
-        "Salesperson": np.random.choice(df['Salesperson'].dropna().unique(), size=10),
+        "Salesperson": np.random.choice(options['Salesperson'], size=10),
         "Satisfaction Score": [round(x, 1) for x in np.random.uniform(1.0, 5.0, 10)]
     })
     st.dataframe(crm_data, use_container_width=True)
     st.markdown("#### 😊 Satisfaction Score by Interaction Type")
-    st.plotly_chart(px.box(crm_data, x="Interaction Type", y="Satisfaction Score", template="plotly_dark"), use_container_width=True)
+    st.plotly_chart(figures.optimize(px.box(crm_data, x="Interaction Type", y="Satisfaction Score", template="plotly_dark")), use_container_width=True)
+
+# Per-session memory panel (MEMORY_PROFILE=1, see memory_profile.py)
+memory_profile.render(globals())
+
+# Approximate mode: swap in the exact figures once the background query lands
+dashboard_cache.dv2_refine(filters, margins)
@@ -1,94 +1,30 @@
 # Final Merged Script: Enhanced Automotive Dashboard with Faker Data and Monochrome Theme
 
+import os
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
 import plotly.graph_objects as go
-from faker import Faker
 import random
-from datetime import datetime, timedelta
 
-# Initialize Faker
-fake = Faker()
+import approximate
+import dashboard_cache
+import figures
+import forecasting
+import memory_profile
+import out_of_core
+import paging
+import sketches
+import views
+
+# Set to a CSV/Parquet path to stream DV2 queries instead of loading the whole history
+OUT_OF_CORE_SOURCE = os.environ.get("DV2_OUT_OF_CORE")
 
 # ----------------- Page Setup -----------------
 st.set_page_config(page_title="Automotive Dashboard", layout="wide")
-st.markdown("""
-    <style>
-        body, .stApp {
-            background-color: #1C1C1C;
-            color: #D3D3D3;
-            font-family: 'Segoe UI', sans-serif;
-        }
-        .stSelectbox, .stMultiselect, .stRadio, .stMetric, .stDownloadButton {
-            background-color: #2A2A2A;
-            color: #D3D3D3;
-            border: 1px solid #4A4A4A;
-            border-radius: 0.3rem;
-            padding: 0.5rem;
-        }
-        .stMetricLabel {
-            color: #A9A9A9 !important;
-            font-size: 0.9rem;
-        }
-        .stMetricValue {
-            font-size: 1.5rem;
-            font-weight: bold;
-            color: #FFFFFF;
-        }
-        .stButton>button {
-            background-color: #4A4A4A;
-            color: #D3D3D3;
-            border: 1px solid #606060;
-            border-radius: 0.3rem;
-            padding: 0.5rem 1rem;
-            transition: background-color 0.3s;
-        }
-        .stButton>button:hover {
-            background-color: #606060;
-            color: #FFFFFF;
-        }
-        .css-1d391kg {
-            background-color: #2A2A2A;
-            border: 1px solid #4A4A4A;
-            border-radius: 0.5rem;
-            padding: 1rem;
-        }
-        .stDataFrame, .element-container {
-            color: #D3D3D3;
-            background-color: #2A2A2A;
-            border: 1px solid #4A4A4A;
-            border-radius: 0.5rem;
-            padding: 1rem;
-        }
-        .stTabs [data-baseweb="tab"] {
-            background-color: #2A2A2A;
-            color: #D3D3D3;
-            border: 1px solid #4A4A4A;
-            border-radius: 0.3rem;
-            margin: 0.2rem;
-        }
-        .stTabs [data-baseweb="tab"]:hover {
-            background-color: #3A3A3A;
-            color: #FFFFFF;
-        }
-        .stTabs [data-baseweb="tab"][aria-selected="true"] {
-            background-color: #4A4A4A;
-            color: #FFFFFF;
-        }
-        footer {visibility: hidden;}
-        .section-header {
-            color: #D3D3D3;
-            border-bottom: 2px solid #606060;
-            padding-bottom: 0.5rem;
-            margin-bottom: 1rem;
-        }
-        hr {
-            border-color: #4A4A4A;
-        }
-    </style>
-""", unsafe_allow_html=True)
+memory_profile.begin_rerun()
+st.markdown(figures.MONOCHROME_CSS, unsafe_allow_html=True)
 
 # ----------------- Header -----------------
 st.image("https://github.com/Dilip1100/Financial_Vizro1100/blob/ae39b71e4e436394fb71e0441690e6d7e59c37a7/LOGO.webp", width=180)
@@ -96,133 +32,180 @@ st.title("🚗 Automotive Analytics Dashboard")
 st.markdown("Advanced insights for automotive sales and operations", unsafe_allow_html=True)
 
 # ----------------- Load Retail CSV Data -----------------
-@st.cache_data
-def load_retail_csv():
-    url = "https://raw.githubusercontent.com/Dilip1100/Financial_Vizro1100/94d364e98061cd58f8b52224f33037aa7ca3ed5f/DV2.csv"
-    df = pd.read_csv(url, encoding='latin1')
-    df.columns = df.columns.str.strip().str.replace("ï»¿", "", regex=False).str.replace("﻿", "", regex=False)
-    if 'Date' not in df.columns:
-        st.error(f"Expected 'Date' column not found. Columns present: {df.columns.tolist()}")
-        return pd.DataFrame()
-    df['Date'] = pd.to_datetime(df['Date'], dayfirst=True, errors='coerce')
-    df['Year'] = df['Date'].dt.year
-    df['Quarter'] = df['Date'].dt.to_period('Q').astype(str)
-    df['Month'] = df['Date'].dt.to_period('M').astype(str)
-    return df
-
-df = load_retail_csv()
-
-if df.empty:
-    st.stop()
+# Loaders and backends live in dashboard_cache so every page shares one copy
+if OUT_OF_CORE_SOURCE:
+    df = None
+    options = dashboard_cache.dv2_filter_options(OUT_OF_CORE_SOURCE)
+else:
+    df = dashboard_cache.load_dv2()
+    if df.empty:
+        st.stop()
+    options = out_of_core.options_for_frame(df)
+    date_rejects = dashboard_cache.dv2_date_rejects()
+    if not date_rejects.empty:
+        with st.expander(f"⚠️ {len(date_rejects):,} sales rows have no readable Date and are left out of the period charts"):
+            st.dataframe(date_rejects, use_container_width=True)
 
 # ----------------- Filters -----------------
 st.markdown('<div class="section-header">🔍 Filter Options</div>', unsafe_allow_html=True)
 col1, col2, col3, col4 = st.columns([3, 3, 2, 2])
 with col1:
-    salespeople = st.multiselect("Salesperson", sorted(df['Salesperson'].dropna().unique()), key="salespeople")
+    salespeople = st.multiselect("Salesperson", options['Salesperson'], key="salespeople")
 with col2:
-    car_makes = st.multiselect("Car Make", sorted(df['Car Make'].dropna().unique()), key="car_makes")
+    car_makes = st.multiselect("Car Make", options['Car Make'], key="car_makes")
 with col3:
-    car_years = st.multiselect("Car Year", sorted(df['Car Year'].dropna().unique()), key="car_years")
+    car_years = st.multiselect("Car Year", options['Car Year'], key="car_years")
 with col4:
     selected_metric = st.radio("Metric", ["Sale Price", "Commission Earned"], index=0, horizontal=True)
 
 # Optional Car Model Slicer
 selected_model = None
 if car_makes and len(car_makes) == 1:
-    model_options = df[df['Car Make'] == car_makes[0]]['Car Model'].dropna().unique()
-    selected_model = st.selectbox(f"Model for {car_makes[0]}", sorted(model_options))
+    model_options = options['models'].get(car_makes[0], [])
+    selected_model = st.selectbox(f"Model for {car_makes[0]}", model_options)
 
 # Apply Filters
-filtered_df = df.copy()
-if salespeople:
-    filtered_df = filtered_df[filtered_df['Salesperson'].isin(salespeople)]
-if car_makes:
-    filtered_df = filtered_df[filtered_df['Car Make'].isin(car_makes)]
-if selected_model:
-    filtered_df = filtered_df[filtered_df['Car Model'] == selected_model]
-if car_years:
-    filtered_df = filtered_df[filtered_df['Car Year'].astype(str).isin(car_years)]
+# An empty multiselect means "all", i.e. no filter on that column
+filters = {
+    'Salesperson': salespeople or None,
+    'Car Make': car_makes or None,
+    'Car Model': [selected_model] if selected_model else None,
+    'Car Year': car_years or None,
+}
+if OUT_OF_CORE_SOURCE:
+    filtered_df = None
+    results = dashboard_cache.scan_dv2(OUT_OF_CORE_SOURCE, filters)
+    margins = None
+    # Row-level charts (3D scatter) get a bounded uniform sample
+    row_sample = dashboard_cache.sample_dv2(OUT_OF_CORE_SOURCE, filters)
+else:
+    # One combined mask over the shared frame: a row index per rerun, no copies
+    filtered_df = views.FilteredView(df, filters)
+    # Approximate mode answers from a stratified sample until the exact query lands
+    results, margins = dashboard_cache.dv2_results(filters)
+    row_sample = filtered_df
+kpi = out_of_core.kpis(results)
+# Monthly/quarterly rollup shared by every time-based chart below
+periods = out_of_core.period_table(results)
 
 # ----------------- Summary Metrics -----------------
 st.markdown('<div class="section-header">📌 Key Performance Indicators</div>', unsafe_allow_html=True)
-k1, k2, k3, k4 = st.columns(4)
+k1, k2, k3, k4, k5, k6 = st.columns(6)
 with k1:
-    st.metric("💰 Total Sales", f"${filtered_df['Sale Price'].sum():,.0f}")
+    st.metric("💰 Total Sales", f"${kpi['total_sales']:,.0f}{approximate.format_margin(kpi, margins, 'total_sales')}")
 with k2:
-    st.metric("🏆 Total Commission", f"${filtered_df['Commission Earned'].sum():,.0f}")
+    st.metric("🏆 Total Commission", f"${kpi['total_commission']:,.0f}{approximate.format_margin(kpi, margins, 'total_commission')}")
 with k3:
-    avg_price = filtered_df['Sale Price'].mean() if not filtered_df.empty else 0
-    st.metric("📊 Avg Sale Price", f"${avg_price:,.0f}")
+    st.metric("📊 Avg Sale Price", f"${kpi['avg_price']:,.0f}{approximate.format_margin(kpi, margins, 'avg_price')}")
 with k4:
-    st.metric("📦 Transactions", f"{filtered_df.shape[0]:,}")
+    st.metric("📦 Transactions", f"{kpi['transactions']:,}{approximate.format_margin(kpi, margins, 'transactions')}")
+# Distinct and top buyers are merged from per-member/month customer sketches
+unique_buyers, buyers_estimated, top_buyer = dashboard_cache.dv2_customer_kpis(filters, OUT_OF_CORE_SOURCE, filtered_df)
+with k5:
+    st.metric("🧑‍🤝‍🧑 Unique Buyers", "n/a" if unique_buyers is None else f"{'≈' if buyers_estimated else ''}{unique_buyers:,.0f}")
+with k6:
+    if top_buyer is not None and not top_buyer.empty:
+        st.metric("🔥 Top Buyer", top_buyer.iat[0, 0], sketches.format_count(top_buyer, "purchases"), delta_color="off")
+    else:
+        st.metric("🔥 Top Buyer", "n/a")
+if margins:
+    st.caption("⚡ Approximate figures (stratified sample, 95% margins); exact figures replace them when you pause.")
 
 # ----------------- KPI Trend Line -----------------
 st.markdown('<div class="section-header">📈 KPI Trend Analysis</div>', unsafe_allow_html=True)
-kpi_trend = filtered_df.groupby('Month')[['Sale Price', 'Commission Earned']].sum().reset_index()
+kpi_trend = out_of_core.period_trend(periods, 'Month')
 kpi_fig = go.Figure()
 kpi_fig.add_trace(go.Scatter(x=kpi_trend['Month'], y=kpi_trend['Sale Price'], name='Sale Price', line=dict(color='#A9A9A9')))
 kpi_fig.add_trace(go.Scatter(x=kpi_trend['Month'], y=kpi_trend['Commission Earned'], name='Commission', line=dict(color='#808080')))
 kpi_fig.update_layout(
-    template='plotly_dark',
+    template=figures.MONOCHROME,
     height=400,
     xaxis_title="Month",
     yaxis_title="Amount ($)",
-    hovermode="x unified",
-    plot_bgcolor='#2A2A2A',
-    paper_bgcolor='#2A2A2A',
-    font=dict(color='#D3D3D3')
+    hovermode="x unified"
 )
-st.plotly_chart(kpi_fig, use_container_width=True)
+st.plotly_chart(figures.optimize(kpi_fig), use_container_width=True)
+
+# ----------------- Sales & Commission Forecast -----------------
+st.markdown('<div class="section-header">🔮 Sales & Commission Forecast</div>', unsafe_allow_html=True)
+forecast_fig = go.Figure()
+forecast_statuses = set()
+for metric, color in [('Sale Price', '#A9A9A9'), ('Commission Earned', '#808080')]:
+    forecast = forecasting.get_forecast(
+        f"dv2_{metric.lower().replace(' ', '_')}",
+        forecasting.monthly_history(kpi_trend, metric),
+        periods=6,
+        freq='MS',
+        fallback='fast'
+    )
+    if forecast is None:
+        continue
+    forecast_statuses.add(forecast['status'].iat[0])
+    forecast_fig.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat'], name=f'{metric} forecast', line=dict(color=color, dash='dash')))
+    forecast_fig.add_trace(go.Scatter(
+        x=pd.concat([forecast['ds'], forecast['ds'][::-1]]),
+        y=pd.concat([forecast['yhat_upper'], forecast['yhat_lower'][::-1]]),
+        fill='toself', fillcolor='rgba(169,169,169,0.15)', line=dict(width=0), hoverinfo='skip', showlegend=False
+    ))
+if forecast_fig.data:
+    forecast_fig.update_layout(
+        template=figures.MONOCHROME,
+        height=400,
+        xaxis_title="Month",
+        yaxis_title="Amount ($)",
+        hovermode="x unified"
+    )
+    st.plotly_chart(figures.optimize(forecast_fig), use_container_width=True)
+if 'failed' in forecast_statuses:
+    st.caption("🔮 Showing a quick trend forecast: a Prophet fit failed and will be retried later.")
+elif 'pending' in forecast_statuses:
+    st.caption("🔮 Showing a quick trend forecast while the Prophet models fit in the background.")
 
 # ----------------- Download Button -----------------
 st.markdown('<div class="section-header">📅 Download Filtered Data</div>', unsafe_allow_html=True)
-csv = filtered_df.to_csv(index=False).encode("utf-8")
-st.download_button("Download CSV", csv, "filtered_car_sales.csv", "text/csv")
+if filtered_df is not None:
+    views.download_button(filtered_df, "Download CSV", "filtered_car_sales.csv", "car-sales-csv", filters)
+else:
+    st.caption("Row export is not available in out-of-core mode.")
 
 # ----------------- Animated 3D Investment vs Sales -----------------
+# plotly.express is imported here rather than at the top (see startup_bench.py)
+import plotly.express as px
+
 st.markdown('<div class="section-header">🎥 3D Sales Visualization</div>', unsafe_allow_html=True)
-filtered_df['MonthStr'] = pd.to_datetime(filtered_df['Date']).dt.strftime("%Y-%m")
+# Month is already a DV2 period column; frames follow the rollup's month order
 animated_fig = px.scatter_3d(
-    filtered_df,
+    row_sample[["Commission Earned", "Sale Price", "Car Year", "Month", "Salesperson"]],
     x="Commission Earned",
     y="Sale Price",
     z="Car Year",
-    animation_frame="MonthStr",
+    animation_frame="Month",
+    category_orders={"Month": periods["Month"].astype(str).tolist()},
     color="Salesperson",
     size="Sale Price",
-    template="plotly_dark",
+    template=figures.MONOCHROME,
     opacity=0.7,
     color_continuous_scale='Greys'
 )
-animated_fig.update_layout(height=650, plot_bgcolor='#2A2A2A', paper_bgcolor='#2A2A2A', font=dict(color='#D3D3D3'))
-st.plotly_chart(animated_fig, use_container_width=True)
+animated_fig.update_layout(height=650)
+st.plotly_chart(figures.optimize(animated_fig), use_container_width=True)
 
 # ----------------- Sales Heatmap -----------------
 st.markdown('<div class="section-header">🌡️ Sales Performance Heatmap</div>', unsafe_allow_html=True)
-heatmap_data = filtered_df.pivot_table(
-    values=selected_metric,
-    index='Salesperson',
-    columns='Car Make',
-    aggfunc='sum',
-    fill_value=0
-)
+heatmap_data = out_of_core.pivot(results, 'salesperson_make', selected_metric)
 heatmap_fig = px.imshow(
     heatmap_data,
     color_continuous_scale='Greys',
-    template='plotly_dark',
+    template=figures.MONOCHROME,
     text_auto='.2s',
     aspect='auto'
 )
-heatmap_fig.update_layout(height=500, plot_bgcolor='#2A2A2A', paper_bgcolor='#2A2A2A', font=dict(color='#D3D3D3'))
-st.plotly_chart(heatmap_fig, use_container_width=True)
+heatmap_fig.update_layout(height=500)
+st.plotly_chart(figures.optimize(heatmap_fig), use_container_width=True)
 
 # ----------------- Existing Charts -----------------
 st.markdown('<div class="section-header">📊 Top Performers</div>', unsafe_allow_html=True)
-top_salespeople = (
-    filtered_df.groupby('Salesperson')[selected_metric]
-    .sum().nlargest(10).reset_index().sort_values(by=selected_metric)
-)
+top_salespeople = out_of_core.top_n(results, 'salesperson', selected_metric).sort_values(by=selected_metric)
 bar_fig = go.Figure(data=[
     go.Bar(
         x=top_salespeople['Salesperson'],
@@ -232,65 +215,64 @@ bar_fig = go.Figure(data=[
     )
 ])
 bar_fig.update_layout(
-    template='plotly_dark',
+    template=figures.MONOCHROME,
     xaxis_title="Salesperson",
     yaxis_title=selected_metric,
-    height=500,
-    plot_bgcolor='#2A2A2A',
-    paper_bgcolor='#2A2A2A',
-    font=dict(color='#D3D3D3')
+    height=500
 )
-st.plotly_chart(bar_fig, use_container_width=True)
+st.plotly_chart(figures.optimize(bar_fig), use_container_width=True)
+
+with st.expander("🔮 Next-Month Forecast for Top Performers", expanded=False):
+    member_forecast = forecasting.get_member_forecasts(
+        "dv2_salesperson",
+        forecasting.fast_forecast.member_panel(results['salesperson_month'].reset_index(), 'Salesperson', selected_metric),
+        periods=1,
+        freq='MS'
+    )
+    member_forecast = member_forecast[member_forecast['member'].isin(top_salespeople['Salesperson'])]
+    st.dataframe(
+        member_forecast.rename(columns={'member': 'Salesperson', 'ds': 'Month', 'yhat': 'Forecast',
+                                        'yhat_lower': 'Low', 'yhat_upper': 'High'})
+        .style.format({'Forecast': '${:,.0f}', 'Low': '${:,.0f}', 'High': '${:,.0f}'}),
+        use_container_width=True
+    )
 
 # ----------------- Car Make/Model Analysis -----------------
 st.markdown('<div class="section-header">🧹 Vehicle Sales Analysis</div>', unsafe_allow_html=True)
 col_left, col_right = st.columns(2)
 with col_left:
-    car_make_metric = filtered_df.groupby('Car Make')['Sale Price'].sum().nlargest(10).reset_index()
+    car_make_metric = out_of_core.top_n(results, 'make', 'Sale Price')
     pie_fig_make = px.pie(car_make_metric, names='Car Make', values='Sale Price', hole=0.2, color_discrete_sequence=px.colors.sequential.Greys)
     pie_fig_make.update_layout(
-        template='plotly_dark',
+        template=figures.MONOCHROME,
         height=700,
-        title="Top Car Makes by Sale Price",
-        plot_bgcolor='#2A2A2A',
-        paper_bgcolor='#2A2A2A',
-        font=dict(color='#D3D3D3')
+        title="Top Car Makes by Sale Price"
     )
-    st.plotly_chart(pie_fig_make, use_container_width=True)
+    st.plotly_chart(figures.optimize(pie_fig_make), use_container_width=True)
 
 with col_right:
-    car_model_metric = filtered_df.groupby('Car Model')['Sale Price'].sum().nlargest(10).reset_index()
+    car_model_metric = out_of_core.top_n(results, 'model', 'Sale Price')
     pie_fig_model = px.pie(car_model_metric, names='Car Model', values='Sale Price', hole=0.2, color_discrete_sequence=px.colors.sequential.Greys[::-1])
     pie_fig_model.update_layout(
-        template='plotly_dark',
+        template=figures.MONOCHROME,
         height=700,
-        title="Top Car Models by Sale Price",
-        plot_bgcolor='#2A2A2A',
-        paper_bgcolor='#2A2A2A',
-        font=dict(color='#D3D3D3')
+        title="Top Car Models by Sale Price"
     )
-    st.plotly_chart(pie_fig_model, use_container_width=True)
+    st.plotly_chart(figures.optimize(pie_fig_model), use_container_width=True)
 
 # ----------------- Car Model Comparison Table -----------------
 st.markdown('<div class="section-header">🚘 Car Model Comparison</div>', unsafe_allow_html=True)
-model_comparison = filtered_df.groupby(['Car Make', 'Car Model']).agg({
-    'Sale Price': ['mean', 'sum', 'count'],
-    'Commission Earned': 'mean'
-}).round(2)
-model_comparison.columns = ['Avg Sale Price', 'Total Sales', 'Transaction Count', 'Avg Commission']
-model_comparison = model_comparison.reset_index()
-st.dataframe(
-    model_comparison.style.format({
-        'Avg Sale Price': '${:,.2f}',
-        'Total Sales': '${:,.2f}',
-        'Avg Commission': '${:,.2f}'
-    }),
-    use_container_width=True
-)
+model_comparison = out_of_core.model_comparison(results)
+# Formatted a page at a time instead of styling every cell up front
+paging.render(model_comparison, key="model-comparison", formats={
+    'Avg Sale Price': '${:,.2f}',
+    'Total Sales': '${:,.2f}',
+    'Avg Commission': '${:,.2f}'
+})
 
 # ----------------- Trends -----------------
 st.markdown('<div class="section-header">📈 Sales and Commission Trend</div>', unsafe_allow_html=True)
-trend_df = filtered_df.groupby('Quarter')[['Sale Price', 'Commission Earned']].sum().reset_index()
+trend_df = out_of_core.period_trend(periods, 'Quarter')
 trend_df['Sale Price QoQ %'] = trend_df['Sale Price'].pct_change().fillna(0) * 100
 trend_df['Commission QoQ %'] = trend_df['Commission Earned'].pct_change().fillna(0) * 100
 trend_fig = px.line(
@@ -298,41 +280,37 @@ trend_fig = px.line(
     x='Quarter',
     y=['Sale Price', 'Commission Earned'],
     markers=True,
-    template='plotly_dark',
+    template=figures.MONOCHROME,
     color_discrete_sequence=['#A9A9A9', '#808080']
 )
-trend_fig.update_layout(
-    plot_bgcolor='#2A2A2A',
-    paper_bgcolor='#2A2A2A',
-    font=dict(color='#D3D3D3')
-)
-st.plotly_chart(trend_fig, use_container_width=True)
+st.plotly_chart(figures.optimize(trend_fig), use_container_width=True)
 
 with st.expander("🔍 View Quarter-over-Quarter % Change Table", expanded=True):
     st.dataframe(trend_df[['Quarter', 'Sale Price QoQ %', 'Commission QoQ %']].style.format({'Sale Price QoQ %': '{:.2f}%', 'Commission QoQ %': '{:.2f}%'}), use_container_width=True)
 
 with st.expander("🎞️ View Monthly Animated Trend", expanded=True):
-    monthly_trend = filtered_df.groupby('Month')[['Sale Price', 'Commission Earned']].sum().reset_index()
+    monthly_trend = out_of_core.period_trend(periods, 'Month')
     melted = monthly_trend.melt(id_vars='Month', var_name='Metric', value_name='Amount')
     animated_fig = px.bar(
         melted,
         x='Metric',
         y='Amount',
         animation_frame='Month',
-        template='plotly_dark',
+        template=figures.MONOCHROME,
         color='Metric',
         color_discrete_sequence=['#A9A9A9', '#808080']
     )
     animated_fig.update_layout(
         yaxis_tickprefix="$",
-        height=500,
-        plot_bgcolor='#2A2A2A',
-        paper_bgcolor='#2A2A2A',
-        font=dict(color='#D3D3D3')
+        height=500
     )
-    st.plotly_chart(animated_fig, use_container_width=True)
+    st.plotly_chart(figures.optimize(animated_fig), use_container_width=True)
 
 # ----------------- Business Operations Tabs -----------------
+# Faker only feeds the demo tabs, so it is not imported before the charts above render
+from faker import Faker
+
+fake = Faker()
 st.markdown('<div class="section-header">🧪 Business Operations Insights</div>', unsafe_allow_html=True)
 tab1, tab2, tab3, tab4 = st.tabs(["👥 HR Overview", "📦 Inventory Status", "📞 CRM Interactions", "👤 Customer Demographics"])
 
@@ -355,7 +333,7 @@ with tab1:
     # Performance Histogram
     st.markdown("#### 📈 Performance Distribution")
     st.plotly_chart(
-        px.histogram(hr_data, x="Performance Score", nbins=5, template="plotly_dark"),
+        figures.optimize(px.histogram(hr_data, x="Performance Score", nbins=5, template="plotly_dark")),
         use_container_width=True
     )
 
@@ -378,7 +356,7 @@ with tab1:
         template="plotly_dark", text_auto=True,
         labels={"Total Hours": "Total Logged Hours"}
     )
-    st.plotly_chart(bar_fig, use_container_width=True)
+    st.plotly_chart(figures.optimize(bar_fig), use_container_width=True)
 
 
 with tab2:
@@ -386,7 +364,7 @@ with tab2:
     inventory_data = pd.DataFrame({
         "Part ID": [f"P{i:04d}" for i in range(1, 21)],
         "Part Name": [fake.word().capitalize() + " " + random.choice(["Filter", "Brake", "Tire", "Battery", "Sensor", "Pump"]) for _ in range(20)],
-        "Car Make": [random.choice(df['Car Make'].dropna().unique()) for _ in range(20)],
+        "Car Make": [random.choice(options['Car Make']) for _ in range(20)],
         "Stock Level": [random.randint(0, 150) for _ in range(20)],
         "Reorder Level": [random.randint(10, 60) for _ in range(20)],
         "Unit Cost": [round(random.uniform(20, 600), 2) for _ in range(20)]
@@ -403,7 +381,7 @@ with tab3:
         "Customer Name": [fake.name() for _ in range(20)],
         "Contact Date": [fake.date_between(start_date="-1y", end_date="today") for _ in range(20)],
         "Interaction Type": [random.choice(["Inquiry", "Complaint", "Follow-up", "Feedback", "Service Request"]) for _ in range(20)],
-        "Salesperson": [random.choice(df['Salesperson'].dropna().unique()) for _ in range(20)],
+        "Salesperson": [random.choice(options['Salesperson']) for _ in range(20)],
         "Satisfaction Score": [round(random.uniform(1.0, 5.0), 1) for _ in range(20)]
     })
     st.dataframe(crm_data, use_container_width=True)
@@ -416,28 +394,19 @@ with tab3:
         x="Contact Date",
         y="Satisfaction Score",
         markers=True,
-        template="plotly_dark",
+        template=figures.MONOCHROME,
         color_discrete_sequence=['#A9A9A9']
     )
-    line_fig.update_layout(
-        plot_bgcolor='#2A2A2A',
-        paper_bgcolor='#2A2A2A',
-        font=dict(color='#D3D3D3')
-    )
-    st.plotly_chart(line_fig, use_container_width=True)
+    st.plotly_chart(figures.optimize(line_fig), use_container_width=True)
     st.markdown("#### 😊 Satisfaction Score by Interaction Type")
     st.plotly_chart(
-        px.box(
+        figures.optimize(px.box(
             crm_data,
             x="Interaction Type",
             y="Satisfaction Score",
-            template="plotly_dark",
+            template=figures.MONOCHROME,
             color_discrete_sequence=['#A9A9A9']
-        ).update_layout(
-            plot_bgcolor='#2A2A2A',
-            paper_bgcolor='#2A2A2A',
-            font=dict(color='#D3D3D3')
-        ),
+        )),
         use_container_width=True
     )
 
@@ -448,7 +417,7 @@ with tab4:
         "Age Group": [random.choice(["18-25", "26-35", "36-45", "46-55", "55+"]) for _ in range(20)],
         "Region": [fake.state() for _ in range(20)],
         "Purchase Amount": [round(random.uniform(15000, 100000), 2) for _ in range(20)],
-        "Preferred Make": [random.choice(df['Car Make'].dropna().unique()) for _ in range(20)]
+        "Preferred Make": [random.choice(options['Car Make']) for _ in range(20)]
     })
     st.dataframe(demo_data, use_container_width=True)
     st.markdown("#### 🎂 Age Group Distribution")
@@ -456,29 +425,19 @@ with tab4:
         demo_data,
         x="Age Group",
         color="Region",
-        template="plotly_dark",
+        template=figures.MONOCHROME,
         color_discrete_sequence=px.colors.sequential.Greys
     )
-    age_dist.update_layout(
-        plot_bgcolor='#2A2A2A',
-        paper_bgcolor='#2A2A2A',
-        font=dict(color='#D3D3D3')
-    )
-    st.plotly_chart(age_dist, use_container_width=True)
+    st.plotly_chart(figures.optimize(age_dist), use_container_width=True)
     st.markdown("#### 💰 Purchase Amount by Region")
     region_purchase = px.box(
         demo_data,
         x="Region",
         y="Purchase Amount",
-        template="plotly_dark",
+        template=figures.MONOCHROME,
         color_discrete_sequence=['#A9A9A9']
     )
-    region_purchase.update_layout(
-        plot_bgcolor='#2A2A2A',
-        paper_bgcolor='#2A2A2A',
-        font=dict(color='#D3D3D3')
-    )
-    st.plotly_chart(region_purchase, use_container_width=True)
+    st.plotly_chart(figures.optimize(region_purchase), use_container_width=True)
 
 # ----------------- Footer -----------------
 st.markdown("""
@@ -487,3 +446,9 @@ st.markdown("""
         <small style='color: #A9A9A9;'>© 2025 One Trust | Crafted for smarter auto-financial decisions</small>
     </center>
 """, unsafe_allow_html=True)
+
+# Per-session memory panel (MEMORY_PROFILE=1, see memory_profile.py)
+memory_profile.render(globals())
+
+# Approximate mode: swap in the exact figures once the background query lands
+dashboard_cache.dv2_refine(filters, margins)
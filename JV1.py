@@ -1,14 +1,48 @@
-import pandas as pd
 import plotly.express as px
 import dash
 from dash import dcc, html, dash_table
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
 
-# Load the data
-df = pd.read_csv("DBT.csv", encoding="latin1")
+import crossfilter
+import data_sources
+import data_version
+import dimensions
+import figures
+import row_index
+import schemas
+import snapshot
+import warmer
 
-# Sort data by Year and Quarter
-df = df.sort_values(by=["YEAR_ID", "QTR_ID"], ascending=[False, False])
+
+def load_data():
+    df = schemas.DBT.read_csv("DBT.csv")
+    # Sort data by Year and Quarter
+    return df.sort_values(by=["YEAR_ID", "QTR_ID"], ascending=[False, False])
+
+
+def prepared_data():
+    # Memory-mapped from the warm-start snapshot after the first run
+    return dimensions.encode(
+        snapshot.cached("jv1-dbt", load_data, sources=["DBT.csv"], code=[schemas]), data_sources.DBT_DIMENSIONS
+    )
+
+
+# Chart -> the dimension it groups by; clicking a member filters the other charts
+CROSS_CHARTS = {"bar": "CUSTOMERNAME", "pie": "COUNTRY", "trend": "QTR_ID"}
+
+
+def reload_data():
+    global df, rows, cross
+    frame = prepared_data()
+    # Posting lists / sorted orders behind the customer drill-down table
+    index = row_index.for_dbt(frame)
+    # Per-customer/country/quarter partial aggregates behind the linked charts
+    linked = crossfilter.CrossFilter(frame, CROSS_CHARTS, ["TOTALREVENUE", "TOTALLOSS"], dimensions=["YEAR_ID"])
+    # swapped in together once built, so callbacks never mix old and new data
+    df, rows, cross = frame, index, linked
+
+
+reload_data()
 
 # Initialize the Dash app
 app = dash.Dash(__name__, suppress_callback_exceptions=True)
@@ -39,7 +73,7 @@ app.layout = html.Div(
             min=df["QTR_ID"].min(),
             max=df["QTR_ID"].max(),
             value=df["QTR_ID"].min(),
-            marks={str(qtr): str(qtr) for qtr in sorted(df["QTR_ID"].unique())},
+            marks={str(qtr): str(qtr) for qtr in sorted(df["QTR_ID"].dropna().unique())},
             step=None
         ),
 
@@ -54,6 +88,17 @@ app.layout = html.Div(
             style={"color": theme["text_color"], "margin": "20px"}
         ),
 
+        # Cross-filter selection: click customers (bar), countries (pie) or quarters (trend),
+        # or box-select on the bar and trend charts
+        dcc.Store(id='cross_filter', data={}),
+        html.Div(
+            style={"display": "flex", "gap": "20px", "alignItems": "center", "margin": "0 20px"},
+            children=[
+                html.Button("Clear selection", id='clear_selection', n_clicks=0),
+                html.Span(id='selection_summary', style={"color": theme["text_color"]})
+            ]
+        ),
+
         html.Div(
             style={"display": "flex", "gap": "20px"},
             children=[
@@ -74,45 +119,178 @@ app.layout = html.Div(
         # Year Checkbox Selector
         dcc.Checklist(
             id='year_selector',
-            options=[{'label': str(year), 'value': year} for year in sorted(df["YEAR_ID"].unique(), reverse=True)],
-            value=df["YEAR_ID"].unique().tolist(),
+            options=[{'label': str(year), 'value': year} for year in sorted(df["YEAR_ID"].dropna().unique(), reverse=True)],
+            value=df["YEAR_ID"].dropna().unique().tolist(),
             inline=True,
             style={"color": theme["text_color"], "margin": "20px"}
         ),
 
         # Line Chart for Revenue and Loss Trend
-        dcc.Graph(id='line_chart')
+        dcc.Graph(id='line_chart'),
+
+        # Customer rows behind the charts; paged, sorted and filtered on the server
+        html.H3("Customer Details", style={"color": theme["text_color"], "margin": "20px"}),
+        dash_table.DataTable(
+            id='customer_table',
+            columns=row_index.datatable_columns(df),
+            page_current=0,
+            page_size=15,
+            page_action='custom',
+            sort_action='custom',
+            sort_mode='single',
+            sort_by=[],
+            filter_action='custom',
+            filter_query='',
+            style_header={
+                "backgroundColor": theme["table_header_background"],
+                "color": theme["table_header_text"],
+                "fontWeight": "bold"
+            },
+            style_cell={
+                "backgroundColor": theme["table_cell_background"],
+                "color": theme["text_color"],
+                "border": f"1px solid {theme['table_cell_border']}"
+            },
+            style_filter={"backgroundColor": theme["dropdown_background"], "color": theme["text_color"]}
+        )
     ]
 )
 
 # Callbacks
+@app.callback(
+    Output('cross_filter', 'data'),
+    [Input('bar_chart', 'clickData'),
+     Input('bar_chart', 'selectedData'),
+     Input('pie_chart', 'clickData'),
+     Input('line_chart', 'clickData'),
+     Input('line_chart', 'selectedData'),
+     Input('clear_selection', 'n_clicks'),
+     Input('qtr_selector', 'value')],
+    [State('cross_filter', 'data')]
+)
+def update_selection(bar_click, bar_selected, pie_click, line_click, line_selected, clear_clicks, selected_qtr,
+                     selection):
+    selection = selection or {}
+    trigger = dash.callback_context.triggered[0]["prop_id"] if dash.callback_context.triggered else ""
+    if trigger.startswith("clear_selection"):
+        return {}
+    if trigger.startswith("qtr_selector"):
+        # the slider picks the quarter again
+        return crossfilter.replace(selection, "QTR_ID", None)
+    # a click toggles one member; a box selection replaces the dimension's members
+    events = {
+        "bar_chart.clickData": (crossfilter.toggle, "CUSTOMERNAME", bar_click, "y"),
+        "bar_chart.selectedData": (crossfilter.replace, "CUSTOMERNAME", bar_selected, "y"),
+        "pie_chart.clickData": (crossfilter.toggle, "COUNTRY", pie_click, "label"),
+        "line_chart.clickData": (crossfilter.toggle, "QTR_ID", line_click, "x"),
+        "line_chart.selectedData": (crossfilter.replace, "QTR_ID", line_selected, "x"),
+    }
+    if trigger not in events:
+        return selection
+    update, dimension, event, field = events[trigger]
+    return update(selection, dimension, crossfilter.points(event, field))
+
+
+def cross_selections(selected_qtr, selected_years, selection):
+    """The slicers plus the cross-filter selection, as {dimension: members or None}."""
+    selection = selection or {}
+    return {
+        "YEAR_ID": selected_years,
+        "QTR_ID": selection.get("QTR_ID") or [selected_qtr],
+        "CUSTOMERNAME": selection.get("CUSTOMERNAME"),
+        "COUNTRY": selection.get("COUNTRY"),
+    }
+
+
 @app.callback(
     [Output('bar_chart', 'figure'),
      Output('pie_chart', 'figure'),
-     Output('line_chart', 'figure')],
+     Output('line_chart', 'figure'),
+     Output('selection_summary', 'children')],
     [Input('qtr_selector', 'value'),
      Input('metric_toggle', 'value'),
-     Input('year_selector', 'value')]
+     Input('year_selector', 'value'),
+     Input('cross_filter', 'data')]
 )
-def update_charts(selected_qtr, selected_metric, selected_years):
-    filtered_df = df[(df["QTR_ID"] == selected_qtr) & (df["YEAR_ID"].isin(selected_years))]
+def update_charts(selected_qtr, selected_metric, selected_years, selection):
+    # Served from the shared chart cache, which the background warmer pre-fills
+    state = (selected_qtr, selected_metric, sorted(selected_years, reverse=True))
+    summary = "; ".join(f"{dimension}: {', '.join(map(str, members))}" for dimension, members in (selection or {}).items())
+    return (*chart_cache.get(state + ((selection,) if selection else ())), summary)
+
+
+def build_charts(selected_qtr, selected_metric, selected_years, selection=None):
+    selections = cross_selections(selected_qtr, selected_years, selection)
+    # Each chart is filtered by the selections on the other charts, updated from the previous
+    # selection state by adding or removing the changed members' partial aggregates
     
     # Bar Chart
-    top_customers = filtered_df.groupby("CUSTOMERNAME")[selected_metric].sum().nlargest(10).reset_index()
+    top_customers = cross.table("bar", selections).nlargest(10, selected_metric)
     bar_fig = px.bar(top_customers, y="CUSTOMERNAME", x=selected_metric, title=f'Top 10 Customers by {selected_metric}',
                       orientation='h', color=selected_metric, color_continuous_scale='blues')
     
     # Pie Chart
-    top_countries = filtered_df.groupby("COUNTRY")[selected_metric].sum().nlargest(10).reset_index()
+    top_countries = cross.table("pie", selections).nlargest(10, selected_metric)
     pie_fig = px.pie(top_countries, values=selected_metric, names="COUNTRY", title=f'Top 10 Countries by {selected_metric}',
                       color_discrete_sequence=px.colors.sequential.Blues)
     
     # Line Chart
-    trend_df = df[df["YEAR_ID"].isin(selected_years)].groupby(["QTR_ID"])[["TOTALREVENUE", "TOTALLOSS"]].sum().reset_index()
+    trend_df = cross.table("trend", selections)
     line_fig = px.line(trend_df, x="QTR_ID", y=["TOTALREVENUE", "TOTALLOSS"], title="Revenue & Loss Trend by Quarter",
-                        labels={"value": "Amount", "variable": "Metric"}, color_discrete_sequence=['#1f77b4', '#ff7f0e'])
+                        labels={"value": "Amount", "variable": "Metric"}, color_discrete_sequence=['#1f77b4', '#ff7f0e'],
+                        markers=True)
+
+    # Box selection on the bar and trend charts; selected members are highlighted
+    bar_fig.update_layout(dragmode="select")
+    line_fig.update_layout(dragmode="select")
+    if selections["CUSTOMERNAME"]:
+        chosen = set(selections["CUSTOMERNAME"])
+        bar_fig.update_traces(selectedpoints=[i for i, c in enumerate(top_customers["CUSTOMERNAME"]) if c in chosen])
+    if selections["COUNTRY"]:
+        chosen = set(selections["COUNTRY"])
+        pie_fig.update_traces(pull=[0.1 if c in chosen else 0 for c in top_countries["COUNTRY"]])
+    if selection and selection.get("QTR_ID"):
+        chosen = set(selection["QTR_ID"])
+        line_fig.update_traces(selectedpoints=[i for i, q in enumerate(trend_df["QTR_ID"]) if q in chosen])
     
-    return bar_fig, pie_fig, line_fig
+    return figures.optimize(bar_fig), figures.optimize(pie_fig), figures.optimize(line_fig)
+
+@app.callback(
+    [Output('customer_table', 'data'),
+     Output('customer_table', 'page_count'),
+     Output('customer_table', 'page_current')],
+    [Input('customer_table', 'page_current'),
+     Input('customer_table', 'page_size'),
+     Input('customer_table', 'sort_by'),
+     Input('customer_table', 'filter_query'),
+     Input('qtr_selector', 'value'),
+     Input('metric_toggle', 'value'),
+     Input('year_selector', 'value'),
+     Input('cross_filter', 'data')]
+)
+def update_table(page_current, page_size, sort_by, filter_query, selected_qtr, selected_metric, selected_years,
+                 selection):
+    # Same data version as the charts (reloads df and the row index if DBT.csv changed)
+    chart_cache.check_version()
+    # A new quarter/year/metric or chart selection starts again from the first page
+    page = page_current if row_index.triggered_by('customer_table') else 0
+    # Only the visible page is sent; unsorted tables show the largest selected metric first
+    return rows.page(
+        cross_selections(selected_qtr, selected_years, selection), filter_query, sort_by, page, page_size,
+        default_sort=(selected_metric, False)
+    )
+
+# Precompute every quarter x metric for the latest year, each year and all years while idle,
+# and again after DBT.csv changes
+chart_cache = warmer.Warmer(
+    "jv1-charts",
+    lambda state: build_charts(*state),
+    states=lambda: warmer.filter_space(
+        df["YEAR_ID"].dropna().unique(), sorted(df["QTR_ID"].dropna().unique()), ["TOTALREVENUE", "TOTALLOSS"]
+    ),
+    version=lambda: data_version.check("DBT.csv"),
+    on_refresh=reload_data,
+).start()
 
 if __name__ == '__main__':
     app.run_server(debug=True)
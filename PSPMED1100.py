@@ -3,101 +3,26 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from faker import Faker
 import random
-from datetime import datetime, timedelta
-import os
-import sys
 
-# ----------------- Try Importing Faker -----------------
-try:
-    from faker import Faker
-except ImportError:
-    os.system(f"{sys.executable} -m pip install faker")
-    from faker import Faker
+import dimensions
+import figures
+import memory_profile
+import paging
+import query_backend
+import snapshot
+import views
 
-# Initialize Faker
-fake = Faker()
+
+def get_faker():
+    # Deferred: with a warm snapshot only the HR tab needs Faker
+    from faker import Faker
+    return Faker()
 
 # ----------------- Page Setup -----------------
 st.set_page_config(page_title="Medical College & Hospital Dashboard", layout="wide")
-st.markdown("""
-    <style>
-        body, .stApp {
-            background-color: #1C1C1C;
-            color: #D3D3D3;
-            font-family: 'Segoe UI', sans-serif;
-        }
-        .stSelectbox, .stMultiselect, .stRadio, .stMetric, .stDownloadButton, .stTextInput {
-            background-color: #2A2A2A;
-            color: #D3D3D3;
-            border: 1px solid #4A4A4A;
-            border-radius: 0.3rem;
-            padding: 0.5rem;
-        }
-        .stMetricLabel {
-            color: #A9A9A9 !important;
-            font-size: 0.9rem;
-        }
-        .stMetricValue {
-            font-size: 1.5rem;
-            font-weight: bold;
-            color: #FFFFFF;
-        }
-        .stButton>button {
-            background-color: #4A4A4A;
-            color: #D3D3D3;
-            border: 1px solid #606060;
-            border-radius: 0.3rem;
-            padding: 0.5rem 1rem;
-            transition: background-color 0.3s;
-        }
-        .stButton>button:hover {
-            background-color: #606060;
-            color: #FFFFFF;
-        }
-        .css-1d391kg {
-            background-color: #2A2A2A;
-            border: 1px solid #4A4A4A;
-            border-radius: 0.5rem;
-            padding: 1rem;
-        }
-        .stDataFrame, .element-container {
-            color: #D3D3D3;
-            background-color: #2A2A2A;
-            border: 1px solid #4A4A4A;
-            border-radius: 0.5rem;
-            padding: 1rem;
-        }
-        .stTabs [data-baseweb="tab"] {
-            background-color: #2A2A2A;
-            color: #D3D3D3;
-            border: 1px solid #4A4A4A;
-            border-radius: 0.3rem;
-            margin: 0.2rem;
-        }
-        .stTabs [data-baseweb="tab"]:hover {
-            background-color: #3A3A3A;
-            color: #FFFFFF;
-        }
-        .stTabs [data-baseweb="tab"][aria-selected="true"] {
-            background-color: #4A4A4A;
-            color: #FFFFFF;
-        }
-        footer {visibility: hidden;}
-        .section-header {
-            color: #D3D3D3;
-            border-bottom: 2px solid #606060;
-            padding-bottom: 0.5rem;
-            margin-bottom: 1rem;
-        }
-        hr {
-            border-color: #4A4A4A;
-        }
-    </style>
-""", unsafe_allow_html=True)
+memory_profile.begin_rerun()
+st.markdown(figures.MONOCHROME_CSS, unsafe_allow_html=True)
 
 # ----------------- Header -----------------
 st.title("🏥 Medical College & Hospital Dashboard")
@@ -123,6 +48,7 @@ all_medical_departments = clinical_departments + non_clinical_departments
 
 # ----------------- Data Generation -----------------
 def generate_doctor_data(n=200):
+    fake = get_faker()
     specialties = ["MD", "MS", "DM", "MCh", "PhD", "MBBS"]
     return pd.DataFrame([{
         "Doctor ID": f"D{1000+i}",
@@ -134,6 +60,7 @@ def generate_doctor_data(n=200):
     } for i in range(n)])
 
 def generate_patient_data(n=1000, doctor_df=None):
+    fake = get_faker()
     patients = []
     for i in range(n):
         dept = random.choice(all_medical_departments)
@@ -169,10 +96,46 @@ def generate_admin_data():
         "Patient Satisfaction Score": round(random.uniform(3.0, 5.0), 1)
     } for dept in admin_departments for month in range(1, 13)])
 
+def generate_all():
+    doctor_df = generate_doctor_data()
+    patient_df = generate_patient_data(doctor_df=doctor_df)
+    patient_df['Month'] = pd.to_datetime(patient_df['Admission Date']).dt.strftime("%Y-%m")
+    admin_df = generate_admin_data()
+    # Repeated labels become integer codes over one shared pool (doctor names are held
+    # once for both tables); encoded before snapshotting, so warm starts map the codes
+    dimensions.encode(doctor_df, ["Doctor Name", "Department", "Specialty"])
+    dimensions.encode(patient_df, ["Department", "Doctor", "Sex", "Blood Group", "Religion", "Marital Status", "Type", "Month"])
+    dimensions.encode(admin_df, ["Department", "Month"])
+    return {"doctors": doctor_df, "patients": patient_df, "admin": admin_df}
+
 # ----------------- Load Data -----------------
-doctor_df = generate_doctor_data()
-patient_df = generate_patient_data(doctor_df=doctor_df)
-admin_df = generate_admin_data()
+DEMO_CODE = [generate_doctor_data, generate_patient_data, generate_admin_data, dimensions]
+
+@st.cache_resource
+def load_demo(version):
+    # Generated once and snapshotted; later processes memory-map it instead of rerunning Faker
+    demo = snapshot.cached("pspmed", generate_all, code=DEMO_CODE)
+    # A snapshot's lookup tables are re-pointed at the shared pool; the codes are kept
+    for frame in demo.values():
+        dimensions.encode(frame, frame.select_dtypes("category").columns)
+    # Shared, not copied per rerun: the page filters these frames but never modifies them
+    return {name: memory_profile.shared(frame) for name, frame in demo.items()}
+
+@st.cache_resource
+def patient_backend(version, name):
+    # Built once per process and shared by all sessions (see DASHBOARD_QUERY_BACKEND)
+    return query_backend.get_backend(
+        name,
+        load_demo(version)["patients"],
+        metrics=['Treatment Cost (₹)'],
+        groupings={'department': ['Department'], 'month': ['Month'], 'department_month': ['Department', 'Month']},
+        index_columns=['Department', 'Sex', 'Blood Group', 'Doctor']
+    )
+
+# Keyed on the generator code, like the snapshot: editing it rebuilds both
+demo_version = snapshot.code_version([generate_all, *DEMO_CODE])
+demo = load_demo(demo_version)
+doctor_df, patient_df, admin_df = demo["doctors"], demo["patients"], demo["admin"]
 
 # ----------------- Filters -----------------
 st.markdown('<div class="section-header">🔍 Filter Options</div>', unsafe_allow_html=True)
@@ -188,18 +151,16 @@ with f4:
 with f5:
     search_term = st.text_input("Search (Name, Symptoms, Contact, etc.)", key="search")
 
-filtered = patient_df.copy()
-if department_filter:
-    filtered = filtered[filtered["Department"].isin(department_filter)]
-if sex_filter:
-    filtered = filtered[filtered["Sex"].isin(sex_filter)]
-if blood_filter:
-    filtered = filtered[filtered["Blood Group"].isin(blood_filter)]
-if doctor_filter:
-    filtered = filtered[filtered["Doctor"].isin(doctor_filter)]
-if search_term:
-    term = search_term.lower()
-    filtered = filtered[filtered.apply(lambda r: term in str(r.values).lower(), axis=1)]
+patient_filters = {'Department': department_filter or None, 'Sex': sex_filter or None,
+                   'Blood Group': blood_filter or None, 'Doctor': doctor_filter or None}
+patient_search = (search_term, list(patient_df.columns))
+# One combined mask over patient_df: a row index per rerun, no copies
+filtered = views.FilteredView(patient_df, patient_filters, search=patient_search)
+
+# Aggregates for the heatmap, trend and department table come from the query backend
+patient_results = patient_backend(demo_version, query_backend.DEFAULT_BACKEND).aggregate(
+    patient_filters, search=patient_search
+)
 
 # ----------------- KPIs -----------------
 st.markdown('<div class="section-header">📊 Key Metrics</div>', unsafe_allow_html=True)
@@ -212,56 +173,48 @@ k5.metric("Avg Treatment Cost (₹)", f"{filtered['Treatment Cost (₹)'].mean()
 
 # ----------------- Download Button -----------------
 st.markdown('<div class="section-header">📅 Download Filtered Data</div>', unsafe_allow_html=True)
-csv = filtered.to_csv(index=False).encode("utf-8")
-st.download_button("Download Patient Data", csv, "filtered_patients.csv", "text/csv")
+views.download_button(
+    filtered, "Download Patient Data", "filtered_patients.csv", "patients-csv", (patient_filters, search_term)
+)
 
 # ----------------- Patient Heatmap -----------------
+# plotly.express is imported here rather than at the top (see startup_bench.py)
+import plotly.express as px
+
 st.markdown('<div class="section-header">🌡️ Patient Distribution Heatmap</div>', unsafe_allow_html=True)
-filtered['Month'] = pd.to_datetime(filtered['Admission Date']).dt.strftime("%Y-%m")
-heatmap_data = filtered.pivot_table(
-    values='Patient ID',
-    index='Department',
-    columns='Month',
-    aggfunc='count',
-    fill_value=0
-)
+heatmap_data = patient_results['department_month']['count'].unstack(fill_value=0)
 heatmap_fig = px.imshow(
     heatmap_data,
     color_continuous_scale='Greys',
-    template='plotly_dark',
+    template=figures.MONOCHROME,
     text_auto=True,
     aspect='auto'
 )
 heatmap_fig.update_layout(
-    height=600,
-    plot_bgcolor='#2A2A2A',
-    paper_bgcolor='#2A2A2A',
-    font=dict(color='#D3D3D3')
+    height=600
 )
-st.plotly_chart(heatmap_fig, use_container_width=True)
+st.plotly_chart(figures.optimize(heatmap_fig), use_container_width=True)
 
 # ----------------- Patient & Doctor Tables -----------------
+# Sorted and sliced on the server: only the visible page is sent to the browser
 st.markdown('<div class="section-header">📋 Patient Information</div>', unsafe_allow_html=True)
-st.dataframe(filtered, use_container_width=True)
+paging.render(filtered, key="patients")
 
 st.markdown('<div class="section-header">👨‍⚕️ Doctor Assignments</div>', unsafe_allow_html=True)
-st.dataframe(doctor_df, use_container_width=True)
+paging.render(doctor_df, key="doctors")
 
 # ----------------- Patient Distribution -----------------
 st.markdown('<div class="section-header">📈 Patient Distribution</div>', unsafe_allow_html=True)
 d1, d2 = st.columns(2)
 with d1:
-    pie = px.pie(filtered, names="Sex", title="Gender Distribution", color_discrete_sequence=px.colors.sequential.Greys)
+    pie = px.pie(filtered[["Sex"]], names="Sex", title="Gender Distribution", color_discrete_sequence=px.colors.sequential.Greys)
     pie.update_layout(
-        template="plotly_dark",
-        plot_bgcolor='#2A2A2A',
-        paper_bgcolor='#2A2A2A',
-        font=dict(color='#D3D3D3')
+        template=figures.MONOCHROME
     )
-    st.plotly_chart(pie, use_container_width=True)
+    st.plotly_chart(figures.optimize(pie), use_container_width=True)
 
 with d2:
-    dept_counts = filtered["Department"].value_counts().reset_index()
+    dept_counts = dimensions.top_n(filtered, "Department", n=len(all_medical_departments))
     dept_counts.columns = ["Department", "Patient Count"]
     bar = px.bar(
         dept_counts,
@@ -272,41 +225,32 @@ with d2:
         color_discrete_sequence=px.colors.sequential.Greys
     )
     bar.update_layout(
-        template="plotly_dark",
-        xaxis_tickangle=-45,
-        plot_bgcolor='#2A2A2A',
-        paper_bgcolor='#2A2A2A',
-        font=dict(color='#D3D3D3')
+        template=figures.MONOCHROME,
+        xaxis_tickangle=-45
     )
-    st.plotly_chart(bar, use_container_width=True)
+    st.plotly_chart(figures.optimize(bar), use_container_width=True)
 
 # ----------------- Admission Trends -----------------
 st.markdown('<div class="section-header">📊 Admission Trends</div>', unsafe_allow_html=True)
-admission_trend = filtered.groupby('Month')[['Patient ID']].count().reset_index()
-admission_trend.columns = ['Month', 'Patient Count']
+admission_trend = patient_results['month']['count'].rename('Patient Count').reset_index()
 trend_fig = px.line(
     admission_trend,
     x='Month',
     y='Patient Count',
     markers=True,
-    template='plotly_dark',
+    template=figures.MONOCHROME,
     color_discrete_sequence=['#A9A9A9']
 )
-trend_fig.update_layout(
-    plot_bgcolor='#2A2A2A',
-    paper_bgcolor='#2A2A2A',
-    font=dict(color='#D3D3D3')
-)
-st.plotly_chart(trend_fig, use_container_width=True)
+st.plotly_chart(figures.optimize(trend_fig), use_container_width=True)
 
 # ----------------- Department Performance Table -----------------
 st.markdown('<div class="section-header">🏥 Department Performance</div>', unsafe_allow_html=True)
-dept_performance = filtered.groupby('Department').agg({
-    'Patient ID': 'count',
-    'Treatment Cost (₹)': ['mean', 'sum']
-}).round(2)
-dept_performance.columns = ['Patient Count', 'Avg Treatment Cost (₹)', 'Total Treatment Cost (₹)']
-dept_performance = dept_performance.reset_index()
+dept_totals = patient_results['department']
+dept_performance = pd.DataFrame({
+    'Patient Count': dept_totals['count'],
+    'Avg Treatment Cost (₹)': dept_totals['Treatment Cost (₹)'] / dept_totals['count'],
+    'Total Treatment Cost (₹)': dept_totals['Treatment Cost (₹)']
+}).round(2).reset_index()
 st.dataframe(
     dept_performance.style.format({
         'Avg Treatment Cost (₹)': '₹{:,.2f}',
@@ -331,17 +275,15 @@ with tabs[0]:
         color_discrete_sequence=['#A9A9A9', '#808080']
     )
     fig.update_layout(
-        template='plotly_dark',
-        plot_bgcolor='#2A2A2A',
-        paper_bgcolor='#2A2A2A',
-        font=dict(color='#D3D3D3')
+        template=figures.MONOCHROME
     )
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(figures.optimize(fig), use_container_width=True)
 
 with tabs[1]:
     st.subheader("👥 HR Overview")
 
     # HR Employee Table with Salary and Performance
+    fake = get_faker()
     hr_data = pd.DataFrame({
         "Employee ID": [f"H{100+i}" for i in range(10)],
         "Name": [fake.name() for _ in range(10)],
@@ -357,7 +299,7 @@ with tabs[1]:
     # Performance Distribution
     st.markdown("#### 📈 Performance Distribution")
     perf_fig = px.histogram(hr_data, x="Performance Score", nbins=5, template="plotly_dark")
-    st.plotly_chart(perf_fig, use_container_width=True)
+    st.plotly_chart(figures.optimize(perf_fig), use_container_width=True)
 
     # Employee Time Log Table
     st.markdown("#### ⏱️ Employee Time Log")
@@ -381,7 +323,7 @@ with tabs[1]:
         text_auto=True,
         labels={"Total Hours": "Total Logged Hours"}
     )
-    st.plotly_chart(hour_fig, use_container_width=True)
+    st.plotly_chart(figures.optimize(hour_fig), use_container_width=True)
 
 with tabs[2]:
     st.subheader("🛡️ Insurance Overview")
@@ -395,12 +337,9 @@ with tabs[2]:
         color_discrete_sequence=['#A9A9A9']
     )
     fig.update_layout(
-        template='plotly_dark',
-        plot_bgcolor='#2A2A2A',
-        paper_bgcolor='#2A2A2A',
-        font=dict(color='#D3D3D3')
+        template=figures.MONOCHROME
     )
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(figures.optimize(fig), use_container_width=True)
 
 with tabs[3]:
     st.subheader("😊 Patient Satisfaction")
@@ -410,55 +349,44 @@ with tabs[3]:
         x="Department",
         y="Patient Satisfaction Score",
         title="Satisfaction Score by Department",
-        template="plotly_dark",
+        template=figures.MONOCHROME,
         color_discrete_sequence=['#A9A9A9']
     )
-    fig.update_layout(
-        plot_bgcolor='#2A2A2A',
-        paper_bgcolor='#2A2A2A',
-        font=dict(color='#D3D3D3')
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(figures.optimize(fig), use_container_width=True)
 
 # ----------------- Patient Demographics -----------------
 st.markdown('<div class="section-header">👤 Patient Demographics Analysis</div>', unsafe_allow_html=True)
-demo_data = filtered.copy()
-demo_data['Age Group'] = pd.cut(
-    demo_data['Age'],
-    bins=[0, 18, 35, 50, 65, 100],
-    labels=['0-18', '19-35', '36-50', '51-65', '65+']
+demo_data = filtered[['Patient ID', 'Sex', 'Blood Group', 'Religion', 'Treatment Cost (₹)']].assign(**{
+    'Age Group': pd.cut(
+        filtered['Age'],
+        bins=[0, 18, 35, 50, 65, 100],
+        labels=['0-18', '19-35', '36-50', '51-65', '65+']
+    )
+})
+paging.render(
+    demo_data, key="demographics",
+    columns=['Patient ID', 'Age Group', 'Sex', 'Blood Group', 'Religion', 'Treatment Cost (₹)']
 )
-st.dataframe(demo_data[['Patient ID', 'Age Group', 'Sex', 'Blood Group', 'Religion', 'Treatment Cost (₹)']], use_container_width=True)
 
 st.markdown("#### 🎂 Age Group Distribution")
 age_dist = px.histogram(
     demo_data,
     x="Age Group",
     color="Sex",
-    template="plotly_dark",
+    template=figures.MONOCHROME,
     color_discrete_sequence=px.colors.sequential.Greys
 )
-age_dist.update_layout(
-    plot_bgcolor='#2A2A2A',
-    paper_bgcolor='#2A2A2A',
-    font=dict(color='#D3D3D3')
-)
-st.plotly_chart(age_dist, use_container_width=True)
+st.plotly_chart(figures.optimize(age_dist), use_container_width=True)
 
 st.markdown("#### 💰 Treatment Cost by Age Group")
 cost_by_age = px.box(
     demo_data,
     x="Age Group",
     y="Treatment Cost (₹)",
-    template="plotly_dark",
+    template=figures.MONOCHROME,
     color_discrete_sequence=['#A9A9A9']
 )
-cost_by_age.update_layout(
-    plot_bgcolor='#2A2A2A',
-    paper_bgcolor='#2A2A2A',
-    font=dict(color='#D3D3D3')
-)
-st.plotly_chart(cost_by_age, use_container_width=True)
+st.plotly_chart(figures.optimize(cost_by_age), use_container_width=True)
 
 # ----------------- Footer -----------------
 st.markdown("""
@@ -467,3 +395,6 @@ st.markdown("""
         <small style='color: #A9A9A9;'>© 2025 One Trust | Empowering healthcare decisions</small>
     </center>
 """, unsafe_allow_html=True)
+
+# Per-session memory panel (MEMORY_PROFILE=1, see memory_profile.py)
+memory_profile.render(globals())
@@ -1,16 +1,29 @@
 import dash
 from dash import dcc, html, dash_table
 from dash.dependencies import Input, Output
-import pandas as pd
 import plotly.express as px
 
+import data_sources
+import dimensions
+import figures
+import row_index
+import schemas
+import snapshot
+
 # Load the data
 file_path = 'https://github.com/Dilip1100/Financial_Vizro1100/blob/0342b0328b64852877190a60523265bdb9ca4b4a/DBT.csv'
-df = pd.read_csv(file_path, encoding='latin1')
 
-# Ensure correct column names
-expected_columns = ["CUSTOMERNAME", "COUNTRY", "YEAR_ID", "QTR_ID", "TOTALLOSS", "TOTALREVENUE", "PROFIT"]
-df.columns = expected_columns
+
+def load_data():
+    # Columns are matched by name against the DBT schema, not by position
+    return schemas.DBT.read_csv(file_path)
+
+
+# Memory-mapped from the warm-start snapshot after the first run
+df = snapshot.cached("v1-dbt", load_data, sources=[file_path], code=[schemas])
+dimensions.encode(df, data_sources.DBT_DIMENSIONS)
+# Posting lists / sorted orders behind the customer drill-down table
+rows = row_index.for_dbt(df)
 
 # Initialize the Dash app
 app = dash.Dash(__name__, suppress_callback_exceptions=True)
@@ -30,7 +43,7 @@ app.layout = html.Div(style={"backgroundColor": theme["background"], "padding":
     # Year Checkbox Slicer
     dcc.Checklist(
         id='year_checkbox',
-        options=[{'label': str(y), 'value': y} for y in sorted(df['YEAR_ID'].unique())],
+        options=[{'label': str(y), 'value': y} for y in sorted(df['YEAR_ID'].dropna().unique())],
         value=[df['YEAR_ID'].max()],
         inline=True,
         style={"textAlign": "center", "marginBottom": "20px", "color": theme["text_color"]}
@@ -57,7 +70,25 @@ app.layout = html.Div(style={"backgroundColor": theme["background"], "padding":
     ]),
     
     # Line Chart for Revenue and Loss Trend
-    html.Div(id='revenue_loss_trend_chart', style={'marginTop': '20px', 'backgroundColor': theme['chart_bg']})
+    html.Div(id='revenue_loss_trend_chart', style={'marginTop': '20px', 'backgroundColor': theme['chart_bg']}),
+
+    # Customer rows behind the charts; paged, sorted and filtered on the server
+    html.H3("Customer Details", style={"marginTop": "20px"}),
+    dash_table.DataTable(
+        id='customer_table',
+        columns=row_index.datatable_columns(df),
+        page_current=0,
+        page_size=15,
+        page_action='custom',
+        sort_action='custom',
+        sort_mode='single',
+        sort_by=[],
+        filter_action='custom',
+        filter_query='',
+        style_header={"backgroundColor": theme["chart_bg"], "color": theme["text_color"], "fontWeight": "bold"},
+        style_cell={"backgroundColor": theme["background"], "color": theme["text_color"]},
+        style_filter={"backgroundColor": theme["chart_bg"], "color": theme["text_color"]},
+    )
 ])
 
 @app.callback(
@@ -68,7 +99,7 @@ def update_graph(selected_years, selected_metric):
     filtered_df = df[df['YEAR_ID'].isin(selected_years)]
     
     # Get top 10 customers by selected metric
-    top_customers = filtered_df.groupby('CUSTOMERNAME')[selected_metric].sum().nlargest(10).reset_index()
+    top_customers = dimensions.top_n(filtered_df, 'CUSTOMERNAME', selected_metric, 10)
     fig_revenue_bar = px.bar(top_customers, y='CUSTOMERNAME', x=selected_metric, title=f'Top 10 Customers by {selected_metric}', 
                               labels={selected_metric: selected_metric},
                               orientation='h',
@@ -76,7 +107,7 @@ def update_graph(selected_years, selected_metric):
                               template='plotly_dark')
     
     # Pie chart for top 10 countries by selected metric
-    country_metric = filtered_df.groupby('COUNTRY')[selected_metric].sum().nlargest(10).reset_index()
+    country_metric = dimensions.top_n(filtered_df, 'COUNTRY', selected_metric, 10)
     fig_revenue_pie = px.pie(country_metric, names='COUNTRY', values=selected_metric, title=f'Top 10 Countries by {selected_metric}',
                               color_discrete_sequence=px.colors.qualitative.Set3)
     
@@ -87,7 +118,24 @@ def update_graph(selected_years, selected_metric):
                          labels={'value': 'Amount', 'QTR_ID': 'Quarter'},
                          template='plotly_dark')
     
-    return dcc.Graph(figure=fig_revenue_bar), dcc.Graph(figure=fig_revenue_pie), dcc.Graph(figure=fig_trend)
+    return (
+        dcc.Graph(figure=figures.optimize(fig_revenue_bar)),
+        dcc.Graph(figure=figures.optimize(fig_revenue_pie)),
+        dcc.Graph(figure=figures.optimize(fig_trend)),
+    )
+
+@app.callback(
+    [Output('customer_table', 'data'), Output('customer_table', 'page_count'), Output('customer_table', 'page_current')],
+    [Input('customer_table', 'page_current'), Input('customer_table', 'page_size'), Input('customer_table', 'sort_by'),
+     Input('customer_table', 'filter_query'), Input('year_checkbox', 'value'), Input('metric_toggle', 'value')]
+)
+def update_table(page_current, page_size, sort_by, filter_query, selected_years, selected_metric):
+    # A new year/metric selection starts again from the first page
+    page = page_current if row_index.triggered_by('customer_table') else 0
+    # Only the visible page is sent; unsorted tables show the largest selected metric first
+    return rows.page(
+        {'YEAR_ID': selected_years}, filter_query, sort_by, page, page_size, default_sort=(selected_metric, False)
+    )
 
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -0,0 +1,209 @@
+# Approximate query mode for large DV2 histories.
+#
+# While an analyst is moving slicers, the KPI cards, top-N charts and trends
+# do not need exact sums over every row. StratifiedSample keeps a fixed
+# sample per (Month, Car Make) stratum, a few percent of the rows but never
+# fewer than MIN_STRATUM_ROWS, with each row weighted by the inverse of its
+# stratum's sampling rate. Filtered aggregates are estimated from the
+# weighted sample in the usual results-dict shape, so the charts consume them
+# unchanged. The KPI totals come with 95% margins from the stratified
+# (domain) variance estimator.
+#
+# answer() returns the estimate at once and queues the exact query in a
+# background thread. The exact query starts only after the filter state has
+# been left alone for SETTLE_SECONDS, so intermediate slider positions are
+# never computed exactly. Once it lands, later requests for that state get
+# the exact results from a small LRU, keyed on the data version as well as
+# the filters.
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import out_of_core
+from data_sources import DV2_METRICS
+
+# auto: approximate only frames of APPROX_MIN_ROWS+ rows; on / off force it
+APPROX_MODE = os.environ.get("DV2_APPROXIMATE", "auto")
+APPROX_MIN_ROWS = int(os.environ.get("DV2_APPROX_MIN_ROWS", "1000000"))
+SAMPLE_FRACTION = float(os.environ.get("DV2_SAMPLE_FRACTION", "0.02"))
+MIN_STRATUM_ROWS = 30
+STRATA = ["Month", "Car Make"]
+Z_95 = 1.96
+SETTLE_SECONDS = 0.75
+REFINE_WORKERS = 2
+EXACT_CACHE_SIZE = 64
+
+_lock = threading.Lock()
+_exact = OrderedDict()
+_pending = {}
+_latest = {}
+_executor = None
+
+
+def enabled(rows):
+    if APPROX_MODE == "on":
+        return True
+    return APPROX_MODE == "auto" and rows >= APPROX_MIN_ROWS
+
+
+# ----------------- Stratified Sample -----------------
+class StratifiedSample:
+    """Fixed per-stratum random sample of frame with inverse-probability weights."""
+
+    def __init__(self, frame, strata=STRATA, fraction=SAMPLE_FRACTION, min_rows=MIN_STRATUM_ROWS,
+                 metrics=DV2_METRICS, seed=0):
+        self.metrics = list(metrics)
+        codes = frame.groupby(list(strata), observed=True, dropna=False, sort=False).ngroup().to_numpy()
+        self.population = np.bincount(codes)
+        self.sampled = np.minimum(self.population, np.maximum(min_rows, np.ceil(fraction * self.population))).astype(int)
+        # shuffle within each stratum and keep its first n_h rows
+        order = np.lexsort((np.random.default_rng(seed).random(len(codes)), codes))
+        starts = np.concatenate([[0], np.cumsum(self.population)[:-1]])
+        rank = np.arange(len(order)) - starts[codes[order]]
+        keep = np.sort(order[rank < self.sampled[codes[order]]])
+        self.rows = frame.take(keep).reset_index(drop=True)
+        self.stratum = codes[keep]
+        self.weight = (self.population / self.sampled)[self.stratum]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def aggregate(self, filters, groupings=out_of_core.GROUPINGS):
+        """Estimated aggregate_frame() results for filters: weighted sums and weighted counts."""
+        mask = out_of_core.filter_mask(self.rows, filters)
+        rows, weight = self.rows[mask], self.weight[mask]
+        weighted = rows.assign(**{m: rows[m].to_numpy() * weight for m in self.metrics}, _count=weight)
+        results = out_of_core.aggregate_frame(weighted, groupings, [*self.metrics, "_count"])
+        for frame in results.values():
+            frame["count"] = frame.pop("_count").round().astype(np.int64)
+        return results
+
+    def _total_variance(self, values):
+        """Variance of the stratified estimate of sum(values) over the population."""
+        n = self.sampled
+        s1 = np.bincount(self.stratum, values, minlength=len(n))
+        s2 = np.bincount(self.stratum, values ** 2, minlength=len(n))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            spread = np.where(n > 1, (s2 - s1 ** 2 / n) / (n - 1), 0.0)
+        return float(np.sum(self.population ** 2 * (1 - n / self.population) * spread / n))
+
+    def margins(self, filters, z=Z_95):
+        """95% half-widths for the out_of_core.kpis() values under filters."""
+        inside = out_of_core.filter_mask(self.rows, filters).astype(float)
+        sales = self.rows["Sale Price"].to_numpy(dtype=float) * inside
+        commission = self.rows["Commission Earned"].to_numpy(dtype=float) * inside
+        count = float(np.sum(inside * self.weight))
+        margins = {
+            "total_sales": z * math.sqrt(self._total_variance(sales)),
+            "total_commission": z * math.sqrt(self._total_variance(commission)),
+            "transactions": z * math.sqrt(self._total_variance(inside)),
+            "avg_price": 0.0,
+        }
+        if count:
+            # ratio estimator, linearized: residuals of price around the estimated mean
+            ratio = float(np.sum(sales * self.weight)) / count
+            margins["avg_price"] = z * math.sqrt(self._total_variance(inside * (sales - ratio))) / count
+        return margins
+
+
+def format_margin(kpi, margins, name):
+    """' ±1.2%' for a KPI card, or '' when the value is exact (margins is None)."""
+    if margins is None or not kpi[name]:
+        return ""
+    return f" ±{abs(margins[name] / kpi[name]):.1%}"
+
+
+# ----------------- Exact Refinement -----------------
+def filter_key(filters, version=None):
+    return version, tuple(sorted((c, None if values is None else tuple(values)) for c, values in filters.items()))
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=REFINE_WORKERS, thread_name_prefix="dv2-exact")
+    return _executor
+
+
+def _refine(key, exact, settle):
+    time.sleep(settle)
+    with _lock:
+        if key not in _latest.values():
+            # every session moved on before settling; this state is never computed exactly
+            return False
+    results = exact()
+    with _lock:
+        _exact[key] = results
+        while len(_exact) > EXACT_CACHE_SIZE:
+            _exact.popitem(last=False)
+    return True
+
+
+def answer(filters, exact, sample, owner="main", settle=SETTLE_SECONDS, version=None):
+    """(results, margins): exact results if already computed, else the sample estimate and its margins.
+
+    exact is a no-argument callable returning the exact results; it is run in
+    the background if owner (a session), or another session, still has this
+    filter state after settle seconds. version is the data version the
+    results derive from (see data_version.py).
+    """
+    key = filter_key(filters, version)
+    with _lock:
+        if key in _exact:
+            _exact.move_to_end(key)
+            return _exact[key], None
+        _latest[owner] = key
+        if key not in _pending:
+            future = _get_executor().submit(_refine, key, exact, settle)
+            _pending[key] = future
+            future.add_done_callback(lambda _: _pending.pop(key, None))
+    return sample.aggregate(filters), sample.margins(filters)
+
+
+def refinement_status(filters, version=None):
+    """'exact' once computed, 'pending' while queued or running, else 'dropped'."""
+    key = filter_key(filters, version)
+    with _lock:
+        if key in _exact:
+            return "exact"
+        if key in _pending:
+            return "pending"
+    return "dropped"
+
+
+def clear():
+    """Drop every exact result (the data they were computed from changed)."""
+    with _lock:
+        _exact.clear()
+
+
+if __name__ == "__main__":
+    import sys
+
+    import pandas as pd
+
+    import data_sources
+    import schemas
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "DV2.csv"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    frame = data_sources.add_dv2_periods(schemas.DV2.read_csv(source))
+    frame = pd.concat([frame] * repeat, ignore_index=True)
+    sample = StratifiedSample(frame)
+    filters = {"Car Make": [frame["Car Make"].iloc[0]], "Salesperson": None, "Car Model": None, "Car Year": None}
+    start = time.perf_counter()
+    exact_kpis = out_of_core.kpis(out_of_core.aggregate_frame(frame[out_of_core.filter_mask(frame, filters)]))
+    exact_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    estimate_kpis = out_of_core.kpis(sample.aggregate(filters))
+    margins = sample.margins(filters)
+    approx_ms = (time.perf_counter() - start) * 1000
+    print(f"{len(frame):,} rows, sample {len(sample):,}: exact {exact_ms:.0f} ms, approximate {approx_ms:.0f} ms")
+    for name, value in exact_kpis.items():
+        print(f"  {name}: exact {value:,.0f}, estimate {estimate_kpis[name]:,.0f} ± {margins[name]:,.0f}")
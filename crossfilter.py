@@ -0,0 +1,189 @@
+# Cross-filtering between linked charts, maintained incrementally.
+#
+# Each chart groups by one dimension (JV1: bar by customer, pie by country,
+# trend by quarter) and is filtered by the selections on every *other*
+# dimension, so clicking a country narrows the bar and trend charts while the
+# pie keeps showing every country. CrossFilter aggregates the frame once into
+# a cube (metric sums per combination of the dimensions, far fewer rows than
+# the facts) and keeps, for every dimension, the cube rows of each member (its
+# partial aggregates). A chart's aggregate is a bincount over its dimension's
+# codes.
+#
+# Computed states are kept in a small LRU. For a new selection state,
+# aggregates() looks for a cached state that differs only by members added
+# to or removed from one dimension's selection. The other charts then get
+# just those members' contributions (their cube rows, filtered by the
+# remaining selections) added or subtracted, instead of being rebuilt from
+# the cube. After MAX_DELTAS chained updates a state is rebuilt in full, so
+# float round-off cannot accumulate.
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CACHE_SIZE = 64
+MAX_DELTAS = 32
+
+
+def _freeze(selections):
+    return tuple(sorted((d, None if m is None else frozenset(m)) for d, m in selections.items()))
+
+
+class CrossFilter:
+    """Per-chart aggregates of frame under cross-filter selections ({dimension: members or None})."""
+
+    def __init__(self, frame, charts, metrics, dimensions=(), size=CACHE_SIZE):
+        # charts: {chart name: dimension it groups by}; dimensions: extra filter-only dimensions
+        self.charts = dict(charts)
+        self.metrics = list(metrics)
+        self.dimensions = list(dict.fromkeys([*self.charts.values(), *dimensions]))
+        grouped = frame.groupby(self.dimensions, observed=True)
+        cube = grouped[self.metrics].sum().assign(_rows=grouped.size()).reset_index()
+        self.codes, self.labels, self._lookup = {}, {}, {}
+        for dimension in self.dimensions:
+            codes, labels = pd.factorize(cube[dimension], sort=True)
+            self.codes[dimension] = codes
+            self.labels[dimension] = labels
+            self._lookup[dimension] = {label: code for code, label in enumerate(labels)}
+        # the trailing row count tells members with no rows from members summing to zero
+        self.values = cube[[*self.metrics, "_rows"]].to_numpy(dtype=float)
+        # per-dimension partials: the cube rows of every member
+        self.members = {}
+        for dimension, codes in self.codes.items():
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(self.labels[dimension]) + 1))
+            self.members[dimension] = [order[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+        self.size = size
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"full": 0, "incremental": 0, "cached": 0}
+
+    def __len__(self):
+        return len(self.values)
+
+    # ----------------- Aggregation -----------------
+    def _member_codes(self, dimension, members):
+        lookup = self._lookup[dimension]
+        return {lookup[m] for m in members if m in lookup}
+
+    def _codes(self, selections):
+        return {
+            d: None if members is None else self._member_codes(d, members)
+            for d, members in selections.items() if d in self.codes
+        }
+
+    def _mask(self, rows, codes, skip):
+        """Which of rows (cube row positions) pass every selection except those on skip."""
+        keep = np.ones(len(rows), dtype=bool)
+        for dimension, members in codes.items():
+            if members is not None and dimension not in skip:
+                keep &= np.isin(self.codes[dimension][rows], list(members))
+        return keep
+
+    def _sums(self, dimension, rows):
+        """Metric sums and row counts of the cube rows, one row per member of dimension."""
+        size = len(self.labels[dimension])
+        group = self.codes[dimension][rows]
+        # bincount of no rows is int64 even with weights; deltas add floats in place
+        return np.column_stack([
+            np.bincount(group, weights=self.values[rows, i], minlength=size) for i in range(self.values.shape[1])
+        ]).astype(float)
+
+    def _full(self, codes):
+        everything = np.arange(len(self.values))
+        return {
+            chart: self._sums(dimension, everything[self._mask(everything, codes, {dimension})])
+            for chart, dimension in self.charts.items()
+        }
+
+    def _delta(self, parent, codes, dimension, added, removed, start_empty=False):
+        """Parent aggregates with the contributions of added/removed members of dimension applied."""
+        aggregates = {}
+        for chart, grouped in self.charts.items():
+            if grouped == dimension:
+                # a chart is not filtered by selections on its own dimension
+                aggregates[chart] = parent[chart]
+                continue
+            result = np.zeros_like(parent[chart]) if start_empty else parent[chart].copy()
+            for members, sign in ((added, 1.0), (removed, -1.0)):
+                if not members:
+                    continue
+                rows = np.concatenate([self.members[dimension][m] for m in members])
+                rows = rows[self._mask(rows, codes, {grouped, dimension})]
+                result += sign * self._sums(grouped, rows)
+            aggregates[chart] = result
+        return aggregates
+
+    def _parent(self, codes):
+        """(cached state, the one dimension it differs on, added, removed) with the fewest changes, or None."""
+        best = None
+        for state in reversed(self._states.values()):
+            if state["deltas"] >= MAX_DELTAS or set(state["codes"]) != set(codes):
+                continue
+            differing = [d for d in codes if codes[d] != state["codes"][d]]
+            if len(differing) != 1:
+                continue
+            dimension = differing[0]
+            old, new = state["codes"][dimension], codes[dimension]
+            if new is None:
+                # back to all members: cheaper to rebuild
+                continue
+            # from all members to a first selection: start from nothing and add the selected members
+            added, removed = (new, set()) if old is None else (new - old, old - new)
+            if best is None or len(added) + len(removed) < len(best[2]) + len(best[3]):
+                best = (state, dimension, added, removed)
+        return best
+
+    def aggregates(self, selections):
+        """{chart: members x (metrics, row count) array} under selections; see table() for frames."""
+        key = _freeze(selections)
+        codes = self._codes(selections)
+        with self._lock:
+            if key in self._states:
+                self._states.move_to_end(key)
+                self.stats["cached"] += 1
+                return self._states[key]["aggregates"]
+            parent = self._parent(codes)
+        if parent is None:
+            aggregates, deltas = self._full(codes), 0
+            self.stats["full"] += 1
+        else:
+            state, dimension, added, removed = parent
+            start_empty = state["codes"][dimension] is None
+            aggregates = self._delta(state["aggregates"], codes, dimension, added, removed, start_empty)
+            deltas = state["deltas"] + 1
+            self.stats["incremental"] += 1
+        with self._lock:
+            self._states[key] = {"codes": codes, "aggregates": aggregates, "deltas": deltas}
+            while len(self._states) > self.size:
+                self._states.popitem(last=False)
+        return aggregates
+
+    def table(self, chart, selections):
+        """The chart's aggregate as a frame: its dimension plus metric columns, members with rows only."""
+        dimension = self.charts[chart]
+        sums = self.aggregates(selections)[chart]
+        frame = pd.DataFrame(sums[:, :-1], columns=self.metrics)
+        frame.insert(0, dimension, self.labels[dimension])
+        return frame[sums[:, -1] > 0.5].reset_index(drop=True)
+
+
+# ----------------- Chart events -----------------
+def points(event, field):
+    """The field ('x', 'y', 'label') of every point in a Dash clickData / selectedData event."""
+    return [point[field] for point in (event or {}).get("points", []) if field in point]
+
+
+def toggle(selection, dimension, members):
+    """selection with members switched in or out of dimension (an emptied dimension is unfiltered)."""
+    return replace(selection, dimension, set(selection.get(dimension) or []) ^ set(members))
+
+
+def replace(selection, dimension, members):
+    """selection with dimension set to members (none: unfiltered)."""
+    selection = {d: m for d, m in selection.items() if d != dimension}
+    if members:
+        selection[dimension] = sorted(members)
+    return selection
@@ -0,0 +1,255 @@
+# Streamlit caches shared by every dashboard page.
+#
+# st.cache_data / st.cache_resource key entries on the decorated function, so
+# a load_data() defined inside CarDemo.py and another inside FPLPOC.py are two
+# caches holding two parsed copies of DV2.csv. Defining the loaders and query
+# backends once here lets all pages (run standalone or together under
+# dashboard_host.py) share one copy of each dataset and backend per process.
+# Parsed frames and the unfiltered aggregates also go through snapshot.py, so
+# a fresh process memory-maps them instead of re-parsing the CSVs.
+# The shared frames are cache_resource (one read-only object, not a copy per
+# call) with their text dimensions dictionary-encoded through dimensions.POOL.
+# Every cache here is keyed on the version of the source it derives from (see
+# data_version.py): a changed DV2 or DBT file gets fresh entries and evicts
+# the caches of that source only.
+
+import time
+
+import pandas as pd
+import streamlit as st
+
+import approximate
+import data_sources
+import data_version
+import dimensions
+import memory_profile
+import out_of_core
+import query_backend
+import schemas
+import sketches
+import snapshot
+import warmer
+
+DV2_INDEX_COLUMNS = out_of_core.SLICER_COLUMNS + ["Car Model"]
+DBT_INDEX_COLUMNS = ["YEAR_ID", "COUNTRY", "CUSTOMERNAME"]
+
+
+# ----------------- DV2 -----------------
+def _read_dv2():
+    df = schemas.DV2.read_csv(data_sources.DV2_URL)
+    rejects = []
+    data_sources.add_dv2_periods(df, rejects)
+    report = data_sources.date_reject_report(rejects, list(df.columns))
+    # snapshotted encoded: a warm start maps the codes instead of decoding and re-encoding text
+    return {"frame": dimensions.encode(df, data_sources.DV2_DIMENSIONS), "date_rejects": report}
+
+
+def _dv2_snapshot():
+    return snapshot.cached("dv2", _read_dv2, sources=[data_sources.DV2_URL], code=[data_sources, schemas, dimensions])
+
+
+@data_version.versioned(data_sources.DV2_URL)
+@st.cache_resource
+def _dv2_loaded(version):
+    # one snapshot load serves both the frame and its date reject report
+    try:
+        frames = _dv2_snapshot()
+    except schemas.SchemaError as exc:
+        st.error(str(exc))
+        return {"frame": pd.DataFrame(), "date_rejects": data_sources.date_reject_report([])}
+    # already encoded: this only re-points the snapshot's lookup tables at the shared pool
+    frame = dimensions.encode(frames["frame"], data_sources.DV2_DIMENSIONS)
+    return {"frame": memory_profile.shared(frame), "date_rejects": frames["date_rejects"]}
+
+
+def load_dv2():
+    # Shared, not copied per rerun: callers filter it but never modify it
+    return _dv2_loaded()["frame"]
+
+
+def dv2_date_rejects():
+    """Rows dropped from the period charts because their Date did not parse."""
+    return _dv2_loaded()["date_rejects"]
+
+
+def _fold_chunks(columns):
+    return lambda source, start, end: out_of_core.iter_chunks(source, columns=columns, start=start, end=end)
+
+
+@st.cache_resource
+def _dv2_options(source):
+    # folded incrementally: rows appended to source are read once, not the whole file again
+    return data_version.Folded(
+        source, out_of_core.empty_options, out_of_core.fold_options, _fold_chunks(out_of_core.OPTION_COLUMNS)
+    )
+
+
+def dv2_filter_options(source):
+    return out_of_core.finish_options(_dv2_options(source).get())
+
+
+@data_version.versioned(data_sources.DV2_URL)
+@st.cache_resource
+def dv2_backend(version, name):
+    # Built once per process and shared by all sessions (see DASHBOARD_QUERY_BACKEND)
+    return query_backend.get_backend(name, load_dv2(), index_columns=DV2_INDEX_COLUMNS)
+
+
+@data_version.versioned(data_sources.DV2_URL)
+@st.cache_resource
+def dv2_unfiltered_results(version):
+    # The landing view (no slicers set), precomputed into the snapshot
+    return snapshot.cached(
+        "dv2-results", lambda: out_of_core.aggregate_frame(load_dv2()),
+        sources=[data_sources.DV2_URL], code=[data_sources, schemas, dimensions, out_of_core, _read_dv2]
+    )
+
+
+def dv2_aggregate(filters):
+    """Aggregates for a DV2 filter dict, served from the snapshot when nothing is filtered."""
+    if all(values is None for values in filters.values()):
+        return dv2_unfiltered_results()
+    return dv2_backend(query_backend.DEFAULT_BACKEND).aggregate(filters)
+
+
+@data_version.versioned(data_sources.DV2_URL)
+@st.cache_resource
+def dv2_sample(version):
+    return approximate.StratifiedSample(load_dv2())
+
+
+def dv2_results(filters):
+    """(results, margins) for a DV2 filter dict; margins is None when the results are exact.
+
+    In approximate mode (see approximate.py) an uncomputed filter state is
+    answered from the stratified sample while the exact query is queued.
+    """
+    if not approximate.enabled(len(load_dv2())) or all(values is None for values in filters.values()):
+        return dv2_aggregate(filters), None
+    # resolved here: cached resources are looked up from the script thread, not the worker
+    backend = dv2_backend(query_backend.DEFAULT_BACKEND)
+    version = data_version.check(data_sources.DV2_URL)
+    return approximate.answer(
+        filters, lambda: backend.aggregate(filters), dv2_sample(), owner=memory_profile.session_id(), version=version
+    )
+
+
+def dv2_refine(filters, margins, timeout=30):
+    """After an approximate render, wait for the exact query and rerun the page with it."""
+    if margins is None:
+        return
+    version = data_version.check(data_sources.DV2_URL)
+    status = st.empty()
+    deadline = time.time() + timeout
+    while time.time() < deadline and approximate.refinement_status(filters, version) == "pending":
+        # each update is a point where a newer interaction can interrupt the wait
+        status.caption("⏳ Refining to exact figures…")
+        time.sleep(0.2)
+    status.empty()
+    if approximate.refinement_status(filters, version) == "exact":
+        st.rerun()
+
+
+# exact results computed in the background are DV2-derived too
+data_version.depends(data_sources.DV2_URL, approximate.clear)
+
+
+@data_version.versioned(data_sources.DV2_URL)
+@st.cache_resource
+def _dv2_frame_sketches(version):
+    return sketches.build([load_dv2()], sketches.DV2_SKETCHES)
+
+
+@st.cache_resource
+def _dv2_streamed_sketches(source):
+    return data_version.Folded(
+        source, lambda: sketches.build([], sketches.DV2_SKETCHES), sketches.fold,
+        _fold_chunks(out_of_core.SCAN_COLUMNS + ["Customer Name"]),
+    )
+
+
+def dv2_sketches(source=None):
+    """Customer sketches per salesperson/make and month; streamed from source in out-of-core mode."""
+    return _dv2_streamed_sketches(source).get() if source else _dv2_frame_sketches()
+
+
+def dv2_customer_kpis(filters, source=None, view=None):
+    """(unique buyers, whether that is a sketch estimate, approximate top buyer frame or None).
+
+    Selections no sketch is keyed on fall back to an exact count over the
+    filtered view (None in out-of-core mode).
+    """
+    indexes = dv2_sketches(source)
+    unique = sketches.unique_values(indexes, filters)
+    estimated = unique is not None
+    if unique is None and view is not None:
+        unique = sketches.exact_distinct(view["Customer Name"])
+    return unique, estimated, sketches.heavy_hitters(indexes, filters, n=1)
+
+
+@data_version.versioned()
+@st.cache_data
+def scan_dv2(version, source, filters):
+    return out_of_core.scan(source, filters)
+
+
+@data_version.versioned()
+@st.cache_data
+def sample_dv2(version, source, filters):
+    return out_of_core.sample_rows(source, filters)
+
+
+# ----------------- DBT -----------------
+@data_version.versioned(data_sources.DBT_URL)
+@st.cache_resource
+def load_dbt(version):
+    df = snapshot.cached(
+        "dbt", lambda: schemas.DBT.read_csv(data_sources.DBT_URL), sources=[data_sources.DBT_URL], code=[schemas]
+    )
+    return memory_profile.shared(dimensions.encode(df, data_sources.DBT_DIMENSIONS))
+
+
+@data_version.versioned(data_sources.DBT_URL)
+@st.cache_resource
+def dbt_sketches(version):
+    return sketches.build([load_dbt()], sketches.DBT_SKETCHES)
+
+
+@data_version.versioned(data_sources.DBT_URL)
+@st.cache_resource
+def dbt_backend(version, name):
+    return query_backend.get_backend(
+        name, load_dbt(), metrics=data_sources.DBT_METRICS, groupings=data_sources.DBT_GROUPINGS,
+        index_columns=DBT_INDEX_COLUMNS
+    )
+
+
+def _dbt_resources():
+    # cached resources are looked up here, on the script thread, and handed to the warmer
+    return dbt_backend(query_backend.DEFAULT_BACKEND), load_dbt()
+
+
+@st.cache_resource
+def dbt_warmer():
+    """Shared DBT aggregate cache, pre-filled with the default filters for each year and all years."""
+    def states(backend, df):
+        countries = sorted(df["COUNTRY"].unique())
+        customers = sorted(df["CUSTOMERNAME"].unique())[:10]
+        years = sorted(df["YEAR_ID"].dropna().unique(), reverse=True)
+        return [
+            {"YEAR_ID": selection, "COUNTRY": countries, "CUSTOMERNAME": customers}
+            for selection in [years] + [[year] for year in years]
+        ]
+
+    # lives across DBT versions: the version check clears its entries (and load_dbt's) on a change
+    return warmer.Warmer(
+        "dbt-aggregate",
+        lambda filters, backend, df: backend.aggregate(filters),
+        states=states,
+        version=lambda: data_version.check(data_sources.DBT_URL),
+        resources=_dbt_resources(),
+    ).start()
+
+
+def dbt_aggregate(filters):
+    return dbt_warmer().get(filters, *_dbt_resources())
@@ -0,0 +1,19 @@
+# Multi-page host: serves every Streamlit dashboard from one server process.
+#
+#   streamlit run dashboard_host.py
+#
+# Each page is the unchanged dashboard script; they load data through
+# dashboard_cache, so DV2/DBT are parsed once per process and the query
+# backends are built once, however many pages and sessions use them.
+# Switching pages reruns only the page script against the warm caches.
+
+import streamlit as st
+
+PAGES = [
+    st.Page("CarDemo.py", title="Car Retailer", icon="🚗", url_path="car-retailer", default=True),
+    st.Page("FPLPOC.py", title="Automotive Analytics", icon="🏎️", url_path="automotive"),
+    st.Page("streamlit_app.py", title="DBT Dashboard", icon="📊", url_path="dbt"),
+    st.Page("PSPMED1100.py", title="Medical College & Hospital", icon="🏥", url_path="hospital"),
+]
+
+st.navigation(PAGES).run()
@@ -0,0 +1,105 @@
+# Shared source locations and DV2/DBT preparation used by the dashboards.
+
+import time
+
+import pandas as pd
+
+DBT_URL = "https://raw.githubusercontent.com/Dilip1100/Financial_Vizro1100/main/DBT.csv"
+DV2_URL = "https://raw.githubusercontent.com/Dilip1100/Financial_Vizro1100/94d364e98061cd58f8b52224f33037aa7ca3ed5f/DV2.csv"
+DBT_METRICS = ["TOTALREVENUE", "TOTALLOSS", "PROFIT"]
+DBT_DIMENSIONS = ["CUSTOMERNAME", "COUNTRY"]
+DBT_GROUPINGS = {
+    "customer": ["CUSTOMERNAME"],
+    "country": ["COUNTRY"],
+    "year_qtr": ["YEAR_ID", "QTR_ID"],
+}
+
+DV2_METRICS = ["Sale Price", "Commission Earned"]
+DV2_DIMENSIONS = ["Salesperson", "Customer Name", "Car Make", "Car Model", "Quarter", "Month"]
+# Candidate Date formats, most likely first; DV2 ships day-first dashes (01-08-2022)
+DV2_DATE_FORMATS = ("%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d", "%d.%m.%Y", "%d-%m-%y")
+FORMAT_SAMPLE_ROWS = 1000
+PERIOD_COLUMNS = ["Year", "Quarter", "Month"]
+
+
+def clean_header(name):
+    """Strip whitespace and UTF-8 BOM artifacts (raw or latin1-decoded) from a header."""
+    return name.strip().replace("ï»¿", "").replace("﻿", "")
+
+
+def clean_dv2_columns(df):
+    df.columns = [clean_header(c) for c in df.columns]
+    return df
+
+
+def detect_date_format(values, formats=DV2_DATE_FORMATS):
+    """The first format that parses a whole sample of values, else the one parsing most of it.
+
+    None if no candidate parses any value.
+    """
+    sample = values.iloc[:FORMAT_SAMPLE_ROWS].dropna().astype(str)
+    best, best_parsed = None, 0
+    for fmt in formats:
+        parsed = int(pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum())
+        if parsed == len(sample):
+            return fmt
+        if parsed > best_parsed:
+            best, best_parsed = fmt, parsed
+    return best
+
+
+def parse_dates(values, formats=DV2_DATE_FORMATS):
+    """Vectorized parse with one explicit, detected format; returns (dates, format).
+
+    Falls back to day-first inference only when no candidate format fits.
+    """
+    fmt = detect_date_format(values, formats)
+    if fmt is None:
+        return pd.to_datetime(values, dayfirst=True, errors='coerce'), None
+    return pd.to_datetime(values, format=fmt, errors='coerce'), fmt
+
+
+def add_dv2_periods(df, rejects=None):
+    """Parse Date and derive the Year/Quarter/Month slicer columns in place.
+
+    Rows whose Date does not parse keep NaT (and so drop out of the period
+    groupbys); pass a list as rejects to collect them, see date_reject_report().
+    """
+    raw = df['Date']
+    df['Date'], _ = parse_dates(raw)
+    if rejects is not None:
+        bad = df['Date'].isna().to_numpy()
+        if bad.any():
+            rejects.append(df[bad].assign(Date=raw[bad]))
+    df['Year'] = df['Date'].dt.year
+    df['Quarter'] = df['Date'].dt.to_period('Q').astype(str)
+    df['Month'] = df['Date'].dt.to_period('M').astype(str)
+    return df
+
+
+def date_reject_report(rejects, columns=None):
+    """One frame of the rows add_dv2_periods() could not date, with the raw Date and a Reason."""
+    if not rejects:
+        columns = [c for c in (columns or ["Date"]) if c not in PERIOD_COLUMNS]
+        return pd.DataFrame(columns=["Reason", *columns])
+    report = pd.concat(rejects)
+    blank = report['Date'].isna() | (report['Date'].astype(str).str.strip() == "")
+    report.insert(0, "Reason", blank.map({True: "missing date", False: "unparseable date"}))
+    return report.drop(columns=PERIOD_COLUMNS, errors="ignore")
+
+
+if __name__ == "__main__":
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "DV2.csv"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    dates = pd.concat([clean_dv2_columns(pd.read_csv(source, encoding='latin1'))['Date']] * repeat, ignore_index=True)
+    start = time.perf_counter()
+    inferred = pd.to_datetime(dates, dayfirst=True, errors='coerce')
+    inferred_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    explicit, fmt = parse_dates(dates)
+    explicit_ms = (time.perf_counter() - start) * 1000
+    print(f"{len(dates):,} dates: dayfirst inference {inferred_ms:.1f} ms, explicit {fmt!r} {explicit_ms:.1f} ms")
+    print(f"unparsed rows: inference {int(inferred.isna().sum())}, explicit {int(explicit.isna().sum())}; "
+          f"disagreements {int((inferred.notna() & explicit.notna() & (inferred != explicit)).sum())}")
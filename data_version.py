@@ -0,0 +1,189 @@
+# Source data versions, and eviction of the caches derived from them.
+#
+# The Streamlit caches used to be keyed only on their arguments, so an
+# updated DV2.csv or DBT.csv stayed invisible until the process restarted.
+# Every source now has a cheap version:
+#   - a local file: its size and mtime (one stat per check), plus a
+#     watermark, a hash of the last WATERMARK_BYTES before its end. An append
+#     leaves the watermark of the old end intact, a rewrite does not;
+#   - a URL: its ETag (or Last-Modified), refreshed with a HEAD request at
+#     most every REMOTE_CHECK_SECONDS. Only the first check of a URL waits for
+#     the server; later ones run in a background thread and callers get the
+#     last known version until it answers.
+# Cached functions decorated with versioned() receive the version of their
+# source as their first argument, so a new version is a new cache entry. The
+# first time check() sees a source's version change it evicts the caches
+# registered for that source, and only those. Values folded over a local
+# file's rows (Folded) take in just the appended rows when the file only grew.
+
+import functools
+import hashlib
+import os
+import threading
+import time
+import urllib.request
+from typing import NamedTuple
+
+REMOTE_CHECK_SECONDS = float(os.environ.get("DATA_VERSION_INTERVAL", "300"))
+WATERMARK_BYTES = 4096
+
+_lock = threading.Lock()
+_local = {}
+_remote = {}
+_checking = set()
+_seen = {}
+_dependents = {}
+
+
+class Version(NamedTuple):
+    token: str
+    size: int = -1
+    watermark: str = ""
+
+
+# ----------------- Versions -----------------
+def _watermark(path, end):
+    start = max(0, end - WATERMARK_BYTES)
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        return hashlib.sha1(fh.read(end - start)).hexdigest()
+
+
+def _local_version(path):
+    stat = os.stat(path)
+    key = (stat.st_size, stat.st_mtime_ns)
+    cached = _local.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    version = Version(f"{stat.st_size}-{stat.st_mtime_ns}", stat.st_size, _watermark(path, stat.st_size))
+    _local[path] = (key, version)
+    return version
+
+
+def _refresh_remote(url):
+    cached = _remote.get(url)
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, method="HEAD"), timeout=5) as response:
+            token = response.headers.get("ETag") or response.headers.get("Last-Modified") or url
+    except OSError:
+        # unreachable: keep the last known version rather than evicting everything
+        token = cached[1].token if cached else url
+    with _lock:
+        _remote[url] = (time.monotonic(), Version(token))
+        _checking.discard(url)
+
+
+def _remote_version(url):
+    with _lock:
+        cached = _remote.get(url)
+        if cached and (time.monotonic() - cached[0] < REMOTE_CHECK_SECONDS or url in _checking):
+            return cached[1]
+        if cached:
+            _checking.add(url)
+    if cached is None:
+        # first sight of the URL: caches should start out on its real version
+        _refresh_remote(url)
+        return _remote[url][1]
+    # stale: answer with the last known version, the HEAD request runs off the request thread
+    threading.Thread(target=_refresh_remote, args=(url,), daemon=True, name="data-version-head").start()
+    return cached[1]
+
+
+def current(source):
+    """Version of source as of now (a missing local file is versioned by its path)."""
+    source = str(source)
+    if "://" in source:
+        return _remote_version(source)
+    if not os.path.exists(source):
+        return Version(source)
+    return _local_version(source)
+
+
+def appended(source, old, new):
+    """Byte offset where the rows added since old begin, or None unless source only grew.
+
+    Sources are assumed append-only when the bytes just before the old end are
+    unchanged; an edit further back than WATERMARK_BYTES is not detected.
+    """
+    if not old.watermark or old.size <= 0 or new.size <= old.size:
+        return None
+    source = str(source)
+    if _watermark(source, old.size) != old.watermark:
+        return None
+    with open(source, "rb") as fh:
+        fh.seek(old.size - 1)
+        # the old contents must have ended on a row boundary
+        return old.size if fh.read(1) == b"\n" else None
+
+
+# ----------------- Derived caches -----------------
+def depends(source, evict):
+    """Call evict() whenever source's version changes."""
+    with _lock:
+        callbacks = _dependents.setdefault(str(source), [])
+        if evict not in callbacks:
+            callbacks.append(evict)
+
+
+def check(source):
+    """Version token of source; evicts its dependents the first time a new version is seen."""
+    source = str(source)
+    token = current(source).token
+    with _lock:
+        previous = _seen.get(source)
+        _seen[source] = token
+        callbacks = list(_dependents.get(source, ())) if previous not in (None, token) else []
+    for evict in callbacks:
+        evict()
+    return token
+
+
+def versioned(source=None):
+    """Decorator for a cached f(version, *args), called as f(*args) with the source's version.
+
+    With source None the first argument is the source. The whole cache of f is
+    evicted when its source changes: every entry in it was derived from it.
+    """
+    def decorate(cached):
+        @functools.wraps(cached)
+        def call(*args, **kwargs):
+            path = source if source is not None else args[0]
+            depends(path, cached.clear)
+            return cached(check(path), *args, **kwargs)
+
+        call.clear = cached.clear
+        return call
+
+    return decorate
+
+
+class Folded:
+    """A value folded over a source's rows, kept current as the source changes.
+
+    initial() returns the empty value, fold(value, chunk) adds a chunk of rows
+    and chunks(source, start, end) reads the rows stored between two byte
+    offsets (end None: to the end). A rewritten source is folded again from
+    scratch; an appended one only from its old end.
+    """
+
+    def __init__(self, source, initial, fold, chunks):
+        self.source = source
+        self.initial = initial
+        self.fold = fold
+        self.chunks = chunks
+        self.version = None
+        self.value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            version = current(self.source)
+            if version != self.version:
+                start = appended(self.source, self.version, version) if self.version else None
+                if start is None:
+                    self.value, start = self.initial(), 0
+                end = version.size if version.size >= 0 else None
+                for chunk in self.chunks(self.source, start, end):
+                    self.value = self.fold(self.value, chunk)
+                self.version = version
+            return self.value
@@ -0,0 +1,136 @@
+# Dimension dictionary encoding with one string pool shared by every dataset.
+#
+# Repeated text dimensions (DV2 salesperson/customer/make/model, DBT
+# customer/country, PSPMED department/doctor/blood group, ...) are stored as
+# pandas categoricals: an integer surrogate key per row (int8/int16/int32
+# codes) plus a lookup table of the distinct labels. The lookup tables take
+# their label objects from POOL, so a string used by several columns or
+# datasets (a doctor's name in both PSPMED tables, the same period labels in
+# every DV2 frame) is held in memory once per process. Filters and groupbys
+# then run on the integer codes, and labels are only produced for the rows
+# that get rendered: top_n() sums on codes and decodes just its n winners.
+# POOL only grows: labels of a data version that is no longer loaded stay
+# interned until the process exits. That is bounded by the distinct labels
+# ever loaded, a small fraction of the frames that use them.
+
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class StringPool:
+    """Interned labels: each distinct value is stored once and referred to by an int id."""
+
+    def __init__(self):
+        self._ids = {}
+        self._labels = []
+        # Streamlit sessions may encode frames concurrently
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._labels)
+
+    def intern(self, labels):
+        """Pool ids for an array of distinct labels, adding the ones not seen before."""
+        ids = np.empty(len(labels), dtype=np.int64)
+        with self._lock:
+            for i, label in enumerate(labels):
+                pool_id = self._ids.get(label)
+                if pool_id is None:
+                    pool_id = self._ids[label] = len(self._labels)
+                    self._labels.append(label)
+                ids[i] = pool_id
+        return ids
+
+    def labels(self, ids):
+        """The pooled label objects for ids (object array sharing the pool's strings)."""
+        pooled = np.empty(len(ids), dtype=object)
+        pooled[:] = [self._labels[i] for i in ids]
+        return pooled
+
+    def nbytes(self):
+        return sum(sys.getsizeof(label) for label in self._labels)
+
+
+POOL = StringPool()
+
+
+def encode(frame, columns, pool=POOL):
+    """Dictionary-encode columns of frame in place; their lookup tables share pool's labels.
+
+    Columns that are already categorical (e.g. loaded from a snapshot) keep
+    their codes and category order; only their lookup table is re-pointed at
+    the pool. Other columns are factorized with sorted categories. Missing
+    values keep code -1 (NaN).
+    """
+    for column in columns:
+        values = frame[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes, uniques = values.array.codes, values.cat.categories
+        else:
+            codes, uniques = pd.factorize(values, sort=True)
+        categories = pd.Index(pool.labels(pool.intern(list(uniques))), dtype=object)
+        encoded = pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(categories))
+        # as a Series: assigning the bare array would copy (memory-mapped) codes
+        frame[column] = pd.Series(encoded, index=frame.index, copy=False)
+    return frame
+
+
+def top_n(frame, dimension, metric=None, n=10):
+    """Top n members of dimension by summed metric (row count when metric is None).
+
+    Same frame as frame.groupby(dimension)[metric].sum().nlargest(n).reset_index()
+    (or value_counts().head(n) for counts), but for an encoded dimension the
+    sums run on the integer codes and only the n winning labels are decoded.
+    """
+    value_name = metric or "count"
+    column = frame[dimension]
+    if not isinstance(column.dtype, pd.CategoricalDtype):
+        grouped = frame.groupby(dimension)[metric].sum() if metric else frame.groupby(dimension).size()
+        return grouped.nlargest(n).rename(value_name).reset_index()
+    codes = column.cat.codes.to_numpy()
+    valid = codes >= 0
+    size = len(column.cat.categories)
+    weights = frame[metric].to_numpy(dtype=float)[valid] if metric else None
+    sums = np.bincount(codes[valid], weights=weights, minlength=size)
+    observed = np.flatnonzero(np.bincount(codes[valid], minlength=size))
+    # stable sort keeps ties in label order, like nlargest over a sorted groupby
+    winners = observed[np.argsort(-sums[observed], kind="stable")[:n]]
+    return pd.DataFrame({
+        dimension: column.cat.categories.take(winners),
+        value_name: sums[winners] if metric else sums[winners].astype(np.int64),
+    })
+
+
+def memory_report(frame):
+    """Bytes per column as stored vs. as plain per-row labels, for encoded columns."""
+    rows = []
+    for column in frame.columns:
+        series = frame[column]
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        decoded = series.astype(object)
+        rows.append({
+            "column": column,
+            "members": len(series.cat.categories),
+            "codes_bytes": series.cat.codes.nbytes,
+            "lookup_bytes": int(series.cat.categories.memory_usage(deep=True)),
+            "decoded_bytes": int(decoded.memory_usage(deep=True, index=False)),
+        })
+    report = pd.DataFrame(rows, columns=["column", "members", "codes_bytes", "lookup_bytes", "decoded_bytes"])
+    report["ratio"] = report["decoded_bytes"] / (report["codes_bytes"] + report["lookup_bytes"])
+    return report
+
+
+if __name__ == "__main__":
+    import data_sources
+    import schemas
+
+    dv2 = data_sources.add_dv2_periods(schemas.DV2.read_csv(sys.argv[1] if len(sys.argv) > 1 else "DV2.csv"))
+    dbt = schemas.DBT.read_csv("DBT.csv")
+    for name, frame, columns in [("DV2", dv2, data_sources.DV2_DIMENSIONS), ("DBT", dbt, data_sources.DBT_DIMENSIONS)]:
+        print(name)
+        print(memory_report(encode(frame, columns)).round(1).to_string(index=False))
+    print(f"pool: {len(POOL):,} labels, {POOL.nbytes():,} bytes")
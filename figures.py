@@ -0,0 +1,239 @@
+# Shared figure theme and post-processing for the Streamlit and Dash apps.
+#
+# The monochrome look used by FPLPOC.py and PSPMED1100.py is registered once as
+# the "monochrome" Plotly template (plotly_dark plus the #2A2A2A backgrounds
+# and grey font), so figures pass template=figures.MONOCHROME instead of
+# repeating update_layout(template=..., plot_bgcolor=..., paper_bgcolor=...,
+# font=...) per figure. MONOCHROME_CSS is the matching Streamlit stylesheet.
+# The template is built on first access to figures.MONOCHROME: building it
+# initialises plotly's validators (~0.1 s), which should not be paid at import.
+#
+# optimize() is applied to every figure right before it is handed to
+# st.plotly_chart / dcc.Graph:
+#   - scatter-type traces above GL_POINT_THRESHOLD points (including animation
+#     frames) are rebuilt as their WebGL variants, so the browser draws them on
+#     the GPU instead of creating one SVG node per point;
+#   - numeric arrays held as Python lists are turned into NumPy arrays, which
+#     plotly >= 6 serializes as base64 typed arrays ({"dtype", "bdata"})
+#     instead of JSON number lists;
+#   - the template's per-trace-type defaults are trimmed to the trace types the
+#     figure actually uses, and its 3D/polar/geo/ternary/map subplot defaults
+#     are dropped unless such a trace is present, instead of shipping defaults
+#     for every chart type with every figure.
+
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+MONOCHROME_NAME = "monochrome"
+BACKGROUND = "#2A2A2A"
+FONT_COLOR = "#D3D3D3"
+
+GL_POINT_THRESHOLD = int(os.environ.get("PLOTLY_GL_THRESHOLD", "5000"))
+GL_TRACE_TYPES = {"scatter": go.Scattergl, "scatterpolar": go.Scatterpolargl}
+ARRAY_PROPERTIES = ("x", "y", "z", "r", "theta", "values", "lat", "lon", "open", "high", "low", "close")
+MARKER_ARRAY_PROPERTIES = ("size", "color")
+# Template layout sections only needed when a trace of one of these types is drawn
+SUBPLOT_TRACE_TYPES = {
+    "scene": {"scatter3d", "surface", "mesh3d", "cone", "streamtube", "volume", "isosurface"},
+    "polar": {"scatterpolar", "scatterpolargl", "barpolar"},
+    "ternary": {"scatterternary"},
+    "geo": {"scattergeo", "choropleth"},
+    "mapbox": {"scattermapbox", "choroplethmapbox", "densitymapbox"},
+}
+
+MONOCHROME_CSS = """
+    <style>
+        body, .stApp {
+            background-color: #1C1C1C;
+            color: #D3D3D3;
+            font-family: 'Segoe UI', sans-serif;
+        }
+        .stSelectbox, .stMultiselect, .stRadio, .stMetric, .stDownloadButton, .stTextInput {
+            background-color: #2A2A2A;
+            color: #D3D3D3;
+            border: 1px solid #4A4A4A;
+            border-radius: 0.3rem;
+            padding: 0.5rem;
+        }
+        .stMetricLabel {
+            color: #A9A9A9 !important;
+            font-size: 0.9rem;
+        }
+        .stMetricValue {
+            font-size: 1.5rem;
+            font-weight: bold;
+            color: #FFFFFF;
+        }
+        .stButton>button {
+            background-color: #4A4A4A;
+            color: #D3D3D3;
+            border: 1px solid #606060;
+            border-radius: 0.3rem;
+            padding: 0.5rem 1rem;
+            transition: background-color 0.3s;
+        }
+        .stButton>button:hover {
+            background-color: #606060;
+            color: #FFFFFF;
+        }
+        .css-1d391kg {
+            background-color: #2A2A2A;
+            border: 1px solid #4A4A4A;
+            border-radius: 0.5rem;
+            padding: 1rem;
+        }
+        .stDataFrame, .element-container {
+            color: #D3D3D3;
+            background-color: #2A2A2A;
+            border: 1px solid #4A4A4A;
+            border-radius: 0.5rem;
+            padding: 1rem;
+        }
+        .stTabs [data-baseweb="tab"] {
+            background-color: #2A2A2A;
+            color: #D3D3D3;
+            border: 1px solid #4A4A4A;
+            border-radius: 0.3rem;
+            margin: 0.2rem;
+        }
+        .stTabs [data-baseweb="tab"]:hover {
+            background-color: #3A3A3A;
+            color: #FFFFFF;
+        }
+        .stTabs [data-baseweb="tab"][aria-selected="true"] {
+            background-color: #4A4A4A;
+            color: #FFFFFF;
+        }
+        footer {visibility: hidden;}
+        .section-header {
+            color: #D3D3D3;
+            border-bottom: 2px solid #606060;
+            padding-bottom: 0.5rem;
+            margin-bottom: 1rem;
+        }
+        hr {
+            border-color: #4A4A4A;
+        }
+    </style>
+"""
+
+
+def _register_templates():
+    template = go.layout.Template(pio.templates["plotly_dark"])
+    template.layout.update(plot_bgcolor=BACKGROUND, paper_bgcolor=BACKGROUND, font=dict(color=FONT_COLOR))
+    pio.templates[MONOCHROME_NAME] = template
+
+
+def __getattr__(name):
+    if name == "MONOCHROME":
+        _register_templates()
+        globals()["MONOCHROME"] = MONOCHROME_NAME
+        return MONOCHROME_NAME
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def trace_points(trace):
+    for prop in ("x", "y", "r", "z"):
+        values = trace[prop] if prop in trace else None
+        if values is not None:
+            return len(values)
+    return 0
+
+
+def _can_use_webgl(trace):
+    # WebGL scatter has no stacking or spline smoothing
+    if trace.type not in GL_TRACE_TYPES or getattr(trace, "stackgroup", None):
+        return False
+    line = getattr(trace, "line", None)
+    return not (line is not None and line.shape in ("spline", "hv", "vh", "hvh", "vhv"))
+
+
+def _to_webgl(traces, indices):
+    converted = []
+    for i, trace in enumerate(traces):
+        if i in indices and trace.type in GL_TRACE_TYPES:
+            spec = trace.to_plotly_json()
+            spec.pop("type", None)
+            trace = GL_TRACE_TYPES[trace.type](spec, skip_invalid=True)
+        converted.append(trace)
+    return converted
+
+
+def _numeric_list(values):
+    return (
+        isinstance(values, (list, tuple))
+        and len(values) > 0
+        and all(isinstance(v, (int, float, np.number)) and not isinstance(v, bool) for v in values)
+    )
+
+
+def _set_array(obj, prop):
+    values = np.asarray(obj[prop])
+    # plotly skips assigning a value equal to the current one, so the list would stay a list
+    obj[prop] = None
+    obj[prop] = values
+
+
+def _encode_arrays(trace):
+    for prop in ARRAY_PROPERTIES:
+        if prop in trace and _numeric_list(trace[prop]):
+            _set_array(trace, prop)
+    marker = trace["marker"] if "marker" in trace else None
+    if marker is not None:
+        for prop in MARKER_ARRAY_PROPERTIES:
+            if prop in marker and _numeric_list(marker[prop]):
+                _set_array(marker, prop)
+
+
+def _compact_template(fig):
+    template = fig.layout.template
+    if template is None or template.data is None:
+        return
+    used = {trace.type for trace in fig.data}
+    for frame in fig.frames or ():
+        used.update(trace.type for trace in frame.data or ())
+    trimmed = {
+        trace_type: defaults
+        for trace_type, defaults in template.data.to_plotly_json().items()
+        if trace_type in used
+    }
+    layout = template.layout.to_plotly_json()
+    for section, trace_types in SUBPLOT_TRACE_TYPES.items():
+        if not used & trace_types:
+            layout.pop(section, None)
+    fig.layout.template = go.layout.Template(layout=layout, data=trimmed)
+
+
+def optimize(fig, gl_threshold=GL_POINT_THRESHOLD):
+    """Switch large traces to WebGL, encode numeric arrays compactly and trim the template.
+
+    Returns the optimized figure, which is a new object when traces were converted.
+    """
+    frames = list(fig.frames or ())
+    # Decide per trace slot so a trace keeps one type across all animation frames
+    sizes = [trace_points(trace) for trace in fig.data]
+    for frame in frames:
+        for i, trace in enumerate(frame.data or ()):
+            if i < len(sizes):
+                sizes[i] = max(sizes[i], trace_points(trace))
+    to_gl = {i for i, trace in enumerate(fig.data) if _can_use_webgl(trace) and sizes[i] > gl_threshold}
+    if to_gl:
+        frames = [
+            go.Frame(frame.to_plotly_json() | {"data": _to_webgl(frame.data or (), to_gl)}) for frame in frames
+        ]
+        fig = go.Figure(data=_to_webgl(fig.data, to_gl), layout=fig.layout, frames=frames)
+    for trace in fig.data:
+        _encode_arrays(trace)
+    for frame in fig.frames or ():
+        for trace in frame.data or ():
+            _encode_arrays(trace)
+    _compact_template(fig)
+    return fig
+
+
+def payload_bytes(fig):
+    """Size of the JSON the browser receives for fig."""
+    return len(pio.to_json(fig, validate=False).encode("utf-8"))
@@ -0,0 +1,229 @@
+# Forecasting service for the dashboards.
+#
+# Prophet models are fitted per series in a background process pool and the
+# fitted model plus its forecast are persisted on disk, keyed by a fingerprint
+# of the input series. Dashboards only ever call get_forecast(), which reads
+# the cache and schedules a fit when nothing is cached yet, so a Stan fit never
+# blocks a page render. engine="fast" answers inline from the vectorized
+# forecaster in fast_forecast.py instead, and fallback="fast" uses it while a
+# Prophet fit is still pending.
+
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import fast_forecast
+
+CACHE_DIR = os.environ.get(
+    "FORECAST_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".forecast_cache"),
+)
+MAX_WORKERS = int(os.environ.get("FORECAST_WORKERS", "2"))
+MIN_HISTORY = 4
+CACHE_VERSION = "1"
+ENGINES = ("prophet", "fast")
+DEFAULT_ENGINE = os.environ.get("FORECAST_ENGINE", "prophet")
+# a failed fit is retried after this long; new data is a new series key and is fitted at once
+RETRY_SECONDS = float(os.environ.get("FORECAST_RETRY_SECONDS", "3600"))
+
+_executor = None
+_pending = {}
+_lock = threading.Lock()
+
+
+# ----------------- Series Preparation -----------------
+def quarterly_history(trend_df, value_col, year_col="YEAR_ID", qtr_col="QTR_ID"):
+    """DBT quarterly trend (YEAR_ID/QTR_ID rows) -> Prophet ds/y frame."""
+    periods = pd.PeriodIndex(
+        trend_df[year_col].astype(str) + "Q" + trend_df[qtr_col].astype(str), freq="Q"
+    )
+    history = pd.DataFrame({"ds": periods.to_timestamp(), "y": trend_df[value_col].to_numpy()})
+    return history.sort_values("ds").reset_index(drop=True)
+
+
+def monthly_history(monthly_df, value_col, month_col="Month"):
+    """DV2 monthly groupby ('YYYY-MM' rows) -> Prophet ds/y frame."""
+    periods = pd.PeriodIndex(monthly_df[month_col].astype(str), freq="M")
+    history = pd.DataFrame({"ds": periods.to_timestamp(), "y": monthly_df[value_col].to_numpy()})
+    return history.sort_values("ds").reset_index(drop=True)
+
+
+def series_key(name, history, periods, freq):
+    """Cache key: series name plus a fingerprint of its data and horizon."""
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(history[["ds", "y"]], index=False).to_numpy().tobytes())
+    digest.update(f"{periods}|{freq}|{CACHE_VERSION}".encode())
+    return f"{name}-{digest.hexdigest()[:20]}"
+
+
+# ----------------- Cache Storage -----------------
+def _path(key, suffix):
+    return os.path.join(CACHE_DIR, f"{key}.{suffix}")
+
+
+def _write_atomic(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(text)
+    os.replace(tmp, path)
+
+
+def read_cached_forecast(key):
+    path = _path(key, "forecast.csv")
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path, parse_dates=["ds"])
+
+
+def load_cached_model(key):
+    """Return the fitted Prophet model for a key, or None if it was never fitted."""
+    path = _path(key, "model.json")
+    if not os.path.exists(path):
+        return None
+    from prophet.serialize import model_from_json
+    with open(path, encoding="utf-8") as fh:
+        return model_from_json(fh.read())
+
+
+# ----------------- Background Fitting -----------------
+def _record_failure(key, exc):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    _write_atomic(_path(key, "error"), json.dumps({"error": repr(exc)}))
+
+
+def _fit_prophet(key, history, periods, freq):
+    # Runs inside a worker process; prophet is only imported here.
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    try:
+        # inside the try: a missing prophet is a failed fit, not a fit to retry on every rerun
+        from prophet import Prophet
+        from prophet.serialize import model_to_json
+
+        model = Prophet(weekly_seasonality=False, daily_seasonality=False)
+        model.fit(history)
+        future = model.make_future_dataframe(periods=periods, freq=freq)
+        forecast = model.predict(future)[["ds", "yhat", "yhat_lower", "yhat_upper"]]
+    except Exception as exc:
+        _record_failure(key, exc)
+        raise
+    _write_atomic(_path(key, "model.json"), model_to_json(model))
+    _write_atomic(_path(key, "forecast.csv"), forecast.to_csv(index=False))
+    return key
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # spawn keeps the Streamlit/Dash server threads out of the workers
+        _executor = ProcessPoolExecutor(
+            max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def _fit_done(key, future):
+    # collect the outcome; a worker that died without writing its marker is recorded here
+    exc = None if future.cancelled() else future.exception()
+    if exc is not None and not os.path.exists(_path(key, "error")):
+        _record_failure(key, exc)
+    with _lock:
+        _pending.pop(key, None)
+
+
+def submit_fit(key, history, periods, freq):
+    """Schedule a background fit for key unless one is already running."""
+    with _lock:
+        if key in _pending:
+            return _pending[key]
+        future = _get_executor().submit(_fit_prophet, key, history, periods, freq)
+        _pending[key] = future
+    future.add_done_callback(lambda done: _fit_done(key, done))
+    return future
+
+
+def forecast_status(key):
+    if os.path.exists(_path(key, "forecast.csv")):
+        return "ready"
+    with _lock:
+        if key in _pending:
+            return "pending"
+    error = _path(key, "error")
+    try:
+        if time.time() - os.path.getmtime(error) < RETRY_SECONDS:
+            return "failed"
+        # the failure may have been transient (a killed worker, a package installed since)
+        os.remove(error)
+    except FileNotFoundError:
+        pass
+    return "missing"
+
+
+def get_forecast(name, history, periods, freq, engine=None, fallback=None):
+    """Return the forecast for this series, or None while it is being fitted.
+
+    history is a Prophet ds/y frame (see quarterly_history/monthly_history),
+    freq is the pandas offset for future periods ('QS', 'MS'). The Prophet
+    engine never fits inline; fallback="fast" answers from the vectorized
+    forecaster until the Prophet fit lands. The returned frame carries an
+    `engine` column saying which one produced it, and a `status` column: for a
+    fallback forecast, whether the Prophet fit is "pending" or has "failed"
+    (retried after RETRY_SECONDS), otherwise "ready".
+    """
+    engine = engine or DEFAULT_ENGINE
+    if engine not in ENGINES or (fallback and fallback not in ENGINES):
+        raise ValueError(f"Unknown forecast engine {engine!r}/{fallback!r}; expected one of {ENGINES}")
+    history = history.dropna(subset=["ds", "y"])
+    if len(history) < MIN_HISTORY:
+        return None
+    if engine == "fast":
+        return fast_forecast.forecast_series(history, periods, freq).assign(engine="fast", status="ready")
+    key = series_key(name, history, periods, freq)
+    forecast = read_cached_forecast(key)
+    if forecast is not None:
+        return forecast.assign(engine="prophet", status="ready")
+    status = forecast_status(key)
+    if status == "missing":
+        submit_fit(key, history, periods, freq)
+        status = "pending"
+    if fallback == "fast":
+        return fast_forecast.forecast_series(history, periods, freq).assign(engine="fast", status=status)
+    return None
+
+
+def get_member_forecasts(name, panel, periods, freq, engine="fast", future_only=True):
+    """Forecast every member column of a wide panel (see fast_forecast.member_panel).
+
+    Returns a long member/ds/yhat/yhat_lower/yhat_upper frame. The fast engine
+    fits all members in one matrix pass; the Prophet engine returns only the
+    members whose background fits are already cached.
+    """
+    if engine == "fast":
+        if len(panel.index) < MIN_HISTORY:
+            return pd.DataFrame(columns=["member", "ds", "yhat", "yhat_lower", "yhat_upper"])
+        return fast_forecast.forecast_panel(panel, periods, freq, future_only=future_only)
+    frames = []
+    for member in panel.columns:
+        history = pd.DataFrame({"ds": panel.index, "y": panel[member].to_numpy()})
+        forecast = get_forecast(f"{name}-{member}", history, periods, freq, engine=engine)
+        if forecast is not None:
+            if future_only:
+                forecast = forecast[forecast["ds"] > history["ds"].max()]
+            frames.append(forecast.drop(columns=["engine", "status"]).assign(member=member))
+    if not frames:
+        return pd.DataFrame(columns=["member", "ds", "yhat", "yhat_lower", "yhat_upper"])
+    return pd.concat(frames, ignore_index=True)[["member", "ds", "yhat", "yhat_lower", "yhat_upper"]]
+
+
+def shutdown(wait=False):
+    global _executor
+    with _lock:
+        _pending.clear()
+    if _executor is not None:
+        _executor.shutdown(wait=wait, cancel_futures=not wait)
+        _executor = None
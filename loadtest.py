@@ -0,0 +1,474 @@
+# Load test: simulated analysts against a running dashboard server.
+#
+# Each simulated user repeatedly picks a random filter state and waits for the
+# server to answer it, back to back (plus optional think time):
+#   - dash: changes one random slicer (quarter / years / metric, with values
+#     read from the app's own /_dash-layout and /_dash-dependencies) and POSTs
+#     to /_dash-update-component for every callback that change fires, the way
+#     the browser does, with the other inputs and states at their layout
+#     values (JV1.py, V1.py);
+#   - streamlit: opens a session on the /_stcore/stream websocket, runs the
+#     script once, then sends rerun requests with random multiselect /
+#     selectbox / radio states and times each rerun to its script_finished
+#     message (FPLPOC.py, CarDemo.py, ...).
+# It reports p50/p95/p99 latency and throughput per request kind, and a
+# timeline of throughput, p95 and server RSS (the process tree of --pid, or of
+# the server started with --launch; read from /proc, so Linux only).
+#
+#   python loadtest.py dash --launch JV1.py --users 20 --duration 60
+#   python loadtest.py streamlit --url http://127.0.0.1:8501 --pid 4321 --users 10
+#
+# The Streamlit driver uses the streamlit protobufs and tornado's websocket
+# client, both installed with streamlit; the Dash driver needs only the stdlib.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_URLS = {"dash": "http://127.0.0.1:8050", "streamlit": "http://127.0.0.1:8501"}
+PERCENTILES = [50, 95, 99]
+
+
+# ----------------- Measurements -----------------
+class Recorder:
+    """Thread-safe log of (seconds since start, kind, latency seconds, ok)."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self._rows = []
+        self._lock = threading.Lock()
+
+    def add(self, kind, started, ok):
+        now = time.perf_counter()
+        with self._lock:
+            self._rows.append((now - self.start, kind, now - started, ok))
+
+    def frame(self):
+        with self._lock:
+            rows = list(self._rows)
+        return pd.DataFrame(rows, columns=["t", "kind", "latency", "ok"])
+
+
+def process_rss(pid):
+    """Resident set size (bytes) of pid and all its descendants, from /proc."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="utf-8") as fh:
+                # the ppid follows the parenthesised command name
+                ppid = int(fh.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status", encoding="utf-8") as fh:
+                for line in fh:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+class RssSampler(threading.Thread):
+    """Samples the server's RSS every interval seconds until stopped."""
+
+    def __init__(self, pid, start, interval=1.0):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.start_time = start
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.samples.append((time.perf_counter() - self.start_time, process_rss(self.pid)))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def frame(self):
+        return pd.DataFrame(self.samples, columns=["t", "rss"])
+
+
+def summarize(requests, elapsed):
+    """Count, errors, latency percentiles (ms) and throughput per request kind."""
+    rows = []
+    for kind, group in requests.groupby("kind", sort=False):
+        ok = group.loc[group["ok"], "latency"].to_numpy() * 1000
+        row = {"kind": kind, "requests": len(group), "errors": int((~group["ok"]).sum())}
+        for p, value in zip(PERCENTILES, np.percentile(ok, PERCENTILES) if len(ok) else [np.nan] * len(PERCENTILES)):
+            row[f"p{p}_ms"] = value
+        row["throughput_rps"] = len(ok) / elapsed
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def timeline(requests, rss, interval):
+    """Per-interval throughput, p95 latency and server RSS."""
+    buckets = (requests["t"] // interval).astype(int)
+    grouped = requests[requests["ok"]].groupby(buckets[requests["ok"]])["latency"]
+    out = pd.DataFrame({
+        "requests": grouped.size(),
+        "rps": grouped.size() / interval,
+        "p95_ms": grouped.quantile(0.95) * 1000,
+    })
+    if rss is not None and len(rss):
+        out["rss_mb"] = rss.groupby((rss["t"] // interval).astype(int))["rss"].max() / 2**20
+    out.index = out.index * interval
+    out.index.name = "t_s"
+    return out
+
+
+# ----------------- Dash -----------------
+def _get_json(url, timeout):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.load(response)
+
+
+def _walk_layout(node, found):
+    """{component id: props} for every component with an id in a /_dash-layout tree."""
+    if isinstance(node, list):
+        for child in node:
+            _walk_layout(child, found)
+    elif isinstance(node, dict):
+        props = node.get("props", {})
+        if isinstance(props.get("id"), str):
+            found[props["id"]] = props
+        _walk_layout(props.get("children"), found)
+    return found
+
+
+def _choices(props):
+    """The values a user can pick for a Slider / Checklist / RadioItems / Dropdown."""
+    options = props.get("options")
+    if options:
+        return [o["value"] if isinstance(o, dict) else o for o in options]
+    if props.get("marks"):
+        return [_mark_value(mark) for mark in props["marks"]]
+    return [props.get("value")]
+
+
+def _mark_value(mark):
+    # slider marks are keyed by the value as a string
+    try:
+        return json.loads(mark)
+    except ValueError:
+        return mark
+
+
+class DashScenario:
+    """The app's callbacks, its slicers (year / quarter / metric) and the values to pick from."""
+
+    def __init__(self, url, timeout=30):
+        self.url = url.rstrip("/")
+        self.components = _walk_layout(_get_json(self.url + "/_dash-layout", timeout), {})
+        self.callbacks = [c for c in _get_json(self.url + "/_dash-dependencies", timeout) if c.get("inputs")]
+        # slicers: "value" inputs of components offering options or marks (not tables, stores or buttons)
+        self.slicers = list(dict.fromkeys(
+            i["id"] for c in self.callbacks for i in c["inputs"]
+            if i["property"] == "value" and len(_choices(self.components.get(i["id"], {}))) > 1
+        ))
+        if not self.slicers:
+            raise ValueError(f"{url}: the app has no slicer callbacks to drive")
+
+    def initial_selection(self):
+        """{(id, property): value} as first rendered, read from the layout."""
+        return {
+            (item["id"], item["property"]): self.components.get(item["id"], {}).get(item["property"])
+            for callback in self.callbacks for item in callback["inputs"] + callback.get("state", [])
+        }
+
+    def random_value(self, input_id, rng):
+        props = self.components.get(input_id, {})
+        values = _choices(props)
+        if isinstance(props.get("value"), list):
+            # multi-value inputs (year checklist): a random non-empty subset
+            return rng.sample(values, rng.randint(1, len(values)))
+        return rng.choice(values)
+
+    def request(self, callback, selection, changed):
+        """The /_dash-update-component body for callback with the current selection."""
+        def values(items):
+            return [{"id": i["id"], "property": i["property"], "value": selection[(i["id"], i["property"])]} for i in items]
+
+        output = callback["output"]
+        # multi-output callbacks are keyed "..a.figure...b.figure.."
+        parts = output[2:-2].split("...") if output.startswith("..") else [output]
+        outputs = [dict(zip(("id", "property"), part.rsplit(".", 1))) for part in parts]
+        return {
+            "output": output,
+            "outputs": outputs if output.startswith("..") else outputs[0],
+            "inputs": values(callback["inputs"]),
+            "changedPropIds": [changed],
+            # Dash passes the state after the inputs: every State the callback declares must be sent
+            "state": values(callback.get("state", [])),
+        }
+
+    def random_requests(self, rng, selection):
+        """Change one random slicer in selection; the bodies of every callback that change fires."""
+        slicer = rng.choice(self.slicers)
+        selection[(slicer, "value")] = self.random_value(slicer, rng)
+        return [
+            self.request(callback, selection, f"{slicer}.value")
+            for callback in self.callbacks
+            if any(i["id"] == slicer and i["property"] == "value" for i in callback["inputs"])
+        ]
+
+
+def dash_user(scenario, recorder, deadline, seed, think=0.0, timeout=30):
+    rng = random.Random(seed)
+    # like a browser tab, each user keeps its own slicer values between changes
+    selection = scenario.initial_selection()
+    while time.perf_counter() < deadline:
+        for body in scenario.random_requests(rng, selection):
+            request = urllib.request.Request(
+                scenario.url + "/_dash-update-component", data=json.dumps(body).encode(),
+                headers={"Content-Type": "application/json"}
+            )
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    response.read()
+                ok = True
+            except OSError:
+                ok = False
+            recorder.add("callback", started, ok)
+        if think:
+            time.sleep(rng.uniform(0, 2 * think))
+
+
+def run_dash(url, users, duration, recorder, seed=0, think=0.0, ramp=0.0, timeout=30):
+    scenario = DashScenario(url, timeout)
+    deadline = recorder.start + duration
+
+    def user(i):
+        time.sleep(ramp * i / users)
+        dash_user(scenario, recorder, deadline, seed + i, think, timeout)
+
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user, range(users)))
+
+
+# ----------------- Streamlit -----------------
+class StreamlitSession:
+    """One browser tab: a websocket session that reruns the script with widget states."""
+
+    WIDGETS = ("multiselect", "selectbox", "radio")
+
+    def __init__(self, url, timeout=60):
+        parsed = urlparse(url)
+        scheme = "wss" if parsed.scheme == "https" else "ws"
+        self.ws_url = f"{scheme}://{parsed.netloc}{parsed.path.rstrip('/')}/_stcore/stream"
+        self.timeout = timeout
+        self.widgets = {}
+        self.page_script_hash = ""
+        self.connection = None
+
+    async def connect(self):
+        from tornado.websocket import websocket_connect
+
+        self.connection = await asyncio.wait_for(
+            websocket_connect(self.ws_url, subprotocols=["streamlit"]), self.timeout
+        )
+
+    async def rerun(self, widget_states=()):
+        """Request a script run and wait for it to finish; False if it errored or timed out."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.page_script_hash = self.page_script_hash
+        message.rerun_script.widget_states.widgets.extend(widget_states)
+        await self.connection.write_message(message.SerializeToString(), binary=True)
+        while True:
+            raw = await asyncio.wait_for(self.connection.read_message(), self.timeout)
+            if raw is None:
+                return False
+            forward = ForwardMsg()
+            forward.ParseFromString(raw)
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                self.page_script_hash = forward.new_session.page_script_hash
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                if element.WhichOneof("type") in self.WIDGETS:
+                    widget = getattr(element, element.WhichOneof("type"))
+                    self.widgets[widget.id] = widget
+            elif kind == "script_finished":
+                # FINISHED_WITH_COMPILE_ERROR is the only failure status
+                return forward.script_finished != 1
+
+    def random_states(self, rng):
+        """Random WidgetStates for every seen multiselect / selectbox / radio."""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        states = []
+        for widget_id, widget in self.widgets.items():
+            options = list(widget.options)
+            if not options:
+                continue
+            state = WidgetState(id=widget_id)
+            # newer Streamlit versions send labels (raw_value[s]); older ones send option indices
+            by_label = any(f.startswith("raw_value") for f in widget.DESCRIPTOR.fields_by_name)
+            if widget.DESCRIPTOR.name == "MultiSelect":
+                picked = sorted(rng.sample(range(len(options)), rng.randint(0, min(3, len(options)))))
+                if by_label:
+                    state.string_array_value.data.extend(options[i] for i in picked)
+                else:
+                    state.int_array_value.data.extend(picked)
+            else:
+                picked = rng.randrange(len(options))
+                if by_label:
+                    state.string_value = options[picked]
+                else:
+                    state.int_value = picked
+            states.append(state)
+        return states
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+async def streamlit_user(url, recorder, deadline, seed, think=0.0, timeout=60):
+    rng = random.Random(seed)
+    session = StreamlitSession(url, timeout)
+    started = time.perf_counter()
+    try:
+        await session.connect()
+        ok = await session.rerun()
+    except (OSError, asyncio.TimeoutError):
+        ok = False
+    recorder.add("session_start", started, ok)
+    try:
+        while ok and time.perf_counter() < deadline:
+            if think:
+                await asyncio.sleep(rng.uniform(0, 2 * think))
+            started = time.perf_counter()
+            try:
+                ok = await session.rerun(session.random_states(rng))
+            except (OSError, asyncio.TimeoutError):
+                ok = False
+            recorder.add("rerun", started, ok)
+    finally:
+        session.close()
+
+
+def run_streamlit(url, users, duration, recorder, seed=0, think=0.0, ramp=0.0, timeout=60):
+    deadline = recorder.start + duration
+
+    async def user(i):
+        await asyncio.sleep(ramp * i / users)
+        # a failed session is replaced by a new one, like a user reloading the tab
+        while time.perf_counter() < deadline:
+            await streamlit_user(url, recorder, deadline, seed + i, think, timeout)
+            await asyncio.sleep(1)
+
+    async def main():
+        await asyncio.gather(*(user(i) for i in range(users)))
+
+    asyncio.run(main())
+
+
+# ----------------- Server -----------------
+def launch(target, script, url):
+    """Start script as a server on url's port and wait until it accepts connections."""
+    port = urlparse(url).port
+    if target == "streamlit":
+        command = [sys.executable, "-m", "streamlit", "run", script, "--server.headless", "true", "--server.port", str(port)]
+    else:
+        # the Dash scripts call app.run_server() under __main__ on the default port 8050
+        command = [sys.executable, script]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"{script} exited with status {server.returncode}")
+        try:
+            with socket.create_connection((urlparse(url).hostname, port), timeout=1):
+                # give Streamlit/Dash a moment past the bind to register their routes
+                time.sleep(1)
+                return server
+        except OSError:
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"{script} did not start listening on port {port}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulated concurrent users against a dashboard server.")
+    parser.add_argument("target", choices=["dash", "streamlit"])
+    parser.add_argument("--url", help="server address (default: the framework's local default)")
+    parser.add_argument("--users", type=int, default=10, help="concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--ramp", type=float, default=0, help="seconds over which users join")
+    parser.add_argument("--think", type=float, default=0, help="mean think time between actions (s)")
+    parser.add_argument("--timeout", type=float, default=60, help="per-request timeout (s)")
+    parser.add_argument("--interval", type=float, default=5, help="timeline bucket (s)")
+    parser.add_argument("--pid", type=int, help="server process to sample RSS from")
+    parser.add_argument("--launch", metavar="SCRIPT", help="start SCRIPT as the server for the run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="write every request to this CSV")
+    args = parser.parse_args(argv)
+
+    url = args.url or DEFAULT_URLS[args.target]
+    server = launch(args.target, args.launch, url) if args.launch else None
+    pid = server.pid if server else args.pid
+    recorder = Recorder()
+    sampler = RssSampler(pid, recorder.start, min(1.0, args.interval)) if pid else None
+    if sampler:
+        sampler.start()
+    run = run_dash if args.target == "dash" else run_streamlit
+    try:
+        run(url, args.users, args.duration, recorder, args.seed, args.think, args.ramp, args.timeout)
+    finally:
+        elapsed = time.perf_counter() - recorder.start
+        if sampler:
+            sampler.stop()
+        if server:
+            server.terminate()
+            server.wait()
+
+    requests = recorder.frame()
+    if args.csv:
+        requests.to_csv(args.csv, index=False)
+    rss = sampler.frame() if sampler else None
+    print(f"{args.target} {url}: {args.users} users, {elapsed:.1f} s")
+    if requests.empty:
+        print("no requests completed")
+        return
+    print(summarize(requests, elapsed).round(1).to_string(index=False))
+    print()
+    print(timeline(requests, rss, args.interval).round(1).to_string())
+    if rss is not None and len(rss):
+        print(f"\nserver RSS: start {rss['rss'].iloc[0] / 2**20:.0f} MB, peak {rss['rss'].max() / 2**20:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+# Per-session memory accounting for the Streamlit dashboards.
+#
+# Every session reruns its script top to bottom and keeps whatever the script
+# leaves bound (filtered frames, figures, CSV export bytes, session_state)
+# until its next rerun, so the host's memory grows with the number of open
+# sessions. With MEMORY_PROFILE=1 each script brackets its rerun with
+# begin_rerun() / render(globals()):
+#   - begin_rerun() opens a window in which a background thread samples the
+#     process RSS, giving the process-level peak RSS during that rerun;
+#   - render() sizes every DataFrame / Series / array / figure / bytes object
+#     the rerun left in its namespace or session_state, records the footprint
+#     for this session, and shows this session's objects plus a table of all
+#     live sessions, flagging those over SESSION_MEMORY_BUDGET_MB.
+# Objects that are shared by all sessions (the cache_resource frames in
+# dashboard_cache) are registered with shared() and left out of the totals.
+# With MEMORY_PROFILE unset both calls return immediately.
+
+import os
+import sys
+import threading
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+import views
+
+MEMORY_PROFILE = os.environ.get("MEMORY_PROFILE", "") not in ("", "0")
+SESSION_BUDGET_MB = float(os.environ.get("SESSION_MEMORY_BUDGET_MB", "256"))
+SAMPLE_INTERVAL = 0.05
+# Sessions not rerun for this long are assumed closed and dropped from the report
+SESSION_TTL = 3600
+
+_shared = {}
+_sessions = {}
+_lock = threading.Lock()
+
+
+# ----------------- Sizing -----------------
+def current_rss():
+    """Resident set size of this process in bytes (0 where /proc is unavailable)."""
+    try:
+        with open("/proc/self/status", encoding="utf-8") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def shared(obj):
+    """Mark obj as held once per process (not per session); returns obj."""
+    try:
+        _shared[id(obj)] = weakref.ref(obj)
+    except TypeError:
+        # not weak-referenceable; keep it alive rather than risk a reused id
+        _shared[id(obj)] = lambda obj=obj: obj
+    return obj
+
+
+def is_shared(obj):
+    ref = _shared.get(id(obj))
+    return ref is not None and ref() is obj
+
+
+def object_kind(obj):
+    if isinstance(obj, pd.DataFrame):
+        return "DataFrame"
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return "Series"
+    if isinstance(obj, np.ndarray):
+        return "array"
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return "bytes"
+    if isinstance(obj, views.FilteredView):
+        return "view"
+    if hasattr(obj, "to_plotly_json"):
+        return "figure"
+    return None
+
+
+def object_bytes(obj):
+    """Memory held by obj: deep pandas usage, array/buffer size, or a figure's JSON payload."""
+    kind = object_kind(obj)
+    if kind == "DataFrame":
+        return int(obj.memory_usage(deep=True).sum())
+    if kind == "Series":
+        return int(obj.memory_usage(deep=True))
+    if kind == "array":
+        return obj.nbytes
+    if kind == "bytes":
+        return obj.nbytes if isinstance(obj, memoryview) else len(obj)
+    if kind == "view":
+        return obj.nbytes()
+    if kind == "figure":
+        import figures
+
+        return figures.payload_bytes(obj)
+    return sys.getsizeof(obj)
+
+
+def namespace_objects(namespace, session_state=None):
+    """One row per distinct sizeable object in a script namespace (and session_state)."""
+    named = {}
+    items = [(name, value) for name, value in namespace.items() if not name.startswith("_")]
+    if session_state is not None:
+        items += [(f"session_state[{key!r}]", value) for key, value in session_state.items()]
+    for name, value in items:
+        kind = object_kind(value)
+        if kind is None or is_shared(value):
+            continue
+        entry = named.setdefault(id(value), {"names": [], "kind": kind, "object": value})
+        entry["names"].append(name)
+    rows = [
+        {"object": ", ".join(entry["names"]), "kind": entry["kind"], "bytes": object_bytes(entry["object"])}
+        for entry in named.values()
+    ]
+    return pd.DataFrame(rows, columns=["object", "kind", "bytes"]).sort_values("bytes", ascending=False)
+
+
+# ----------------- RSS sampling -----------------
+class _RssWatch(threading.Thread):
+    """Samples RSS while any rerun window is open and tracks each window's peak."""
+
+    def __init__(self):
+        super().__init__(daemon=True, name="memory-profile-rss")
+        self.windows = {}
+        self._wake = threading.Event()
+
+    def open(self, token):
+        with _lock:
+            self.windows[token] = current_rss()
+        self._wake.set()
+
+    def close(self, token):
+        rss = current_rss()
+        with _lock:
+            return max(self.windows.pop(token, rss), rss)
+
+    def run(self):
+        while True:
+            self._wake.wait()
+            rss = current_rss()
+            with _lock:
+                for token, peak in self.windows.items():
+                    self.windows[token] = max(peak, rss)
+                if not self.windows:
+                    self._wake.clear()
+            time.sleep(SAMPLE_INTERVAL)
+
+
+_watch = None
+
+
+def _rss_watch():
+    global _watch
+    with _lock:
+        if _watch is None:
+            _watch = _RssWatch()
+            _watch.start()
+    return _watch
+
+
+# ----------------- Sessions -----------------
+def session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return "main"
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "main"
+
+
+def begin_rerun():
+    """Start this session's rerun window (call near the top of the script)."""
+    if not MEMORY_PROFILE:
+        return
+    session = session_id()
+    token = (session, time.perf_counter())
+    with _lock:
+        footprint = _sessions.setdefault(session, {"reruns": 0})
+        # a rerun that stopped early (st.stop, exception) never closed its window
+        stale = footprint.get("token")
+        footprint["token"] = token
+        footprint["rss_start"] = current_rss()
+    watch = _rss_watch()
+    if stale:
+        watch.close(stale)
+    watch.open(token)
+
+
+def end_rerun(namespace, session_state=None):
+    """Record what this rerun left in memory; returns (objects, footprint) or None when disabled."""
+    if not MEMORY_PROFILE:
+        return None
+    session = session_id()
+    objects = namespace_objects(namespace, session_state)
+    with _lock:
+        footprint = _sessions.setdefault(session, {"reruns": 0, "rss_start": current_rss()})
+        token = footprint.pop("token", None)
+    peak = _rss_watch().close(token) if token else current_rss()
+    with _lock:
+        footprint.update({
+            "reruns": footprint["reruns"] + 1,
+            "objects_bytes": int(objects["bytes"].sum()),
+            "peak_rss": peak,
+            "rss_growth": peak - footprint["rss_start"],
+            "last_rerun": time.time(),
+        })
+    return objects, footprint
+
+
+def report():
+    """One row per live session: object footprint, last rerun's peak RSS, budget flag."""
+    now = time.time()
+    with _lock:
+        for session in [s for s, f in _sessions.items() if now - f.get("last_rerun", now) > SESSION_TTL]:
+            del _sessions[session]
+        rows = [
+            {"session": session, **{k: v for k, v in footprint.items() if k not in ("token", "rss_start")}}
+            for session, footprint in _sessions.items() if "last_rerun" in footprint
+        ]
+    out = pd.DataFrame(rows, columns=["session", "reruns", "objects_bytes", "peak_rss", "rss_growth", "last_rerun"])
+    out["over_budget"] = out["objects_bytes"] > SESSION_BUDGET_MB * 2**20
+    return out.sort_values("objects_bytes", ascending=False)
+
+
+def _mb(values):
+    return (values / 2**20).round(1)
+
+
+def render(namespace):
+    """End the rerun window and show the memory panel (call at the end of the script)."""
+    if not MEMORY_PROFILE:
+        return
+    import streamlit as st
+
+    objects, footprint = end_rerun(namespace, st.session_state)
+    sessions = report()
+    with st.expander(f"🧠 Memory: this session {footprint['objects_bytes'] / 2**20:,.1f} MB, "
+                     f"peak RSS {footprint['peak_rss'] / 2**20:,.0f} MB"):
+        if footprint["objects_bytes"] > SESSION_BUDGET_MB * 2**20:
+            st.warning(f"This session holds more than its {SESSION_BUDGET_MB:,.0f} MB budget.")
+        st.dataframe(objects.assign(MB=_mb(objects["bytes"])).drop(columns="bytes"), use_container_width=True)
+        over = int(sessions["over_budget"].sum())
+        st.caption(f"{len(sessions)} live session(s) in this process, {over} over budget; "
+                   f"process RSS {current_rss() / 2**20:,.0f} MB")
+        st.dataframe(
+            sessions.assign(
+                objects_mb=_mb(sessions["objects_bytes"]),
+                peak_rss_mb=_mb(sessions["peak_rss"]),
+                rss_growth_mb=_mb(sessions["rss_growth"]),
+            )[["session", "reruns", "objects_mb", "peak_rss_mb", "rss_growth_mb", "over_budget"]],
+            use_container_width=True,
+        )
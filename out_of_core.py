@@ -0,0 +1,248 @@
+# Out-of-core analytics for DV2 sales histories larger than RAM.
+#
+# The dashboards' filter -> groupby -> top-N/pivot/trend queries are expressed
+# as mergeable partial aggregates (per-group metric sums and row counts). scan()
+# streams a CSV or Parquet source chunk by chunk, filters each chunk, folds its
+# partials into a running result and drops the chunk, so memory is bounded by
+# the chunk size plus the number of groups. aggregate_frame() builds the same
+# partials from an in-memory frame, and the helpers at the bottom turn either
+# into the small frames the charts consume.
+
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+import data_sources
+import schemas
+from data_sources import DV2_METRICS
+
+CHUNK_ROWS = int(os.environ.get("DV2_CHUNK_ROWS", "250000"))
+COMPACT_EVERY = 8
+# bytes of CSV rows parsed at a time when reading a byte range (appended rows)
+RANGE_BLOCK_BYTES = 64 << 20
+
+SCAN_COLUMNS = ["Date", "Salesperson", "Car Make", "Car Model", "Car Year", *DV2_METRICS]
+SLICER_COLUMNS = ["Salesperson", "Car Make", "Car Year"]
+OPTION_COLUMNS = SLICER_COLUMNS + ["Car Model"]
+
+GROUPINGS = {
+    "salesperson": ["Salesperson"],
+    "make": ["Car Make"],
+    "model": ["Car Model"],
+    "make_model": ["Car Make", "Car Model"],
+    # month grain with its quarter: one groupby feeds every time-based chart (see period_table)
+    "period": ["Quarter", "Month"],
+    "salesperson_make": ["Salesperson", "Car Make"],
+    "salesperson_month": ["Salesperson", "Month"],
+}
+
+
+# ----------------- Chunk Sources -----------------
+def _prepare(chunk):
+    data_sources.clean_dv2_columns(chunk)
+    if 'Date' in chunk.columns:
+        data_sources.add_dv2_periods(chunk)
+    return chunk
+
+
+def _csv_range(source, columns, chunksize, start, end):
+    # the header line followed by whole rows from start until at least end, one block at a time
+    with open(source, "rb") as fh:
+        header = fh.readline()
+        fh.seek(max(start, len(header)))
+        while end is None or fh.tell() < end:
+            lines = fh.readlines(RANGE_BLOCK_BYTES if end is None else min(RANGE_BLOCK_BYTES, end - fh.tell()))
+            if not lines:
+                break
+            block = io.BytesIO(header + b"".join(lines))
+            for chunk in schemas.DV2.read_csv(block, columns=columns, chunksize=chunksize):
+                yield _prepare(chunk)
+
+
+def iter_chunks(source, columns=SCAN_COLUMNS, chunksize=CHUNK_ROWS, start=0, end=None):
+    """Yield prepared DV2 chunks (only `columns`) from a CSV or Parquet file/URL.
+
+    start/end restrict a local CSV to the rows stored between two byte offsets
+    (see data_version.Folded).
+    """
+    wanted = set(columns)
+    if (start or end is not None) and "://" not in str(source) and not str(source).endswith(".parquet"):
+        yield from _csv_range(source, columns, chunksize, start, end)
+    elif str(source).endswith(".parquet"):
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(source)
+        names = [c for c in parquet.schema_arrow.names if data_sources.clean_header(c) in wanted]
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=names):
+            yield _prepare(batch.to_pandas())
+    else:
+        # Header matching and dtypes come from the DV2 schema
+        for chunk in schemas.DV2.read_csv(source, columns=columns, chunksize=chunksize):
+            yield _prepare(chunk)
+
+
+def filter_mask(frame, filters):
+    """Combine {column: allowed values} predicates into one boolean array.
+
+    None means "no filter" on that column; a list (even an empty one) must match.
+    """
+    mask = np.ones(len(frame), dtype=bool)
+    for column, values in filters.items():
+        if values is not None:
+            mask &= frame[column].isin(values).to_numpy()
+    return mask
+
+
+# ----------------- Partial Aggregates -----------------
+def aggregate_frame(frame, groupings=GROUPINGS, metrics=DV2_METRICS):
+    """Per-grouping metric sums and row counts for one (already filtered) frame."""
+    metrics = list(metrics)
+    results = {"total": frame[metrics].sum().to_frame().T.assign(count=len(frame))}
+    for name, keys in groupings.items():
+        grouped = frame.groupby(keys, observed=True)
+        results[name] = grouped[metrics].sum().join(grouped.size().rename("count"))
+    return results
+
+
+def merge_results(parts):
+    """Fold a list of aggregate_frame() results into one."""
+    merged = {"total": pd.concat([p["total"] for p in parts]).sum().to_frame().T}
+    for name in parts[0]:
+        if name == "total":
+            continue
+        frames = [p[name] for p in parts]
+        merged[name] = pd.concat(frames).groupby(level=list(frames[0].index.names), observed=True).sum()
+    return merged
+
+
+def _empty_frame():
+    frame = pd.DataFrame({c: pd.Series(dtype=object) for c in SCAN_COLUMNS + ["Quarter", "Month"]})
+    frame[DV2_METRICS] = frame[DV2_METRICS].astype(float)
+    return frame
+
+
+def scan(source, filters, groupings=GROUPINGS, chunksize=CHUNK_ROWS):
+    """Stream `source`, apply filters and return merged partial aggregates."""
+    parts = []
+    for chunk in iter_chunks(source, chunksize=chunksize):
+        selected = chunk[filter_mask(chunk, filters)]
+        if selected.empty:
+            continue
+        parts.append(aggregate_frame(selected, groupings))
+        if len(parts) >= COMPACT_EVERY:
+            parts = [merge_results(parts)]
+    if not parts:
+        return aggregate_frame(_empty_frame(), groupings)
+    return merge_results(parts)
+
+
+def frame_filter_options(frame):
+    """Slicer option lists plus the make -> models mapping for one frame."""
+    options = {column: set(frame[column].dropna().unique()) for column in SLICER_COLUMNS}
+    pairs = frame[["Car Make", "Car Model"]].dropna().drop_duplicates()
+    models = {}
+    for make, model in pairs.itertuples(index=False):
+        models.setdefault(make, set()).add(model)
+    options["models"] = models
+    return options
+
+
+def finish_options(options):
+    finished = {column: sorted(options[column]) for column in SLICER_COLUMNS}
+    finished["models"] = {make: sorted(models) for make, models in options["models"].items()}
+    return finished
+
+
+def empty_options():
+    options = {column: set() for column in SLICER_COLUMNS}
+    options["models"] = {}
+    return options
+
+
+def fold_options(merged, chunk):
+    """Add one chunk's slicer values to merged (see empty_options) in place."""
+    options = frame_filter_options(chunk)
+    for column in SLICER_COLUMNS:
+        merged[column] |= options[column]
+    for make, models in options["models"].items():
+        merged["models"].setdefault(make, set()).update(models)
+    return merged
+
+
+def filter_options(source, chunksize=CHUNK_ROWS):
+    """Stream the slicer columns once and return sorted option lists."""
+    merged = empty_options()
+    for chunk in iter_chunks(source, columns=OPTION_COLUMNS, chunksize=chunksize):
+        fold_options(merged, chunk)
+    return finish_options(merged)
+
+
+def options_for_frame(frame):
+    return finish_options(frame_filter_options(frame))
+
+
+def sample_rows(source, filters, n=5000, seed=0, chunksize=CHUNK_ROWS):
+    """Uniform sample of up to n filtered rows, for row-level charts (bounded memory)."""
+    rng = np.random.default_rng(seed)
+    kept = None
+    for chunk in iter_chunks(source, chunksize=chunksize):
+        selected = chunk[filter_mask(chunk, filters)]
+        if selected.empty:
+            continue
+        selected = selected.assign(_sample_key=rng.random(len(selected)))
+        kept = selected if kept is None else pd.concat([kept, selected])
+        kept = kept.nsmallest(n, "_sample_key")
+    if kept is None:
+        return _empty_frame()
+    return kept.drop(columns="_sample_key").sort_values("Date").reset_index(drop=True)
+
+
+# ----------------- Chart Frames -----------------
+def kpis(results):
+    total = results["total"].iloc[0]
+    count = int(total["count"])
+    return {
+        "total_sales": total["Sale Price"],
+        "total_commission": total["Commission Earned"],
+        "avg_price": total["Sale Price"] / count if count else 0,
+        "transactions": count,
+    }
+
+
+def top_n(results, grouping, metric, n=10):
+    """Same frame as frame.groupby(keys)[metric].sum().nlargest(n).reset_index()."""
+    return results[grouping][metric].nlargest(n).reset_index()
+
+
+def period_table(results, metrics=DV2_METRICS):
+    """Monthly fact table (Quarter, Month, metrics, count) in time order, for one filter state.
+
+    Built once per rerun from the "period" partials; the KPI trend, the
+    quarterly trend, the animated monthly bar and the 3D animation frames all
+    read from it instead of grouping the fact rows again.
+    """
+    return results["period"][[*metrics, "count"]].sort_index(level="Month").reset_index()
+
+
+def period_trend(periods, period, metrics=DV2_METRICS):
+    """Same frame as frame.groupby(period)[metrics].sum().reset_index(), from period_table()."""
+    if period == "Month":
+        return periods[["Month", *metrics]]
+    return periods.groupby(period, observed=True)[list(metrics)].sum().reset_index()
+
+
+def pivot(results, grouping, metric):
+    """Same frame as pivot_table(values=metric, index=keys[0], columns=keys[1], aggfunc='sum', fill_value=0)."""
+    return results[grouping][metric].unstack(fill_value=0)
+
+
+def model_comparison(results):
+    grouped = results["make_model"]
+    comparison = pd.DataFrame({
+        'Avg Sale Price': grouped['Sale Price'] / grouped['count'],
+        'Total Sales': grouped['Sale Price'],
+        'Transaction Count': grouped['count'],
+        'Avg Commission': grouped['Commission Earned'] / grouped['count'],
+    }).round(2)
+    return comparison.reset_index()
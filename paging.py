@@ -0,0 +1,138 @@
+# Server-side paged tables.
+#
+# st.dataframe(frame) serializes every row and every cell to the browser, and a
+# pandas Styler formats each cell before anything is sent, so a 1M-patient
+# table costs a multi-megabyte payload and a full formatting pass on every
+# rerun. page_rows() sorts and slices on the server instead: sorting a page
+# only partially orders the selected rows (O(n) to find the page, then sorts
+# just the rows up to its end), and only that page is ever copied. format_page()
+# applies display formats to those rows alone. render() is the Streamlit
+# table: sort column, direction and page widgets above a one-page st.dataframe.
+#
+# Rows come from a DataFrame or a views.FilteredView (only its row positions
+# are used; nothing is materialized).
+
+import math
+
+import numpy as np
+import pandas as pd
+
+import views
+
+PAGE_SIZE = 50
+
+
+def _rows(data):
+    """(base frame, selected row positions or None for all rows)."""
+    if isinstance(data, views.FilteredView):
+        return data.base, data.index
+    return data, None
+
+
+def sort_key(values):
+    """Float keys that order a column's values, NaN for missing ones."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # pooled categories are in first-seen order, not label order
+        categories = values.cat.categories
+        ranks = np.empty(len(categories))
+        ranks[np.argsort(categories.to_numpy(), kind="stable")] = np.arange(len(categories))
+        codes = values.cat.codes.to_numpy()
+        return np.where(codes >= 0, ranks[codes] if len(ranks) else 0.0, np.nan)
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        keys = values.to_numpy(dtype="datetime64[ns]").view(np.int64).astype(float)
+        return np.where(values.isna().to_numpy(), np.nan, keys)
+    if pd.api.types.is_bool_dtype(values.dtype) or pd.api.types.is_numeric_dtype(values.dtype):
+        return values.to_numpy(dtype=float, na_value=np.nan)
+    codes, _ = pd.factorize(values, sort=True)
+    return np.where(codes >= 0, codes, np.nan).astype(float)
+
+
+def smallest(keys, k):
+    """Positions of the k smallest keys in order, ties broken by position."""
+    if k >= len(keys):
+        return np.argsort(keys, kind="stable")
+    threshold = np.partition(keys, k - 1)[k - 1]
+    below = np.flatnonzero(keys < threshold)
+    # of the rows tied at the threshold, the earliest ones fill the rest of the page
+    chosen = np.concatenate([below, np.flatnonzero(keys == threshold)[:k - len(below)]])
+    return chosen[np.argsort(keys[chosen], kind="stable")]
+
+
+def page_rows(data, page=0, size=PAGE_SIZE, sort=None, ascending=True, columns=None):
+    """(frame of the rows on page, total rows) for data sorted by column sort (None: data order)."""
+    base, rows = _rows(data)
+    total = len(base) if rows is None else len(rows)
+    start = min(page * size, total)
+    stop = min(start + size, total)
+    if sort is None:
+        positions = np.arange(start, stop)
+    else:
+        column = base[sort]
+        keys = sort_key(column if rows is None else column.take(rows))
+        # missing values last in either direction
+        keys = np.where(np.isnan(keys), np.inf, keys if ascending else -keys)
+        positions = smallest(keys, stop)[start:]
+    if rows is not None:
+        positions = rows[positions]
+    frame = base if columns is None else base[list(columns)]
+    return frame.take(positions), total
+
+
+def format_page(frame, formats=None):
+    """frame with {column: format string or callable} applied to its (few) rows."""
+    if not formats:
+        return frame
+    formatted = frame.copy()
+    for column, fmt in formats.items():
+        if column in formatted.columns:
+            apply = fmt if callable(fmt) else fmt.format
+            formatted[column] = [apply(value) if pd.notna(value) else "" for value in formatted[column]]
+    return formatted
+
+
+def render(data, key, formats=None, columns=None, page_size=PAGE_SIZE):
+    """Paged st.dataframe of data (DataFrame or FilteredView); key names its widgets."""
+    import streamlit as st
+
+    columns = list(columns or data.columns)
+    total = len(data)
+    pages = max(1, math.ceil(total / page_size))
+    # a filter change can shrink the table below the page the user was on
+    if st.session_state.get(f"{key}-page", 1) > pages:
+        st.session_state[f"{key}-page"] = pages
+    c1, c2, c3 = st.columns([3, 1, 1])
+    sort = c1.selectbox("Sort by", ["(table order)"] + columns, key=f"{key}-sort")
+    descending = c2.checkbox("Descending", key=f"{key}-descending")
+    page = c3.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, step=1, key=f"{key}-page")
+    frame, total = page_rows(
+        data, page=int(page) - 1, size=page_size, sort=None if sort == "(table order)" else sort,
+        ascending=not descending, columns=columns,
+    )
+    st.dataframe(format_page(frame, formats), use_container_width=True)
+    first = (int(page) - 1) * page_size
+    st.caption(f"Rows {min(first + 1, total):,}–{first + len(frame):,} of {total:,}")
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        "Patient ID": np.arange(rows),
+        "Department": pd.Categorical(rng.choice(["Cardiology", "Oncology", "Neurology"], rows)),
+        "Treatment Cost": rng.gamma(2.0, 20000.0, rows),
+        "Symptoms": rng.choice(["cough and fever", "chest pain", "headache"], rows),
+    })
+    formats = {"Treatment Cost": "₹{:,.0f}"}
+    # payload approximated by the JSON of what would be sent
+    start = time.perf_counter()
+    full = format_page(frame.sort_values("Treatment Cost", ascending=False), formats).to_json(orient="split")
+    full_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    page, _ = page_rows(frame, page=3, sort="Treatment Cost", ascending=False)
+    payload = format_page(page, formats).to_json(orient="split")
+    page_ms = (time.perf_counter() - start) * 1000
+    print(f"{rows:,} rows: whole table {full_ms:,.0f} ms / {len(full) / 2**20:,.1f} MiB, "
+          f"one page {page_ms:,.1f} ms / {len(payload) / 2**10:,.1f} KiB")
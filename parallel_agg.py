@@ -0,0 +1,167 @@
+# Multi-core aggregation engine for the dashboard groupbys.
+#
+# The frame is encoded once: every key/slicer column becomes integer codes
+# (pd.factorize, sorted) and every metric a float64 array. A query then splits
+# the rows into contiguous chunks, and each worker thread builds its filter
+# mask from code lookup tables and accumulates per-group sums and counts with
+# np.bincount. Those NumPy kernels run outside the GIL, so the chunks really
+# do proceed in parallel. Per-chunk partials are added together and decoded
+# into the same partial-aggregate dict out_of_core.aggregate_frame() returns.
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_sources import DV2_METRICS
+
+MAX_WORKERS = int(os.environ.get("PARALLEL_AGG_WORKERS", str(os.cpu_count() or 1)))
+MIN_ROWS_PER_TASK = 250_000
+# Above this many possible key combinations a grouping is accumulated sparsely
+DENSE_GROUP_LIMIT = 1 << 22
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="parallel-agg")
+    return _executor
+
+
+class EncodedFrame:
+    """Integer-coded key columns plus float metric arrays for one frame."""
+
+    def __init__(self, frame, key_columns, metrics=DV2_METRICS):
+        self.n_rows = len(frame)
+        self.metrics = list(metrics)
+        self.codes = {}
+        self.categories = {}
+        for column in dict.fromkeys(key_columns):
+            codes, uniques = pd.factorize(frame[column], sort=True)
+            self.codes[column] = codes.astype(np.int32 if len(uniques) < 2 ** 31 else np.int64)
+            self.categories[column] = pd.Index(uniques, name=column)
+        # NaN metrics contribute nothing to sums, as in pandas
+        self.values = np.vstack([np.nan_to_num(frame[m].to_numpy(dtype=float)) for m in self.metrics])
+
+    def lookup(self, column, values):
+        """Boolean table over column codes; the extra last slot makes code -1 (NaN) False."""
+        table = np.zeros(len(self.categories[column]) + 1, dtype=bool)
+        positions = self.categories[column].get_indexer(pd.Index(values))
+        table[positions[positions >= 0]] = True
+        return table
+
+
+def _group_codes(encoded, keys, rows):
+    """Mixed-radix combined code per row for keys, and the rows whose keys are all non-null."""
+    combined = np.zeros(rows.stop - rows.start, dtype=np.int64)
+    valid = np.ones(rows.stop - rows.start, dtype=bool)
+    for key in keys:
+        codes = encoded.codes[key][rows]
+        valid &= codes >= 0
+        combined = combined * len(encoded.categories[key]) + codes
+    return combined, valid
+
+
+def _group_space(encoded, keys):
+    return int(np.prod([len(encoded.categories[k]) for k in keys], dtype=np.float64))
+
+
+def _chunk_partials(encoded, lookups, groupings, rows, extra_mask):
+    mask = np.ones(rows.stop - rows.start, dtype=bool)
+    for column, table in lookups.items():
+        mask &= table[encoded.codes[column][rows]]
+    if extra_mask is not None:
+        mask &= extra_mask[rows]
+    values = encoded.values[:, rows]
+    partials = {"total": np.append(values[:, mask].sum(axis=1), mask.sum())}
+    for name, keys in groupings.items():
+        combined, valid = _group_codes(encoded, keys, rows)
+        keep = mask & valid
+        combined = combined[keep]
+        kept_values = values[:, keep]
+        space = _group_space(encoded, keys)
+        if space <= DENSE_GROUP_LIMIT:
+            sums = np.vstack(
+                [np.bincount(combined, weights=v, minlength=space) for v in kept_values]
+                + [np.bincount(combined, minlength=space).astype(float)]
+            )
+            partials[name] = (None, sums)
+        else:
+            uniques, inverse = np.unique(combined, return_inverse=True)
+            sums = np.vstack(
+                [np.bincount(inverse, weights=v, minlength=len(uniques)) for v in kept_values]
+                + [np.bincount(inverse, minlength=len(uniques)).astype(float)]
+            )
+            partials[name] = (uniques, sums)
+    return partials
+
+
+def _merge_partials(parts):
+    merged = {"total": np.sum([p["total"] for p in parts], axis=0)}
+    for name in parts[0]:
+        if name == "total":
+            continue
+        if parts[0][name][0] is None:
+            merged[name] = (None, np.sum([p[name][1] for p in parts], axis=0))
+            continue
+        uniques = np.concatenate([p[name][0] for p in parts])
+        sums = np.hstack([p[name][1] for p in parts])
+        merged_keys, inverse = np.unique(uniques, return_inverse=True)
+        merged[name] = (merged_keys, np.vstack([np.bincount(inverse, weights=row) for row in sums]))
+    return merged
+
+
+def _decode(encoded, keys, group_ids, sums):
+    index_arrays = []
+    remainder = group_ids
+    for key in reversed(keys):
+        size = len(encoded.categories[key])
+        index_arrays.append(encoded.categories[key].take(remainder % size))
+        remainder = remainder // size
+    index_arrays.reverse()
+    if len(keys) == 1:
+        index = pd.Index(index_arrays[0], name=keys[0])
+    else:
+        index = pd.MultiIndex.from_arrays(index_arrays, names=keys)
+    frame = pd.DataFrame(sums[:-1].T, index=index, columns=encoded.metrics)
+    frame["count"] = sums[-1].astype(np.int64)
+    return frame
+
+
+def aggregate(encoded, filters, groupings, extra_mask=None, workers=None):
+    """Filter + group encoded rows in parallel row chunks.
+
+    filters is {column: values} (None = no filter) over encoded columns;
+    extra_mask is an optional precomputed boolean row mask (e.g. text search).
+    Returns the same dict shape as out_of_core.aggregate_frame().
+    """
+    lookups = {
+        column: encoded.lookup(column, values) for column, values in filters.items() if values is not None
+    }
+    workers = workers or MAX_WORKERS
+    n_tasks = max(1, min(workers, encoded.n_rows // MIN_ROWS_PER_TASK))
+    bounds = np.linspace(0, encoded.n_rows, n_tasks + 1).astype(int)
+    ranges = [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+    if n_tasks == 1:
+        parts = [_chunk_partials(encoded, lookups, groupings, ranges[0], extra_mask)]
+    else:
+        parts = list(_get_executor().map(
+            lambda rows: _chunk_partials(encoded, lookups, groupings, rows, extra_mask), ranges
+        ))
+    merged = _merge_partials(parts)
+
+    total = merged["total"]
+    results = {"total": pd.DataFrame([total[:-1]], columns=encoded.metrics).assign(count=int(total[-1]))}
+    for name, keys in groupings.items():
+        group_ids, sums = merged[name]
+        if group_ids is None:
+            group_ids = np.flatnonzero(sums[-1])
+            sums = sums[:, group_ids]
+        else:
+            observed = sums[-1] > 0
+            group_ids, sums = group_ids[observed], sums[:, observed]
+        results[name] = _decode(encoded, keys, group_ids, sums)
+    return results
@@ -0,0 +1,262 @@
+# Pluggable query backends for the dashboards' filter + aggregate calls.
+#
+# Every backend answers aggregate(filters, groupings, search=None) with the
+# same partial-aggregate dict out_of_core.aggregate_frame() produces (per-group
+# metric sums plus a row count, and a "total" row), so the chart helpers in
+# out_of_core work unchanged whichever backend ran the query:
+#   pandas  - boolean mask + groupby over the in-memory frame (reference path)
+#   sqlite  - stdlib embedded database, one indexed GROUP BY per grouping
+#   duckdb  - optional; vectorized, multi-threaded, all groupings in a single
+#             GROUPING SETS query
+#   parallel - pre-encoded frame aggregated in row chunks on all cores
+#             (parallel_agg)
+# "auto" picks parallel for frames of PARALLEL_MIN_ROWS rows or more and
+# pandas below that.
+# compare_latency() times the backends against each other on one workload.
+
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import out_of_core
+import parallel_agg
+from data_sources import DV2_METRICS
+
+BACKENDS = ("pandas", "sqlite", "duckdb", "parallel")
+DEFAULT_BACKEND = os.environ.get("DASHBOARD_QUERY_BACKEND", "auto")
+PARALLEL_MIN_ROWS = 1_000_000
+TABLE = "facts"
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def search_mask(frame, term, columns):
+    """Case-insensitive substring match of term against any of columns."""
+    term = term.lower()
+    mask = np.zeros(len(frame), dtype=bool)
+    for column in columns:
+        values = frame[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # match each distinct label once, then broadcast through the codes (-1 = missing)
+            hits = values.cat.categories.astype(str).str.lower().str.contains(term, regex=False)
+            mask |= np.append(np.asarray(hits, dtype=bool), False)[values.cat.codes.to_numpy()]
+        else:
+            mask |= values.astype(str).str.lower().str.contains(term, regex=False).to_numpy()
+    return mask
+
+
+def filter_frame(frame, filters, search=None):
+    """Rows of frame matching filters ({column: values}) and an optional (term, columns) search."""
+    mask = out_of_core.filter_mask(frame, filters)
+    if search and search[0]:
+        mask &= search_mask(frame, *search)
+    return frame[mask]
+
+
+# ----------------- Pandas -----------------
+class PandasBackend:
+    name = "pandas"
+
+    def __init__(self, frame, metrics=DV2_METRICS, groupings=out_of_core.GROUPINGS, index_columns=()):
+        self.frame = frame
+        self.metrics = list(metrics)
+        self.groupings = groupings
+
+    def aggregate(self, filters, groupings=None, search=None):
+        selected = filter_frame(self.frame, filters, search)
+        return out_of_core.aggregate_frame(selected, groupings or self.groupings, self.metrics)
+
+
+# ----------------- SQL -----------------
+class SQLBackend:
+    """Shared SQL generation; subclasses provide the connection and execution."""
+
+    def __init__(self, frame, metrics=DV2_METRICS, groupings=out_of_core.GROUPINGS, index_columns=()):
+        self.metrics = list(metrics)
+        self.groupings = groupings
+        self.columns = list(frame.columns)
+        self._load(frame)
+        for i, column in enumerate(index_columns):
+            self._execute(f"CREATE INDEX ix_{TABLE}_{i} ON {TABLE} ({_quote(column)})")
+
+    def _where(self, filters, search):
+        clauses, params = [], []
+        for column, values in filters.items():
+            if values is None:
+                continue
+            if not values:
+                clauses.append("1 = 0")
+                continue
+            clauses.append(f"{_quote(column)} IN ({', '.join('?' * len(values))})")
+            params.extend(_sql_value(v) for v in values)
+        if search and search[0]:
+            term, columns = search
+            pattern = "%" + term.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            clauses.append("(" + " OR ".join(
+                f"LOWER(CAST({_quote(c)} AS TEXT)) LIKE ? ESCAPE '\\'" for c in columns
+            ) + ")")
+            params.extend([pattern] * len(columns))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _metric_select(self):
+        return ", ".join(f"COALESCE(SUM({_quote(m)}), 0) AS {_quote(m)}" for m in self.metrics) + ", COUNT(*) AS count"
+
+    def _shape(self, frame, keys):
+        frame = frame.dropna(subset=keys)
+        return frame.set_index(keys)[self.metrics + ["count"]].sort_index()
+
+    def aggregate(self, filters, groupings=None, search=None):
+        groupings = groupings or self.groupings
+        where, params = self._where(filters, search)
+        results = {"total": self._query(f"SELECT {self._metric_select()} FROM {TABLE}{where}", params)}
+        for name, keys in groupings.items():
+            key_sql = ", ".join(_quote(k) for k in keys)
+            sql = f"SELECT {key_sql}, {self._metric_select()} FROM {TABLE}{where} GROUP BY {key_sql}"
+            results[name] = self._shape(self._query(sql, params), keys)
+        return results
+
+
+def _sql_value(value):
+    # numpy scalars are not accepted as sqlite parameters
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _sql_frame(frame):
+    # SQLite has no datetime type; store timestamps as ISO text
+    converted = frame.copy()
+    for column in converted.columns:
+        if pd.api.types.is_datetime64_any_dtype(converted[column]):
+            converted[column] = converted[column].dt.strftime("%Y-%m-%d")
+    return converted
+
+
+class SQLiteBackend(SQLBackend):
+    name = "sqlite"
+
+    def _load(self, frame):
+        import sqlite3
+        # One connection shared by Streamlit's script threads, serialised by a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        _sql_frame(frame).to_sql(TABLE, self._conn, index=False)
+
+    def _execute(self, sql):
+        with self._lock:
+            self._conn.execute(sql)
+
+    def _query(self, sql, params):
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+
+class DuckDBBackend(SQLBackend):
+    name = "duckdb"
+
+    def _load(self, frame):
+        import duckdb
+        self._conn = duckdb.connect(":memory:")
+        self._conn.execute(f"SET threads TO {os.cpu_count() or 1}")
+        self._conn.register("source_frame", frame)
+        self._conn.execute(f"CREATE TABLE {TABLE} AS SELECT * FROM source_frame")
+        self._conn.unregister("source_frame")
+
+    def _execute(self, sql):
+        self._conn.execute(sql)
+
+    def _query(self, sql, params):
+        # a cursor per query keeps concurrent sessions off each other's state
+        return self._conn.cursor().execute(sql, [_sql_value(p) for p in params]).df()
+
+    def aggregate(self, filters, groupings=None, search=None):
+        groupings = groupings or self.groupings
+        where, params = self._where(filters, search)
+        key_columns = list(dict.fromkeys(k for keys in groupings.values() for k in keys))
+        sets = ", ".join("(" + ", ".join(_quote(k) for k in keys) + ")" for keys in groupings.values())
+        flags = ", ".join(f"GROUPING({_quote(k)}) AS {_quote('g_' + k)}" for k in key_columns)
+        sql = (
+            f"SELECT {', '.join(_quote(k) for k in key_columns)}, {flags}, {self._metric_select()} "
+            f"FROM {TABLE}{where} GROUP BY GROUPING SETS ({sets}, ())"
+        )
+        rows = self._query(sql, params)
+        grouped = {k: rows[f"g_{k}"] == 0 for k in key_columns}
+        results = {}
+        none_grouped = np.logical_and.reduce([~grouped[k] for k in key_columns])
+        results["total"] = rows.loc[none_grouped, self.metrics + ["count"]].reset_index(drop=True)
+        for name, keys in groupings.items():
+            selected = np.logical_and.reduce(
+                [grouped[k] if k in keys else ~grouped[k] for k in key_columns]
+            )
+            results[name] = self._shape(rows.loc[selected], keys)
+        return results
+
+
+# ----------------- Parallel -----------------
+class ParallelBackend:
+    name = "parallel"
+
+    def __init__(self, frame, metrics=DV2_METRICS, groupings=out_of_core.GROUPINGS, index_columns=()):
+        self.frame = frame
+        self.groupings = groupings
+        key_columns = [k for keys in groupings.values() for k in keys] + list(index_columns)
+        self.encoded = parallel_agg.EncodedFrame(frame, key_columns, metrics)
+
+    def aggregate(self, filters, groupings=None, search=None):
+        encoded_filters = {c: v for c, v in filters.items() if c in self.encoded.codes}
+        other_filters = {c: v for c, v in filters.items() if c not in self.encoded.codes}
+        extra_mask = None
+        if other_filters or (search and search[0]):
+            extra_mask = out_of_core.filter_mask(self.frame, other_filters)
+            if search and search[0]:
+                extra_mask &= search_mask(self.frame, *search)
+        return parallel_agg.aggregate(self.encoded, encoded_filters, groupings or self.groupings, extra_mask)
+
+
+def get_backend(name, frame, metrics=DV2_METRICS, groupings=out_of_core.GROUPINGS, index_columns=()):
+    """Build a backend over frame; index_columns are the slicer columns to index/encode."""
+    classes = {"pandas": PandasBackend, "sqlite": SQLiteBackend, "duckdb": DuckDBBackend, "parallel": ParallelBackend}
+    if name == "auto":
+        name = "parallel" if len(frame) >= PARALLEL_MIN_ROWS else "pandas"
+    if name not in classes:
+        raise ValueError(f"Unknown query backend {name!r}; expected one of {BACKENDS}")
+    return classes[name](frame, metrics=metrics, groupings=groupings, index_columns=index_columns)
+
+
+# ----------------- Latency Comparison -----------------
+def compare_latency(frame, workload, backends=BACKENDS, repeat=5, **backend_kwargs):
+    """Median/min latency (ms) per backend for a list of filter states.
+
+    Backends whose optional dependency is missing are reported as skipped.
+    """
+    rows = []
+    for name in backends:
+        try:
+            backend = get_backend(name, frame, **backend_kwargs)
+        except ImportError as exc:
+            rows.append({"backend": name, "median_ms": np.nan, "min_ms": np.nan, "note": f"skipped: {exc}"})
+            continue
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for filters in workload:
+                backend.aggregate(filters)
+            timings.append((time.perf_counter() - start) * 1000)
+        rows.append({"backend": name, "median_ms": float(np.median(timings)), "min_ms": min(timings), "note": ""})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    import sys
+
+    import data_sources
+    import schemas
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "DV2.csv"
+    dv2 = data_sources.add_dv2_periods(schemas.DV2.read_csv(source))
+    makes = sorted(dv2['Car Make'].dropna().unique())
+    workload = [{}] + [{'Car Make': [make]} for make in makes] + [{'Car Year': sorted(dv2['Car Year'].dropna().unique())[-3:]}]
+    print(compare_latency(dv2, workload, index_columns=out_of_core.SLICER_COLUMNS + ['Car Model']).to_string(index=False))
@@ -0,0 +1,185 @@
+# Indexed row selection for the server-side DataTables in V1.py and JV1.py.
+#
+# The drill-down tables send the browser one page of DBT rows at a time
+# (page_action/sort_action/filter_action='custom'), so every page turn, sort
+# and column filter is a query on the server. RowIndex answers the selection
+# part without scanning the frame:
+#   - key columns (dimensions, year, quarter) hold posting lists: the sorted
+#     row positions of every value, built once from one stable argsort. An
+#     equality filter is the union of the matching lists, and a text filter
+#     (contains / = / !=) is evaluated once per distinct value, not per row;
+#   - ordered (numeric) columns keep their stable argsort, so a range is two
+#     binary searches.
+# Predicates are intersected smallest first. Columns that are neither fall
+# back to a scan of the rows still selected. paging.page_rows() then sorts
+# and slices the selection.
+
+import operator
+import re
+
+import numpy as np
+import pandas as pd
+
+import data_sources
+import paging
+import views
+
+DBT_KEYS = [*data_sources.DBT_DIMENSIONS, "YEAR_ID", "QTR_ID"]
+
+_CLAUSE = re.compile(
+    r"\{(?P<column>[^}]+)\}\s+(?P<op>[si]?(?:eq|ne|lt|le|gt|ge|contains|datestartswith)|[si]?(?:<=|>=|!=|=|<|>))\s+"
+    r"(?P<value>.+)"
+)
+_OPS = {
+    "=": "eq", "!=": "ne", "<": "lt", "<=": "le", ">": "gt", ">=": "ge",
+}
+_COMPARE = {
+    "eq": operator.eq, "ne": operator.ne, "lt": operator.lt, "le": operator.le, "gt": operator.gt, "ge": operator.ge,
+}
+
+
+def _literal(text):
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'`":
+        return text[1:-1]
+    try:
+        return float(text) if any(c in text for c in ".eE") else int(text)
+    except ValueError:
+        return text
+
+
+def parse_filter_query(query):
+    """DataTable filter_query ('{COUNTRY} contains USA && {PROFIT} > 100') as (column, op, value, case)."""
+    clauses = []
+    for part in (query or "").split(" && "):
+        match = _CLAUSE.fullmatch(part.strip())
+        if not match:
+            continue
+        op = match["op"]
+        # s/i prefixes pick case sensitivity; the table's default is sensitive
+        case = not op.startswith("i")
+        if op[0] in "si":
+            op = op[1:]
+        clauses.append((match["column"], _OPS.get(op, op), _literal(match["value"]), case))
+    return clauses
+
+
+def _label_match(labels, op, value, case):
+    labels = pd.Series(labels, dtype=object).astype(str)
+    value = str(value)
+    if not case:
+        labels, value = labels.str.lower(), value.lower()
+    if op == "contains":
+        return labels.str.contains(value, regex=False).to_numpy()
+    if op == "datestartswith":
+        return labels.str.startswith(value).to_numpy()
+    return _COMPARE[op](labels, value).to_numpy()
+
+
+class RowIndex:
+    """Posting lists for key columns and sorted orders for ordered columns of frame."""
+
+    def __init__(self, frame, keys=(), ordered=()):
+        self.frame = frame
+        self.postings = {}
+        for column in keys:
+            codes, labels = pd.factorize(frame[column], sort=True)
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+            self.postings[column] = (labels, order, bounds)
+        self.orders = {}
+        for column in ordered:
+            values = frame[column].to_numpy(dtype=float)
+            order = np.argsort(values, kind="stable")
+            self.orders[column] = (order, values[order])
+
+    def __len__(self):
+        return len(self.frame)
+
+    def _postings(self, column, matched):
+        labels, order, bounds = self.postings[column]
+        parts = [order[bounds[i]:bounds[i + 1]] for i in np.flatnonzero(matched)]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def equal(self, column, values):
+        """Sorted row positions where column is one of values."""
+        labels = self.postings[column][0]
+        return self._postings(column, pd.Index(labels).isin(list(values)))
+
+    def _range(self, column, op, value):
+        order, values = self.orders[column]
+        if op == "ne":
+            return np.sort(order[values != value])
+        low, high = 0, len(values)
+        if op in ("eq", "ge", "gt"):
+            low = np.searchsorted(values, value, side="left" if op != "gt" else "right")
+        if op in ("eq", "le", "lt"):
+            high = np.searchsorted(values, value, side="right" if op != "lt" else "left")
+        return np.sort(order[low:high])
+
+    def _clause(self, column, op, value, case, candidates):
+        if column in self.postings:
+            labels = self.postings[column][0]
+            if op in _COMPARE and not isinstance(value, str) and pd.api.types.is_numeric_dtype(labels):
+                return self._postings(column, _COMPARE[op](labels, value))
+            return self._postings(column, _label_match(labels, op, value, case))
+        if column in self.orders and not isinstance(value, str) and op in _COMPARE:
+            return self._range(column, op, value)
+        # not indexed: scan just the rows selected so far
+        values = self.frame[column]
+        values = values if candidates is None else values.take(candidates)
+        if op in ("contains", "datestartswith") or isinstance(value, str):
+            mask = _label_match(values.to_numpy(dtype=object), op, value, case)
+        else:
+            mask = _COMPARE[op](pd.to_numeric(values, errors="coerce"), value).to_numpy()
+        positions = np.flatnonzero(mask)
+        return positions if candidates is None else candidates[positions]
+
+    def select(self, equals=None, clauses=()):
+        """Sorted row positions matching {column: values} and parsed filter clauses (None: all rows)."""
+        parts = [self.equal(column, values) for column, values in (equals or {}).items() if values is not None]
+        selected = None
+        for part in sorted(parts, key=len):
+            selected = part if selected is None else np.intersect1d(selected, part, assume_unique=True)
+        for column, op, value, case in clauses:
+            if column not in self.frame.columns:
+                continue
+            part = self._clause(column, op, value, case, selected)
+            selected = part if selected is None else np.intersect1d(selected, part, assume_unique=True)
+        return selected
+
+    def page(self, equals=None, filter_query="", sort_by=(), page=0, size=paging.PAGE_SIZE, columns=None,
+             default_sort=None):
+        """(records of the page, page count, page) for a custom-paged DataTable.
+
+        sort_by is the table's sort_by property; default_sort, a (column,
+        ascending) pair, applies when the user has not sorted. page is clamped
+        to the last page when the selection shrank.
+        """
+        view = views.FilteredView.of_rows(self.frame, self.select(equals, parse_filter_query(filter_query)))
+        sort, ascending = default_sort or (None, True)
+        if sort_by:
+            sort, ascending = sort_by[0]["column_id"], sort_by[0]["direction"] == "asc"
+        pages = max(1, -(-len(view) // size))
+        page = min(page, pages - 1)
+        frame, _ = paging.page_rows(view, page, size, sort, ascending, columns)
+        return frame.to_dict("records"), pages, page
+
+
+def for_dbt(frame):
+    return RowIndex(frame, keys=DBT_KEYS, ordered=data_sources.DBT_METRICS)
+
+
+def datatable_columns(frame, columns=None):
+    """DataTable column specs; numeric columns get the numeric type (and its filter operators)."""
+    return [
+        {"name": column, "id": column, "type": "numeric" if pd.api.types.is_numeric_dtype(frame[column]) else "text"}
+        for column in (columns or frame.columns)
+    ]
+
+
+def triggered_by(component_id):
+    """True when the running Dash callback was fired by a property of component_id."""
+    from dash import callback_context
+
+    return any(t["prop_id"].split(".")[0] == component_id for t in callback_context.triggered)
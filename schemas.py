@@ -0,0 +1,165 @@
+# Declarative schemas for the CSV sources (DBT, DV2, PMC).
+#
+# Each schema lists its columns by canonical name with a dtype and, where the
+# upstream header is messy, the aliases it is published under. read_csv()
+# matches the file's headers by normalized name (BOM, whitespace and case are
+# ignored), never by position, so a reordered upstream file still lands in
+# the right columns, and a missing column fails loudly with SchemaError.
+# Text and categorical columns get their dtype inside the CSV parser, and
+# numeric columns are parsed natively, so nothing is read as object and
+# re-cast afterwards; only a numeric column holding stray text is coerced.
+# Blank or non-numeric cells become missing values: NaN in float columns, and
+# <NA> in the integer columns, which use pandas' nullable Int64 so that one
+# bad row does not fail the whole read.
+
+import re
+
+import pandas as pd
+
+from data_sources import clean_header
+
+NUMERIC_KINDS = "biuf"
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def normalize_header(name):
+    """Comparison key for a header: BOM-free, whitespace-collapsed, lower case."""
+    return re.sub(r"\s+", " ", clean_header(str(name))).lower()
+
+
+class Schema:
+    """Canonical columns of one source: [(name, dtype) or (name, dtype, aliases)]."""
+
+    def __init__(self, name, columns, optional=(), na_values=None):
+        self.name = name
+        self.dtypes = {}
+        self._lookup = {}
+        for spec in columns:
+            column, dtype, aliases = spec if len(spec) == 3 else (*spec, ())
+            self.dtypes[column] = dtype
+            for header in (column, *aliases):
+                self._lookup[normalize_header(header)] = column
+        self.optional = set(optional)
+        self.na_values = na_values
+
+    @property
+    def columns(self):
+        return list(self.dtypes)
+
+    @property
+    def categoricals(self):
+        return [c for c, dtype in self.dtypes.items() if dtype == "category"]
+
+    def match(self, headers, columns=None):
+        """{raw header: canonical name} for the wanted columns; raises SchemaError if any is missing."""
+        wanted = set(columns or self.columns)
+        mapping = {}
+        for header in headers:
+            column = self._lookup.get(normalize_header(header))
+            if column in wanted and column not in mapping.values():
+                mapping[header] = column
+        missing = [c for c in self.columns if c in wanted and c not in mapping.values() and c not in self.optional]
+        if missing:
+            raise SchemaError(f"{self.name}: missing column(s) {missing}; headers present: {list(headers)}")
+        return mapping
+
+    def _is_numeric(self, column):
+        return pd.api.types.pandas_dtype(self.dtypes[column]).kind in NUMERIC_KINDS
+
+    def coerce(self, frame):
+        """Rename to canonical names and enforce the declared dtypes (for frames read elsewhere)."""
+        mapping = self.match(frame.columns, [c for c in self.columns])
+        frame = frame[list(mapping)].set_axis(list(mapping.values()), axis=1)
+        return self._finish(frame, numeric_only=False)
+
+    def _finish(self, frame, numeric_only=True):
+        for column in frame.columns:
+            dtype = self.dtypes[column]
+            if str(frame[column].dtype) == str(dtype):
+                continue
+            if self._is_numeric(column):
+                values = frame[column]
+                if values.dtype.kind not in NUMERIC_KINDS:
+                    values = pd.to_numeric(values, errors="coerce")
+                try:
+                    frame[column] = values.astype(dtype)
+                except (TypeError, ValueError) as exc:
+                    raise SchemaError(f"{self.name}: column {column!r} cannot be read as {dtype}: {exc}") from exc
+            elif not numeric_only:
+                frame[column] = frame[column].astype(dtype)
+        return frame
+
+    def read_csv(self, source, columns=None, chunksize=None, encoding="latin1", **kwargs):
+        """Read source with canonical column names and declared dtypes.
+
+        columns restricts the read to a subset of the schema (usecols); with
+        chunksize an iterator of prepared chunks is returned.
+        """
+        headers = pd.read_csv(source, nrows=0, encoding=encoding, **kwargs).columns
+        if hasattr(source, "seek"):
+            # a buffer: parse the rows from the top again
+            source.seek(0)
+        mapping = self.match(headers, columns)
+        # Text/categorical dtypes are applied by the parser; numeric columns are parsed natively
+        dtype = {raw: self.dtypes[column] for raw, column in mapping.items() if not self._is_numeric(column)}
+        reader = pd.read_csv(
+            source,
+            usecols=list(mapping),
+            dtype=dtype,
+            na_values=self.na_values,
+            encoding=encoding,
+            chunksize=chunksize,
+            **kwargs,
+        )
+        if chunksize is None:
+            return self._finish(reader.rename(columns=mapping))
+        return (self._finish(chunk.rename(columns=mapping)) for chunk in reader)
+
+
+# ----------------- Registry -----------------
+DBT = Schema("DBT", [
+    ("CUSTOMERNAME", "category"),
+    ("COUNTRY", "category"),
+    ("YEAR_ID", "Int64"),
+    ("QTR_ID", "Int64"),
+    ("TOTALLOSS", "float64"),
+    ("TOTALREVENUE", "float64"),
+    ("PROFIT", "float64"),
+])
+
+DV2 = Schema("DV2", [
+    ("Date", "str"),
+    ("Salesperson", "str"),
+    ("Customer Name", "str"),
+    ("Car Make", "category"),
+    ("Car Model", "category"),
+    ("Car Year", "Int64"),
+    ("Sale Price", "float64"),
+    ("Commission Rate", "float64"),
+    ("Commission Earned", "float64"),
+])
+
+PMC = Schema("PMC", [
+    ("City Name", "category"),
+    ("Zone Name", "category"),
+    ("Ward Name", "category"),
+    ("Zone No.", "Int64"),
+    ("Ward No.", "Int64"),
+    ("Facility Name", "str"),
+    ("Type", "category", ["Type (Hospital / Nursing Home / Lab)"]),
+    ("Class", "category", ["Class : (Public / Private)"]),
+    ("Pharmacy Available", "category", ["Pharmacy Available : Yes/No"]),
+    ("Number of Beds in Emergency Wards", "Int64"),
+    ("Number of Beds in facility type", "Int64"),
+    ("Number of Doctors / Physicians", "Int64"),
+    ("Number of Nurses", "Int64"),
+    ("Number of Midwives Professional", "Int64"),
+    ("Average Monthly Patient Footfall", "Int64"),
+    ("Ambulance Service Available", "category"),
+    ("Count of Ambulance", "Int64"),
+], na_values=["N.A.", "NA"])
+
+SCHEMAS = {"DBT": DBT, "DV2": DV2, "PMC": PMC}
@@ -0,0 +1,321 @@
+# Mergeable sketches for distinct-count and heavy-hitter KPIs.
+#
+# A SketchIndex summarizes one value column (the customer) per cell of some
+# key columns (a dimension member and its period). Each cell holds a
+# HyperLogLog register array, and can also hold a heavy-hitter summary. A
+# filter selection is answered by merging the matching cells: the elementwise
+# max of their HLL registers, the per-label sum of their summaries. The cost
+# depends on the number of cells and their sketch sizes, not rows, so "unique
+# buyers" and "top buyers" cost about the same for one row or a hundred
+# million. Indexes are built chunk by chunk with update(), so out-of-core
+# sources stream into them too. When several indexes cover a selection, the
+# one with the fewest matching cells answers it.
+#
+#   HLL, p=10:       ~3% standard error. A cell starts sparse, as 8 bytes per
+#                    non-zero register, and becomes a dense 1 KiB array once
+#                    that is smaller (> SPARSE_LIMIT registers), so the many
+#                    small cells of a long-tailed dimension (salesperson x
+#                    month) cost about as much as their distinct values.
+#   Misra-Gries, k:  at most k counters per cell (HEAVY_HITTERS). Counts are
+#                    exact until a cell sees more than k distinct values;
+#                    after that each trim lowers every counter of the cell by
+#                    the same amount, recorded as the cell's error, so a
+#                    merged count is low by at most the summed errors of the
+#                    selected cells (<= their rows / (k + 1)).
+#
+# A selection that filters a column an index is not keyed on cannot be
+# answered from it; unique_values() and heavy_hitters() then return None
+# and the caller counts the filtered rows directly.
+
+import math
+
+import numpy as np
+import pandas as pd
+
+HLL_PRECISION = 10
+RANK_BITS = 6
+HEAVY_HITTERS = 256
+
+# name -> key columns, sketched value column, whether it keeps a heavy-hitter summary
+DV2_SKETCHES = {
+    "salesperson": (["Salesperson", "Month"], "Customer Name", False),
+    "make": (["Car Make", "Month"], "Customer Name", True),
+}
+DBT_SKETCHES = {
+    "country": (["COUNTRY", "YEAR_ID", "QTR_ID"], "CUSTOMERNAME", False),
+}
+
+
+def hash_values(values):
+    """64-bit hashes of a column's labels (categoricals hash each category once)."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        hashed = pd.util.hash_array(values.cat.categories.to_numpy(dtype=object))
+        codes = values.cat.codes.to_numpy()
+        return hashed[codes[codes >= 0]]
+    values = values.dropna()
+    return pd.util.hash_array(values.to_numpy(dtype=object))
+
+
+def _hll_ranks(hashes, precision):
+    """(register index, rank) of each hash."""
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - precision)) - 1)
+    # position of the first 1 bit in the remaining 64 - p bits
+    bit_length = np.frexp(rest.astype(np.float64))[1]
+    rank = np.clip(64 - precision - bit_length + 1, 1, 64 - precision + 1).astype(np.int64)
+    return index, rank
+
+
+def _ranges(starts, ends):
+    """Concatenated np.arange(start, end) for each pair."""
+    lengths = ends - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(int(lengths.sum()))
+
+
+def hll_estimate(registers):
+    """Cardinality estimate from one merged HLL register array."""
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        # small-range correction (linear counting)
+        estimate = m * math.log(m / zeros)
+    return estimate
+
+
+class SketchIndex:
+    """HyperLogLog (and optionally Misra-Gries heavy-hitter) sketches of value per cell of keys."""
+
+    def __init__(self, keys, value, heavy_hitters=False, precision=HLL_PRECISION, capacity=HEAVY_HITTERS):
+        self.keys = list(keys)
+        self.value = value
+        self.precision = precision
+        self.capacity = capacity
+        self._cells = {}
+        self.cell_keys = pd.DataFrame(columns=self.keys)
+        # sparse registers: sorted (cell, register, rank) packed into one int64, one entry per
+        # non-zero register; cells past SPARSE_LIMIT entries move to a dense row of self.hll
+        self.sparse = np.zeros(0, dtype=np.int64)
+        self.dense_row = np.zeros(0, dtype=np.int64)
+        self.hll = np.zeros((0, 1 << precision), dtype=np.uint8)
+        # per cell: {label: count} Series of at most capacity entries, and the count trimmed from each
+        self.counters = [] if heavy_hitters else None
+        self.errors = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._cells)
+
+    @property
+    def sparse_limit(self):
+        # a sparse entry is 8 bytes, a dense row one byte per register
+        return (1 << self.precision) // 8
+
+    def nbytes(self):
+        counters = sum(c.memory_usage(index=True) for c in self.counters) if self.counters is not None else 0
+        return self.hll.nbytes + self.sparse.nbytes + self.dense_row.nbytes + counters
+
+    def _cell_ids(self, frame):
+        grouped = frame.groupby(self.keys, observed=True, sort=False)
+        group_keys = list(grouped.groups)
+        new = [k for k in group_keys if (k if isinstance(k, tuple) else (k,)) not in self._cells]
+        if new:
+            start = len(self._cells)
+            for i, key in enumerate(new):
+                self._cells[key if isinstance(key, tuple) else (key,)] = start + i
+            rows = pd.DataFrame([k if isinstance(k, tuple) else (k,) for k in new], columns=self.keys)
+            self.cell_keys = pd.concat([self.cell_keys, rows], ignore_index=True) if len(self.cell_keys) else rows
+            self.dense_row = np.concatenate([self.dense_row, np.full(len(new), -1, dtype=np.int64)])
+            self.errors = np.concatenate([self.errors, np.zeros(len(new), dtype=np.int64)])
+            if self.counters is not None:
+                self.counters.extend(pd.Series(dtype=np.int64) for _ in new)
+        lookup = np.array([self._cells[k if isinstance(k, tuple) else (k,)] for k in group_keys], dtype=np.int64)
+        return lookup[grouped.ngroup().to_numpy()]
+
+    def update(self, frame):
+        """Fold a frame (or chunk) of rows into the sketches."""
+        frame = frame[frame[self.value].notna().to_numpy()]
+        frame = frame[frame[self.keys].notna().all(axis=1).to_numpy()]
+        if frame.empty:
+            return self
+        cells = self._cell_ids(frame)
+        self._hll_update(cells, hash_values(frame[self.value]))
+        if self.counters is not None:
+            self._count(cells, frame[self.value])
+        return self
+
+    def _hll_update(self, cells, hashes):
+        index, rank = _hll_ranks(hashes, self.precision)
+        rows = self.dense_row[cells]
+        dense = rows >= 0
+        np.maximum.at(self.hll, (rows[dense], index[dense]), rank[dense].astype(np.uint8))
+        packed = (cells[~dense] << (self.precision + RANK_BITS)) | (index[~dense] << RANK_BITS) | rank[~dense]
+        # sorted, so each (cell, register)'s highest rank is the last entry of its run
+        merged = np.unique(np.concatenate([self.sparse, packed]))
+        slots = merged >> RANK_BITS
+        last = np.ones(len(merged), dtype=bool)
+        last[:-1] = slots[1:] != slots[:-1]
+        merged = merged[last]
+        owners = merged >> (self.precision + RANK_BITS)
+        promote = np.flatnonzero(np.bincount(owners, minlength=len(self._cells)) > self.sparse_limit)
+        if len(promote):
+            self.dense_row[promote] = len(self.hll) + np.arange(len(promote))
+            self.hll = np.concatenate([self.hll, np.zeros((len(promote), self.hll.shape[1]), dtype=np.uint8)])
+            moving = np.isin(owners, promote)
+            self._scatter(self.hll, self.dense_row[owners[moving]], merged[moving])
+            merged = merged[~moving]
+        self.sparse = merged
+
+    def _scatter(self, registers, rows, entries):
+        mask = (1 << self.precision) - 1
+        ranks = (entries & ((1 << RANK_BITS) - 1)).astype(np.uint8)
+        np.maximum.at(registers, (rows, (entries >> RANK_BITS) & mask), ranks)
+
+    def registers(self, cells):
+        """The merged HLL register array of cells (ids)."""
+        merged = np.zeros(1 << self.precision, dtype=np.uint8)
+        rows = self.dense_row[cells]
+        if (rows >= 0).any():
+            np.maximum(merged, self.hll[rows[rows >= 0]].max(axis=0), out=merged)
+        sparse_cells = np.sort(cells[rows < 0])
+        shift = self.precision + RANK_BITS
+        starts = np.searchsorted(self.sparse, sparse_cells << shift)
+        ends = np.searchsorted(self.sparse, (sparse_cells + 1) << shift)
+        entries = self.sparse[_ranges(starts, ends)]
+        self._scatter(merged[np.newaxis], np.zeros(len(entries), dtype=np.int64), entries)
+        return merged
+
+    def _count(self, cells, values):
+        """Merge the chunk's exact per-cell counts into the cells' summaries, trimming to capacity."""
+        codes, labels = pd.factorize(values)
+        labels = np.asarray(labels, dtype=object)
+        counts = pd.DataFrame({"cell": cells, "code": codes}).value_counts(sort=False)
+        for cell, group in counts.groupby(level="cell", sort=False):
+            chunk = pd.Series(group.to_numpy(), index=labels[group.index.get_level_values("code")])
+            merged = self.counters[cell].add(chunk, fill_value=0).astype(np.int64)
+            if len(merged) > self.capacity:
+                # the Misra-Gries merge: drop the (k+1)-th count from every counter
+                threshold = int(merged.nlargest(self.capacity + 1).iloc[-1])
+                merged = merged[merged > threshold] - threshold
+                self.errors[cell] += threshold
+            self.counters[cell] = merged
+
+    def covers(self, filters):
+        return all(values is None or column in self.keys for column, values in filters.items())
+
+    def _selected(self, filters):
+        mask = np.ones(len(self.cell_keys), dtype=bool)
+        for column, values in filters.items():
+            if values is not None:
+                mask &= self.cell_keys[column].isin(values).to_numpy()
+        return mask
+
+    def distinct(self, filters):
+        """Estimated distinct values over the cells matching filters (must be covered)."""
+        selected = np.flatnonzero(self._selected(filters))
+        if not len(selected):
+            return 0.0
+        return hll_estimate(self.registers(selected))
+
+    def distinct_by(self, member, filters=None):
+        """Estimated distinct values per member of one key column, over the cells matching filters."""
+        selected = np.flatnonzero(self._selected(filters or {}))
+        members = self.cell_keys[member].to_numpy()[selected]
+        return pd.Series(
+            {m: hll_estimate(self.registers(selected[members == m])) for m in pd.unique(members)},
+            name=self.value,
+        ).rename_axis(member)
+
+    def top(self, filters, n=10):
+        """n most frequent values over the matching cells: value, count, error.
+
+        Each true count lies in [count, count + error]; error is 0 when no
+        selected cell was ever trimmed. The cost is bounded by capacity times
+        the selected cells, however many distinct values there are.
+        """
+        selected = np.flatnonzero(self._selected(filters))
+        parts = [self.counters[cell] for cell in selected if len(self.counters[cell])]
+        if not parts:
+            return pd.DataFrame({self.value: [], "count": [], "error": []})
+        merged = pd.concat(parts).groupby(level=0, sort=False).sum()
+        winners = merged.sort_values(ascending=False, kind="stable").iloc[:n]
+        return pd.DataFrame({
+            self.value: winners.index.to_numpy(), "count": winners.to_numpy(), "error": int(self.errors[selected].sum()),
+        })
+
+
+def build(chunks, specs):
+    """{name: SketchIndex} for specs, fed from an iterable of frames."""
+    indexes = {name: SketchIndex(keys, value, heavy) for name, (keys, value, heavy) in specs.items()}
+    for chunk in chunks:
+        fold(indexes, chunk)
+    return indexes
+
+
+def fold(indexes, chunk):
+    """Add a chunk of rows to every index; returns indexes."""
+    for index in indexes.values():
+        index.update(chunk)
+    return indexes
+
+
+def _smallest_cover(indexes, filters, heavy_hitters=False):
+    """The index covering filters with the fewest matching cells, or None."""
+    covering = [
+        index for index in indexes.values()
+        if index.covers(filters) and (not heavy_hitters or index.counters is not None)
+    ]
+    return min(covering, key=lambda index: int(index._selected(filters).sum()), default=None)
+
+
+def unique_values(indexes, filters):
+    """Distinct-value estimate from the covering index with the fewest matching cells, or None."""
+    index = _smallest_cover(indexes, filters)
+    return None if index is None else index.distinct(filters)
+
+
+def heavy_hitters(indexes, filters, n=10):
+    """Top-n values (with their error bound) from the smallest covering heavy-hitter index, or None."""
+    index = _smallest_cover(indexes, filters, heavy_hitters=True)
+    return None if index is None else index.top(filters, n)
+
+
+def format_count(top, unit):
+    """'5 purchases' for an exact top row, '≈5–7 purchases' when its count is bounded."""
+    count, error = int(top.iat[0, 1]), int(top.iat[0, 2])
+    return f"{count:,} {unit}" if error == 0 else f"≈{count:,}–{count + error:,} {unit}"
+
+
+def exact_distinct(values):
+    """Exact distinct count of a (possibly categorical) column, for selections no index covers."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        return int(np.count_nonzero(np.bincount(codes[codes >= 0], minlength=1)))
+    return int(values.nunique())
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    import data_sources
+    import schemas
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "DV2.csv"
+    frame = data_sources.add_dv2_periods(schemas.DV2.read_csv(source))
+    start = time.perf_counter()
+    indexes = build([frame], DV2_SKETCHES)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"built in {build_ms:.0f} ms: " + ", ".join(f"{n} {len(i)} cells / {i.nbytes() / 2**20:.1f} MiB" for n, i in indexes.items()))
+    for column in ["Salesperson", "Car Make"]:
+        members = list(frame[column].value_counts().index[:3])
+        filters = {column: members}
+        start = time.perf_counter()
+        estimate = unique_values(indexes, filters)
+        sketch_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        exact = frame.loc[frame[column].isin(members), "Customer Name"].nunique()
+        exact_ms = (time.perf_counter() - start) * 1000
+        print(f"{column} in {members}: ~{estimate:,.0f} ({sketch_ms:.1f} ms) vs {exact:,} exact ({exact_ms:.1f} ms)")
+    print(heavy_hitters(indexes, {"Car Make": None}, 5))
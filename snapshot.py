@@ -0,0 +1,227 @@
+# Warm-start snapshots of prepared frames and precomputed aggregates.
+#
+# A fresh Streamlit/Dash process normally re-parses its CSVs (plus date
+# inference and period derivation) or regenerates its Faker data before the
+# first page renders. cached() runs that build once, writes the result to a
+# local binary snapshot and, in every later process, memory-maps it instead:
+#   - numeric, bool and datetime columns are stored as raw .npy arrays and
+#     opened with mmap_mode="r", so they are paged in lazily and shared by
+#     every process on the host through the OS page cache;
+#   - nullable (Int64, Float64, boolean) columns store their values and their
+#     missing-value mask as two memory-mapped arrays;
+#   - categorical (dictionary-encoded) columns keep their codes memory-mapped
+#     and are rebuilt around their lookup table without decoding;
+#   - text and other object columns are stored as int32 codes (memory-mapped)
+#     plus their distinct labels, and decoded on load.
+# Snapshots are keyed by the data version of the source files (size and mtime,
+# or a URL's ETag; see data_version.py), the source code of the functions/
+# modules that prepared the data, and SNAPSHOT_VERSION, so editing either the
+# data or the code rebuilds them. Building a new snapshot deletes the ones it
+# supersedes under the same name.
+
+import hashlib
+import inspect
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_version
+
+SNAPSHOT_DIR = os.environ.get(
+    "SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".snapshot_cache"),
+)
+SNAPSHOT_VERSION = "3"
+FRAME = "frame"
+
+
+# ----------------- Keys -----------------
+def source_fingerprint(source):
+    """Version token of a local file or URL (a stat or a cached HEAD request, not a full read)."""
+    return f"{source}@{data_version.current(source).token}"
+
+
+def code_version(objects):
+    """Hash of the source of the functions/modules that build a snapshot."""
+    digest = hashlib.sha256(SNAPSHOT_VERSION.encode())
+    for obj in objects:
+        try:
+            digest.update(inspect.getsource(obj).encode())
+        except (OSError, TypeError):
+            digest.update(getattr(obj, "__qualname__", repr(obj)).encode())
+    return digest.hexdigest()
+
+
+def snapshot_key(name, sources=(), code=()):
+    digest = hashlib.sha256()
+    for source in sources:
+        digest.update(source_fingerprint(source).encode())
+    digest.update(code_version(code).encode())
+    return f"{name}-{digest.hexdigest()[:20]}"
+
+
+# ----------------- Storage -----------------
+def _column_kind(series):
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biufM":
+        return "array"
+    if isinstance(series.array, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)):
+        return "masked"
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return "categorical"
+    return "labels"
+
+
+def _write_frame(directory, name, frame):
+    index_names = list(frame.index.names)
+    has_index = not (isinstance(frame.index, pd.RangeIndex) and frame.index.start == 0 and frame.index.step == 1)
+    if has_index:
+        frame = frame.reset_index()
+    meta = {
+        "columns": [],
+        "index_columns": list(frame.columns[:len(index_names)]) if has_index else [],
+        "index_names": index_names,
+    }
+    for i, column in enumerate(frame.columns):
+        series = frame[column]
+        kind = _column_kind(series)
+        path = os.path.join(directory, f"{name}.{i}")
+        meta_extra = {}
+        if kind == "array":
+            values = series.to_numpy()
+            np.save(path + ".npy", values.view(np.int64) if values.dtype.kind == "M" else values)
+        elif kind == "masked":
+            mask = series.isna().to_numpy()
+            np.save(path + ".npy", series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0))
+            np.save(path + ".mask.npy", mask)
+        elif kind == "categorical":
+            np.save(path + ".npy", series.cat.codes.to_numpy())
+            np.save(path + ".labels.npy", np.asarray(series.cat.categories, dtype=object), allow_pickle=True)
+            meta_extra = {"categories_dtype": str(series.cat.categories.dtype)}
+        else:
+            codes, labels = pd.factorize(series, sort=False)
+            np.save(path + ".npy", codes.astype(np.int32))
+            np.save(path + ".labels.npy", np.asarray(labels, dtype=object), allow_pickle=True)
+        meta["columns"].append({"name": column, "kind": kind, "dtype": str(series.dtype), **meta_extra})
+    return meta
+
+
+def _read_frame(directory, name, meta):
+    columns = {}
+    for i, info in enumerate(meta["columns"]):
+        path = os.path.join(directory, f"{name}.{i}")
+        # plain ndarray view over the memmap, so pandas never sees the subclass
+        values = np.asarray(np.load(path + ".npy", mmap_mode="r"))
+        if info["kind"] == "array":
+            columns[info["name"]] = values.view(info["dtype"]) if info["dtype"].startswith("datetime64") else values
+            continue
+        if info["kind"] == "masked":
+            mask = np.asarray(np.load(path + ".mask.npy", mmap_mode="r"))
+            array_type = pd.api.types.pandas_dtype(info["dtype"]).construct_array_type()
+            columns[info["name"]] = array_type(values, mask)
+            continue
+        labels = np.load(path + ".labels.npy", allow_pickle=True)
+        if info["kind"] == "categorical":
+            categories = pd.Index(labels, dtype=info.get("categories_dtype", "object"))
+            columns[info["name"]] = pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(categories))
+            continue
+        # code -1 (missing) picks the trailing None
+        # object dtype until cast: pandas would otherwise infer str for an object column
+        decoded = pd.Series(np.append(labels, [None]).take(values), dtype=object)
+        if info["dtype"] == "category":
+            decoded = decoded.astype("category")
+        elif info["dtype"] != "object":
+            decoded = decoded.astype(info["dtype"])
+        columns[info["name"]] = decoded
+    frame = pd.DataFrame(columns, copy=False)
+    if meta["index_columns"]:
+        frame = frame.set_index(meta["index_columns"])
+        frame.index.names = meta["index_names"]
+    return frame
+
+
+def save(key, frames):
+    """Write {name: frame} under key; concurrent writers leave one complete copy."""
+    target = os.path.join(SNAPSHOT_DIR, key)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    meta = {name: _write_frame(tmp, name, frame) for name, frame in frames.items()}
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        # another process published the same snapshot first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load(key):
+    """{name: frame} for key with columns memory-mapped, or None if not snapshotted."""
+    directory = os.path.join(SNAPSHOT_DIR, key)
+    meta_path = os.path.join(directory, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding="utf-8") as fh:
+        meta = json.load(fh)
+    return {name: _read_frame(directory, name, frame_meta) for name, frame_meta in meta.items()}
+
+
+def cached(name, build, sources=(), code=()):
+    """Return build()'s frame (or {name: frame} dict) from the snapshot, building it once.
+
+    sources are the files/URLs build() reads; code are the functions or modules
+    whose source decides its output (build itself is always included).
+    """
+    key = snapshot_key(name, sources, (build, *code))
+    frames = load(key)
+    if frames is None:
+        built = build()
+        frames = {FRAME: built} if isinstance(built, pd.DataFrame) else built
+        save(key, frames)
+        prune(name, key)
+        return built
+    return frames[FRAME] if set(frames) == {FRAME} else frames
+
+
+def prune(name, keep):
+    """Delete name's snapshots other than keep (built from older data or code)."""
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return
+    pattern = re.compile(re.escape(name) + r"-[0-9a-f]{20}")
+    for entry in os.listdir(SNAPSHOT_DIR):
+        if entry != keep and pattern.fullmatch(entry):
+            # processes still mapping the old files keep them until they exit
+            shutil.rmtree(os.path.join(SNAPSHOT_DIR, entry), ignore_errors=True)
+
+
+def clear():
+    shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    import sys
+
+    import data_sources
+    import out_of_core
+    import schemas
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "DV2.csv"
+
+    def build():
+        frame = data_sources.add_dv2_periods(schemas.DV2.read_csv(source))
+        return {"frame": frame, **out_of_core.aggregate_frame(frame)}
+
+    key = snapshot_key("benchmark", [source], [build, data_sources, out_of_core])
+    start = time.perf_counter()
+    frames = build()
+    parse_ms = (time.perf_counter() - start) * 1000
+    save(key, frames)
+    start = time.perf_counter()
+    load(key)
+    load_ms = (time.perf_counter() - start) * 1000
+    shutil.rmtree(os.path.join(SNAPSHOT_DIR, key), ignore_errors=True)
+    print(f"parse + aggregate: {parse_ms:.1f} ms, snapshot load: {load_ms:.1f} ms ({len(frames['frame']):,} rows)")
@@ -0,0 +1,88 @@
+# Startup benchmark for the dashboard scripts.
+#
+# A dashboard's cold start is dominated by what its module-level imports pull
+# in before the first element is sent to the browser. For each script this
+# reads those eager imports (module level only; imports inside functions or
+# later sections are deferred by design), imports them in a fresh interpreter
+# under `python -X importtime` and reports the cumulative cost per module.
+#
+#   python startup_bench.py [script.py ...]
+
+import ast
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+SCRIPTS = ["CarDemo.py", "FPLPOC.py", "PSPMED1100.py", "streamlit_app.py", "V1.py", "JV1.py"]
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Plain import statements: -X importtime does not time importlib.import_module()
+_IMPORT = """
+try:
+    import {name}
+except ImportError as exc:
+    sys.stderr.write("missing: {name}: %s\\n" % exc)
+"""
+
+
+def eager_imports(path):
+    """Modules a script imports at module level, in order (try/if bodies included)."""
+    with open(path, encoding="utf-8") as fh:
+        tree = ast.parse(fh.read(), filename=path)
+    modules = []
+    nodes = list(tree.body)
+    while nodes:
+        node = nodes.pop(0)
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+        elif isinstance(node, (ast.Try, ast.If, ast.With)):
+            nodes[:0] = node.body
+    return list(dict.fromkeys(modules))
+
+
+def import_profile(modules):
+    """Cumulative -X importtime cost (ms) of each module, imported in order in a fresh process.
+
+    A module already pulled in by an earlier one costs ~0 here, which is what
+    the script pays too. Modules that are not installed are reported as NaN.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import sys\n" + "".join(_IMPORT.format(name=m) for m in modules)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    cumulative = {}
+    missing = set()
+    for line in proc.stderr.splitlines():
+        if line.startswith("missing: "):
+            missing.add(line.split(": ")[1])
+            continue
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        # top-level entries are the ones the importer asked for directly
+        if not name.startswith("  ") and cumulative_us.strip().isdigit():
+            cumulative[name.strip()] = int(cumulative_us) / 1000
+    return {m: (float("nan") if m in missing else cumulative.get(m, 0.0)) for m in modules}
+
+
+def startup_report(scripts=SCRIPTS):
+    rows = []
+    for script in scripts:
+        modules = eager_imports(os.path.join(ROOT, script))
+        for module, ms in import_profile(modules).items():
+            rows.append({"script": script, "module": module, "import_ms": ms})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    report = startup_report(sys.argv[1:] or SCRIPTS)
+    totals = report.groupby("script", sort=False)["import_ms"].sum().round(1)
+    print("Eager import cost per script (ms):")
+    print(totals.to_string())
+    print()
+    print("Most expensive eager imports:")
+    print(report.sort_values("import_ms", ascending=False).head(15).to_string(index=False))
@@ -1,9 +1,16 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 
+import dashboard_cache
+import data_sources
+import figures
+import forecasting
+import memory_profile
+import out_of_core
+
 # Page configuration
 st.set_page_config(page_title="DBT Dashboard", layout="wide")
+memory_profile.begin_rerun()
 
 # Title and description
 st.title("📊 DBT Data Dashboard")
@@ -13,14 +20,8 @@ st.markdown("Visualize revenue, loss, and customer insights from the DBT dataset
 theme = st.radio("Select Theme:", ["Dark", "Light"], horizontal=True, index=0)
 plotly_template = "plotly_dark" if theme == "Dark" else "plotly_white"
 
-# Load CSV with caching
-@st.cache_data
-def load_data():
-    url = "https://raw.githubusercontent.com/Dilip1100/Financial_Vizro1100/main/DBT.csv"
-    return pd.read_csv(url, encoding="latin1")
-
-df = load_data()
-df.columns = ["CUSTOMERNAME", "COUNTRY", "YEAR_ID", "QTR_ID", "TOTALLOSS", "TOTALREVENUE", "PROFIT"]
+# Load CSV (cached once per process, shared with the other pages)
+df = dashboard_cache.load_dbt()
 
 # =============================
 # 🔧 Global Filters
@@ -31,14 +32,14 @@ col_f1, col_f2, col_f3, col_f4 = st.columns(4)
 with col_f1:
     selected_years = st.multiselect(
         "Select Year(s):",
-        options=sorted(df["YEAR_ID"].unique()),
+        options=sorted(df["YEAR_ID"].dropna().unique()),
         default=[df["YEAR_ID"].max()]
     )
 with col_f2:
     selected_metric = st.radio("Metric to Display:", options=["TOTALREVENUE", "TOTALLOSS"])
 
 with col_f3:
-    selected_q_year = st.selectbox("Select Quarter Year:", sorted(df["YEAR_ID"].unique(), reverse=True))
+    selected_q_year = st.selectbox("Select Quarter Year:", sorted(df["YEAR_ID"].dropna().unique(), reverse=True))
 
 with col_f4:
     selected_q_qtr = st.selectbox("Select Quarter:", [1, 2, 3, 4], key="quarter_selector")
@@ -66,14 +67,16 @@ filtered_df = df[
     df["COUNTRY"].isin(selected_countries) &
     df["CUSTOMERNAME"].isin(selected_customers)
 ]
+results = dashboard_cache.dbt_aggregate({
+    "YEAR_ID": selected_years,
+    "COUNTRY": selected_countries,
+    "CUSTOMERNAME": selected_customers,
+})
 
 # =============================
 # 📊 Top 10 Customers
 # =============================
-top_customers = (
-    filtered_df.groupby("CUSTOMERNAME")[selected_metric]
-    .sum().nlargest(10).reset_index()
-)
+top_customers = out_of_core.top_n(results, "customer", selected_metric)
 fig_bar = px.bar(
     top_customers,
     x=selected_metric,
@@ -87,10 +90,7 @@ fig_bar = px.bar(
 # =============================
 # 🌍 Top 10 Countries
 # =============================
-top_countries = (
-    filtered_df.groupby("COUNTRY")[selected_metric]
-    .sum().nlargest(10).reset_index()
-)
+top_countries = out_of_core.top_n(results, "country", selected_metric)
 fig_pie = px.pie(
     top_countries,
     names="COUNTRY",
@@ -103,10 +103,7 @@ fig_pie = px.pie(
 # =============================
 # 📈 Quarterly Trend Chart
 # =============================
-trend_df = (
-    filtered_df.groupby(["YEAR_ID", "QTR_ID"])[["TOTALREVENUE", "TOTALLOSS", "PROFIT"]]
-    .sum().reset_index()
-)
+trend_df = out_of_core.period_trend(results, "year_qtr", data_sources.DBT_METRICS)
 trend_df["Period"] = trend_df["YEAR_ID"].astype(str) + "-Q" + trend_df["QTR_ID"].astype(str)
 trend_df = trend_df.sort_values(["YEAR_ID", "QTR_ID"])
 
@@ -146,21 +143,51 @@ def calc_change(curr, prev):
     pct = (diff / prev * 100) if prev else 0
     return diff, pct
 
+# Distinct customers come from the per-country/quarter HyperLogLog sketches
+customer_sketch = dashboard_cache.dbt_sketches()["country"]
+curr_period = {"YEAR_ID": [selected_q_year], "QTR_ID": [selected_q_qtr]}
+curr_customers = customer_sketch.distinct(curr_period)
+prev_customers = customer_sketch.distinct({"YEAR_ID": [prev_year], "QTR_ID": [prev_qtr]})
+
 rev_diff, rev_pct = calc_change(curr_revenue, prev_revenue)
 loss_diff, loss_pct = calc_change(curr_loss, prev_loss)
 profit_diff, profit_pct = calc_change(curr_profit, prev_profit)
+customers_diff, customers_pct = calc_change(curr_customers, prev_customers)
 
 # =============================
 # 📊 Show Visuals
 # =============================
 col1, col2 = st.columns(2)
 with col1:
-    st.plotly_chart(fig_bar, use_container_width=True)
+    st.plotly_chart(figures.optimize(fig_bar), use_container_width=True)
 with col2:
-    st.plotly_chart(fig_pie, use_container_width=True)
+    st.plotly_chart(figures.optimize(fig_pie), use_container_width=True)
 
 st.markdown("---")
-st.plotly_chart(fig_trend, use_container_width=True)
+st.plotly_chart(figures.optimize(fig_trend), use_container_width=True)
+
+# =============================
+# 🔮 Revenue Forecast (cached Prophet fit, quick forecast while it runs)
+# =============================
+revenue_forecast = forecasting.get_forecast(
+    "dbt_revenue", forecasting.quarterly_history(trend_df, "TOTALREVENUE"), periods=4, freq="QS", fallback="fast"
+)
+if revenue_forecast is not None:
+    fig_forecast = px.line(
+        revenue_forecast,
+        x="ds",
+        y=["yhat", "yhat_lower", "yhat_upper"],
+        title="Revenue Forecast (next 4 quarters)",
+        labels={"ds": "Quarter", "value": "TOTALREVENUE"},
+        template=plotly_template
+    )
+    st.plotly_chart(figures.optimize(fig_forecast), use_container_width=True)
+    if revenue_forecast["status"].iat[0] == "pending":
+        st.caption("🔮 Showing a quick trend forecast while the Prophet model fits in the background.")
+    elif revenue_forecast["status"].iat[0] == "failed":
+        st.caption("🔮 Showing a quick trend forecast: the Prophet fit failed and will be retried later.")
+else:
+    st.caption("🔮 Not enough quarters in this selection to forecast revenue.")
 
 # =============================
 # 🧮 Quarter-over-Quarter Summary
@@ -169,13 +196,22 @@ st.markdown("## 📈 Quarter-over-Quarter Comparison")
 st.markdown(f"**Current Period:** Year {selected_q_year}, Q{selected_q_qtr}")
 st.markdown(f"**Previous Period:** Year {prev_year}, Q{prev_qtr}")
 
-col3, col4, col5 = st.columns(3)
+col3, col4, col5, col6 = st.columns(4)
 with col3:
     st.metric("Total Revenue", f"${curr_revenue:,.0f}", f"${rev_diff:,.0f} ({rev_pct:.1f}%)")
 with col4:
     st.metric("Total Loss", f"${curr_loss:,.0f}", f"${loss_diff:,.0f} ({loss_pct:.1f}%)")
 with col5:
     st.metric("Total Profit", f"${curr_profit:,.0f}", f"${profit_diff:,.0f} ({profit_pct:.1f}%)")
+with col6:
+    st.metric("Unique Customers", f"≈{curr_customers:,.0f}", f"{customers_diff:,.0f} ({customers_pct:.1f}%)")
+
+with st.expander("🌍 Unique Customers by Country (current period)"):
+    st.dataframe(
+        customer_sketch.distinct_by("COUNTRY", curr_period).round().astype(int).sort_values(ascending=False)
+        .rename("Unique Customers").reset_index(),
+        use_container_width=True
+    )
 
 # =============================
 # 📥 Export Data
@@ -188,3 +224,6 @@ st.download_button(
     mime="text/csv"
 )
     
+
+# Per-session memory panel (MEMORY_PROFILE=1, see memory_profile.py)
+memory_profile.render(globals())
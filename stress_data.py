@@ -0,0 +1,325 @@
+# Reproducible large DBT / DV2 / PMC datasets for benchmarks and load tests.
+#
+# The shipped CSVs (250 DBT rows, 5.5k DV2 rows, 737 PMC facilities) are too
+# small to show how the dashboards behave at production scale. This writes
+# files of the same shapes, with the columns the schemas expect, at any size
+# up to hundreds of millions of rows:
+#   - members are drawn from Zipf distributions (rank r has weight r^-skew), so
+#     a few customers, salespeople, countries and facility types account for
+#     most rows, as in real sales data; which label gets which rank is
+#     shuffled, so the heavy hitters are not simply the first names;
+#   - dimension cardinalities grow with the row count up to a cap (e.g. one
+#     DV2 customer per ~10 rows, at most 2M), so group-bys and filters get
+#     realistic numbers of groups;
+#   - dates are seasonal: month weights peak in December and dip mid-year.
+# Rows are generated and written CHUNK_ROWS at a time, so memory is bounded
+# by one chunk plus the dimension label tables, whatever the row count. Each
+# chunk has its own generator seeded from (seed, chunk number): a given seed,
+# row count and chunk size always produce the same file.
+#
+#   python stress_data.py dv2 --rows 100000000 --out dv2_100m.parquet
+#   python stress_data.py dbt --rows 1000000 --out dbt_1m.csv --skew 1.2
+#
+# Parquet output needs pyarrow; CSV needs only pandas.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 1_000_000
+SKEW = 1.1
+SEASONALITY = 0.35
+
+FIRST_NAMES = [
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+    "Daniel", "Nancy", "Matthew", "Lisa", "Anthony", "Betty", "Mark", "Sandra", "Steven", "Ashley",
+    "Priya", "Rahul", "Ananya", "Arjun", "Mei", "Wei", "Sofia", "Mateo", "Fatima", "Omar",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson",
+    "Patel", "Sharma", "Kumar", "Chen", "Wang", "Kim", "Nguyen", "Rossi", "Muller", "Silva",
+]
+COMPANY_WORDS = (
+    ["Mini", "Classic", "Royal", "Euro", "Atelier", "Corporate", "Toys", "Vintage", "Global", "Diecast",
+     "Handji", "Baane", "Dragon", "Land", "Muscle", "Gift", "Scale", "Online", "Auto", "Heritage"],
+    ["Gifts", "Collectables", "Souveniers", "Models", "Replicas", "Imports", "Traders", "Shopping", "Classics",
+     "Wheels", "Boutique", "Depot", "Distributors", "Warehouse", "Emporium"],
+    ["Ltd.", "Inc.", "Co.", "Corp.", "& Co", "GmbH", "S.A.", "AG", "Pty", "LLC"],
+)
+COUNTRIES = [
+    "USA", "Spain", "France", "Australia", "UK", "Italy", "Finland", "Norway", "Singapore", "Canada",
+    "Denmark", "Germany", "Sweden", "Austria", "Japan", "Switzerland", "Belgium", "Philippines", "Ireland",
+    "India", "Brazil", "Mexico", "Netherlands", "New Zealand", "South Africa", "Poland", "Portugal", "Israel",
+]
+# make -> (models, base price); makes are listed most popular first
+CARS = {
+    "Toyota": (["Corolla", "Camry", "RAV4", "Highlander", "Tacoma"], 28000),
+    "Honda": (["Civic", "Accord", "CR-V", "Pilot", "Fit"], 27000),
+    "Ford": (["F-150", "Escape", "Explorer", "Mustang", "Focus"], 33000),
+    "Chevrolet": (["Silverado", "Equinox", "Malibu", "Tahoe", "Spark"], 32000),
+    "Nissan": (["Altima", "Rogue", "Sentra", "Pathfinder", "Leaf"], 26000),
+    "Hyundai": (["Elantra", "Tucson", "Sonata", "Santa Fe", "Kona"], 25000),
+    "Kia": (["Sportage", "Sorento", "Forte", "Soul", "Telluride"], 26000),
+    "Volkswagen": (["Jetta", "Golf", "Tiguan", "Passat", "Atlas"], 29000),
+    "BMW": (["3 Series", "5 Series", "X3", "X5", "i4"], 52000),
+    "Tesla": (["Model 3", "Model Y", "Model S", "Model X"], 55000),
+}
+PMC_TYPES = [
+    "Nursing Home", "Hospital", "Lab", "Clinic", "Hospital (Maternity Home)", "Dispensary", "Diagnostic Centre",
+    "Multi-speciality Hospital", "Eye Hospital", "Dental Clinic", "Blood Bank", "Physiotherapy Centre",
+]
+PMC_ZONES = [
+    "Aundh - Baner", "Kasba - Vishrambagwada", "Dhole Patil Road", "Hadapsar - Mundhwa", "Kothrud - Bavdhan",
+    "Nagar Road - Vadgaonsheri", "Yerawada - Kalas - Dhanori", "Shivajinagar - Ghole Road", "Warje - Karvenagar",
+    "Sinhagad Road", "Bibvewadi", "Bhavani Peth", "Dhankawadi - Sahakarnagar", "Wanowrie - Ramtekdi",
+    "Kondhwa - Yewalewadi", "Aundh - Pashan", "Hingne - Dhayari", "Kharadi - Wagholi",
+]
+# (kind, default rows): the shape of each dataset
+DATASETS = {"dbt": 250, "dv2": 5539, "pmc": 737}
+
+
+# ----------------- Distributions -----------------
+def zipf_sampler(n, skew, rng):
+    """A function drawing k member codes in [0, n) with Zipf(skew) popularity over shuffled ranks."""
+    weights = np.arange(1, n + 1, dtype=float) ** -skew
+    cdf = np.cumsum(weights)
+    cdf /= cdf[-1]
+    members = rng.permutation(n)
+
+    def draw(k, chunk_rng):
+        ranks = np.minimum(np.searchsorted(cdf, chunk_rng.random(k), side="right"), n - 1)
+        return members[ranks]
+
+    return draw
+
+
+def month_weights(amplitude=SEASONALITY):
+    """Relative sales per calendar month, peaking in December."""
+    months = np.arange(1, 13)
+    return 1 + amplitude * np.cos(2 * np.pi * (months - 12) / 12)
+
+
+def seasonal_days(start_year, end_year, amplitude=SEASONALITY):
+    """(days, cdf): every date of the years and the cumulative seasonal probability of each."""
+    days = pd.date_range(f"{start_year}-01-01", f"{end_year}-12-31", freq="D")
+    weights = month_weights(amplitude)[days.month - 1]
+    cdf = np.cumsum(weights)
+    return days, cdf / cdf[-1]
+
+
+def scaled(rows, per_member, low, high):
+    """Cardinality for a dimension: one member per per_member rows, within [low, high]."""
+    return int(min(max(rows // per_member, low), high))
+
+
+# ----------------- Labels -----------------
+def people(n, rng):
+    """n distinct person names; numbered once the first x last combinations run out."""
+    pairs = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+    order = rng.permutation(len(pairs))
+    names = [pairs[i] for i in order[:n]]
+    for k in range(len(names), n):
+        names.append(f"{pairs[order[k % len(pairs)]]} {k // len(pairs) + 1}")
+    return np.array(names, dtype=object)
+
+
+def companies(n, rng):
+    """n distinct company names in the DBT style ('Mini Gifts Ltd.')."""
+    first, second, suffix = COMPANY_WORDS
+    combos = [f"{a} {b} {c}" for a in first for b in second for c in suffix]
+    order = rng.permutation(len(combos))
+    names = [combos[i] for i in order[:n]]
+    for k in range(len(names), n):
+        names.append(f"{combos[order[k % len(combos)]]} {k // len(combos) + 1}")
+    return np.array(names, dtype=object)
+
+
+# ----------------- Datasets -----------------
+class DV2Generator:
+    """DV2 car sales: one row per sale."""
+
+    def __init__(self, rows, seed=0, skew=SKEW, start_year=2018, end_year=2024):
+        rng = np.random.default_rng([seed, 0])
+        self.salespeople = people(scaled(rows, 1000, 20, 50_000), rng)
+        self.customers = people(scaled(rows, 10, 100, 2_000_000), rng)
+        self.draw_salesperson = zipf_sampler(len(self.salespeople), skew, rng)
+        self.draw_customer = zipf_sampler(len(self.customers), skew, rng)
+        self.makes = list(CARS)
+        make_weights = np.arange(1, len(self.makes) + 1, dtype=float) ** -0.6
+        self.make_cdf = np.cumsum(make_weights) / make_weights.sum()
+        self.models = [np.array(CARS[make][0], dtype=object) for make in self.makes]
+        self.base_price = np.array([CARS[make][1] for make in self.makes], dtype=float)
+        days, self.day_cdf = seasonal_days(start_year, end_year)
+        # the shipped file's day-first format (data_sources.DV2_DATE_FORMATS)
+        self.day_labels = np.array(days.strftime("%d-%m-%Y"), dtype=object)
+        self.day_years = days.year.to_numpy()
+
+    def chunk(self, rows, rng):
+        day = np.minimum(np.searchsorted(self.day_cdf, rng.random(rows), side="right"), len(self.day_cdf) - 1)
+        make = np.minimum(np.searchsorted(self.make_cdf, rng.random(rows), side="right"), len(self.makes) - 1)
+        model = np.empty(rows, dtype=object)
+        for code, models in enumerate(self.models):
+            chosen = make == code
+            model[chosen] = models[rng.integers(0, len(models), chosen.sum())]
+        # cars are sold up to 8 model years old; older cars sell for less
+        age = rng.integers(0, 9, rows)
+        car_year = self.day_years[day] - age
+        price = self.base_price[make] * (1 - 0.06 * age) * rng.lognormal(0, 0.2, rows)
+        price = np.maximum(price, 3000).round()
+        rate = rng.uniform(0.05, 0.15, rows)
+        return pd.DataFrame({
+            "Date": self.day_labels[day],
+            "Salesperson": self.salespeople[self.draw_salesperson(rows, rng)],
+            "Customer Name": self.customers[self.draw_customer(rows, rng)],
+            "Car Make": np.array(self.makes, dtype=object)[make],
+            "Car Model": model,
+            "Car Year": car_year,
+            "Sale Price": price.astype(np.int64),
+            "Commission Rate": rate,
+            "Commission Earned": (price * rate).round(2),
+        })
+
+
+class DBTGenerator:
+    """DBT customer revenue: one row per customer order total in a quarter."""
+
+    def __init__(self, rows, seed=0, skew=SKEW, start_year=2003, end_year=2005):
+        rng = np.random.default_rng([seed, 0])
+        self.customers = companies(scaled(rows, 3, 50, 1_000_000), rng)
+        self.draw_customer = zipf_sampler(len(self.customers), skew, rng)
+        # each customer is based in one country; a few countries hold most customers
+        draw_country = zipf_sampler(len(COUNTRIES), 1.0, rng)
+        self.customer_country = np.array(COUNTRIES, dtype=object)[draw_country(len(self.customers), rng)]
+        self.years = np.arange(start_year, end_year + 1)
+        quarter_weights = month_weights().reshape(4, 3).sum(axis=1)
+        self.quarter_cdf = np.cumsum(quarter_weights) / quarter_weights.sum()
+
+    def chunk(self, rows, rng):
+        customer = self.draw_customer(rows, rng)
+        revenue = rng.lognormal(np.log(28000), 0.7, rows).round(2)
+        # half the orders carry the standard 25% cost, the rest vary
+        loss_ratio = np.where(rng.random(rows) < 0.5, 0.25, rng.uniform(0.08, 0.9, rows))
+        loss = (revenue * loss_ratio).round(2)
+        quarter = np.minimum(np.searchsorted(self.quarter_cdf, rng.random(rows), side="right"), 3) + 1
+        return pd.DataFrame({
+            "CUSTOMERNAME": self.customers[customer],
+            "COUNTRY": self.customer_country[customer],
+            "YEAR_ID": self.years[rng.integers(0, len(self.years), rows)],
+            "QTR_ID": quarter,
+            "TOTALLOSS": loss,
+            "TOTALREVENUE": revenue,
+            "PROFIT": (revenue - loss).round(2),
+        })
+
+
+class PMCGenerator:
+    """PMC hospital infrastructure: one row per facility."""
+
+    def __init__(self, rows, seed=0, skew=SKEW):
+        rng = np.random.default_rng([seed, 0])
+        self.zones = np.array([f"{zone} WO" for zone in PMC_ZONES], dtype=object)
+        wards = scaled(rows, 10, 20, 5_000)
+        self.ward_names = np.array([f"Ward {i + 1}" for i in range(wards)], dtype=object)
+        self.ward_zone = rng.integers(0, len(self.zones), wards)
+        self.draw_ward = zipf_sampler(wards, 0.8, rng)
+        self.draw_type = zipf_sampler(len(PMC_TYPES), skew, rng)
+        self.types = np.array(PMC_TYPES, dtype=object)
+        self.offset = 0
+
+    def chunk(self, rows, rng):
+        ward = self.draw_ward(rows, rng)
+        kind = self.types[self.draw_type(rows, rng)]
+        ids = np.arange(self.offset, self.offset + rows)
+        self.offset += rows
+        beds = rng.poisson(20, rows)
+        ambulances = rng.poisson(0.6, rows)
+        yes_no = np.array(["Yes", "No"], dtype=object)
+        return pd.DataFrame({
+            "City Name": "Pune",
+            "Zone Name": self.zones[self.ward_zone[ward]],
+            "Ward Name": self.ward_names[ward],
+            "Zone No.": self.ward_zone[ward] % 5 + 1,
+            "Ward No.": ward + 1,
+            "Facility Name": [f"Facility {i + 1}, {w}" for i, w in zip(ids, self.ward_names[ward])],
+            "Type": kind,
+            "Class": np.where(rng.random(rows) < 0.8, "Private", "Public"),
+            "Pharmacy Available": yes_no[(rng.random(rows) < 0.4).astype(int)],
+            "Number of Beds in Emergency Wards": rng.poisson(2, rows),
+            "Number of Beds in facility type": beds,
+            "Number of Doctors / Physicians": rng.poisson(4, rows) + 1,
+            "Number of Nurses": rng.poisson(8, rows),
+            "Number of Midwives Professional": rng.poisson(2, rows),
+            "Average Monthly Patient Footfall": (beds * rng.lognormal(np.log(150), 0.5, rows)).round().astype(np.int64),
+            "Ambulance Service Available": yes_no[(ambulances == 0).astype(int)],
+            "Count of Ambulance": ambulances,
+        })
+
+
+GENERATORS = {"dbt": DBTGenerator, "dv2": DV2Generator, "pmc": PMCGenerator}
+
+
+# ----------------- Output -----------------
+def chunks(kind, rows, seed=0, skew=SKEW, chunk_rows=CHUNK_ROWS):
+    """Yield the dataset's frames, chunk_rows at a time."""
+    generator = GENERATORS[kind](rows, seed=seed, skew=skew)
+    for number, start in enumerate(range(0, rows, chunk_rows)):
+        yield generator.chunk(min(chunk_rows, rows - start), np.random.default_rng([seed, number + 1]))
+
+
+def write(kind, rows, out, seed=0, skew=SKEW, chunk_rows=CHUNK_ROWS, progress=None):
+    """Write the dataset to out (.parquet, else CSV) chunk by chunk; returns the rows written."""
+    writer = None
+    written = 0
+    try:
+        for frame in chunks(kind, rows, seed, skew, chunk_rows):
+            if str(out).endswith(".parquet"):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(out, table.schema)
+                writer.write_table(table)
+            else:
+                frame.to_csv(out, mode="w" if written == 0 else "a", header=written == 0, index=False)
+            written += len(frame)
+            if progress:
+                progress(written)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate large DBT / DV2 / PMC shaped datasets.")
+    parser.add_argument("kind", choices=sorted(GENERATORS))
+    parser.add_argument("--rows", type=int, help="rows to write (default: the shipped file's size)")
+    parser.add_argument("--out", help="output .csv or .parquet (default: <kind>_<rows>.csv)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skew", type=float, default=SKEW, help="Zipf exponent for customers/salespeople")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    rows = args.rows or DATASETS[args.kind]
+    out = args.out or f"{args.kind}_{rows}.csv"
+    start = time.perf_counter()
+
+    def progress(written):
+        elapsed = time.perf_counter() - start
+        sys.stderr.write(f"\r{written:,} / {rows:,} rows ({written / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    write(args.kind, rows, out, args.seed, args.skew, args.chunk_rows, progress)
+    sys.stderr.write("\n")
+    print(f"{out}: {rows:,} rows, {os.path.getsize(out) / 2**20:,.1f} MiB in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
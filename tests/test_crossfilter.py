@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+import crossfilter
+import schemas
+
+CHARTS = {"bar": "CUSTOMERNAME", "pie": "COUNTRY", "trend": "QTR_ID"}
+METRICS = ["TOTALREVENUE", "TOTALLOSS"]
+
+
+@pytest.fixture(scope="module")
+def dbt():
+    return schemas.DBT.read_csv("DBT.csv")
+
+
+def expected(frame, chart, selections):
+    """The chart's aggregate by plain pandas: filter on every other dimension, then group."""
+    dimension = CHARTS[chart]
+    mask = np.ones(len(frame), dtype=bool)
+    for column, members in selections.items():
+        if members is not None and column != dimension:
+            mask &= frame[column].isin(members).to_numpy()
+    grouped = frame[mask].groupby(dimension, observed=True)[METRICS].sum().reset_index()
+    return grouped.sort_values(dimension).reset_index(drop=True)
+
+
+def check(cross, frame, selections):
+    for chart, dimension in CHARTS.items():
+        got = cross.table(chart, selections).sort_values(dimension).reset_index(drop=True)
+        want = expected(frame, chart, selections)
+        assert got[dimension].astype(str).tolist() == want[dimension].astype(str).tolist()
+        np.testing.assert_allclose(got[METRICS].to_numpy(), want[METRICS].to_numpy(), rtol=1e-9, atol=1e-6)
+
+
+def test_empty_chart_then_incremental_toggle(dbt):
+    cross = crossfilter.CrossFilter(dbt, CHARTS, METRICS, dimensions=["YEAR_ID"])
+    in_2005 = set(dbt.loc[dbt["YEAR_ID"] == 2005, "CUSTOMERNAME"])
+    absent, present = [c for c in dbt["CUSTOMERNAME"].cat.categories if c not in in_2005][0], sorted(in_2005)[0]
+    selection = {"YEAR_ID": [2005], "QTR_ID": [1], "CUSTOMERNAME": [absent]}
+    # the pie is empty under this selection
+    assert cross.table("pie", selection).empty
+    selection = crossfilter.toggle(selection, "CUSTOMERNAME", [present])
+    check(cross, dbt, selection)
+    assert cross.stats["incremental"] >= 1
+
+
+def test_random_toggles_match_groupby(dbt):
+    rng = np.random.default_rng(0)
+    cross = crossfilter.CrossFilter(dbt, CHARTS, METRICS, dimensions=["YEAR_ID"])
+    members = {
+        "CUSTOMERNAME": list(dbt["CUSTOMERNAME"].cat.categories),
+        "COUNTRY": list(dbt["COUNTRY"].cat.categories),
+        "QTR_ID": [1, 2, 3, 4],
+        "YEAR_ID": sorted(dbt["YEAR_ID"].dropna().unique().tolist()),
+    }
+    selection = {}
+    for _ in range(600):
+        dimension = list(members)[rng.integers(len(members))]
+        if rng.random() < 0.05:
+            selection = crossfilter.replace(selection, dimension, None)
+        else:
+            pick = members[dimension][rng.integers(len(members[dimension]))]
+            selection = crossfilter.toggle(selection, dimension, [pick])
+        check(cross, dbt, {d: selection.get(d) for d in members})
+    assert cross.stats["incremental"] > 0
@@ -0,0 +1,42 @@
+import base64
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+import figures
+
+
+def decode(array):
+    """A plotly JSON array (number list or {"dtype", "bdata"}) as a NumPy array."""
+    if isinstance(array, dict):
+        return np.frombuffer(base64.b64decode(array["bdata"]), dtype=array["dtype"])
+    return np.asarray(array)
+
+
+def test_optimize_encodes_list_data_as_typed_arrays():
+    x, y, size = list(range(50)), [i * 1.5 for i in range(50)], [i % 7 for i in range(50)]
+    fig = go.Figure(go.Scatter(x=x, y=y, marker=dict(size=size)), frames=[go.Frame(data=[go.Scatter(y=y[::-1])])])
+    before = json.loads(pio.to_json(fig))
+    payload = pio.to_json(figures.optimize(fig))
+    assert "bdata" in payload
+    trace = json.loads(payload)["data"][0]
+    for key, values in [("x", x), ("y", y)]:
+        assert isinstance(trace[key], dict)
+        np.testing.assert_array_equal(decode(trace[key]), values)
+    np.testing.assert_array_equal(decode(trace["marker"]["size"]), size)
+    np.testing.assert_array_equal(decode(json.loads(payload)["frames"][0]["data"][0]["y"]), y[::-1])
+    assert isinstance(before["data"][0]["x"], list)
+
+
+def test_optimize_switches_large_scatters_to_webgl_and_trims_the_template():
+    points = figures.GL_POINT_THRESHOLD + 1
+    fig = go.Figure(
+        [go.Scatter(x=np.arange(points), y=np.arange(points)), go.Bar(x=["a", "b"], y=[1, 2])],
+        layout=dict(template="plotly_dark"),
+    )
+    optimized = figures.optimize(fig)
+    assert [t.type for t in optimized.data] == ["scattergl", "bar"]
+    assert set(optimized.layout.template.data.to_plotly_json()) <= {"scattergl", "bar"}
+    assert figures.payload_bytes(optimized) < figures.payload_bytes(fig)
@@ -0,0 +1,41 @@
+import importlib.util
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import forecasting
+
+HISTORY = pd.DataFrame({"ds": pd.date_range("2020-01-01", periods=12, freq="MS"), "y": range(12)})
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(forecasting, "CACHE_DIR", str(tmp_path))
+    yield tmp_path
+    forecasting.shutdown()
+
+
+def fast(name):
+    return forecasting.get_forecast(name, HISTORY, 3, "MS", fallback="fast")
+
+
+@pytest.mark.skipif(importlib.util.find_spec("prophet") is not None, reason="needs prophet to be missing")
+def test_failed_fit_is_reported_and_retried_after_the_ttl(cache_dir):
+    assert fast("series")["status"].iat[0] == "pending"
+    deadline = time.time() + 60
+    while fast("series")["status"].iat[0] == "pending" and time.time() < deadline:
+        time.sleep(0.2)
+    failed = fast("series")
+    assert (failed["engine"].iat[0], failed["status"].iat[0]) == ("fast", "failed")
+    key = forecasting.series_key("series", HISTORY, 3, "MS")
+    assert "ModuleNotFoundError" in open(forecasting._path(key, "error")).read()
+    # once the marker is older than RETRY_SECONDS the fit is scheduled again
+    os.utime(forecasting._path(key, "error"), (0, 0))
+    assert fast("series")["status"].iat[0] == "pending"
+
+
+def test_fast_engine_is_ready(cache_dir):
+    forecast = forecasting.get_forecast("series", HISTORY, 3, "MS", engine="fast")
+    assert (forecast["engine"].iat[0], forecast["status"].iat[0]) == ("fast", "ready")
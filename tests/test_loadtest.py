@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+import data_sources
+import dimensions
+import loadtest
+import row_index
+import schemas
+
+
+def component(kind, **props):
+    return {"type": kind, "namespace": "dash_core_components", "props": props}
+
+
+# /_dash-layout and /_dash-dependencies as JV1.py serves them (figures and styles left out)
+JV1_LAYOUT = {"type": "Div", "namespace": "dash_html_components", "props": {"children": [
+    component("Slider", id="qtr_selector", min=1, max=4, value=1, marks={str(q): str(q) for q in range(1, 5)}, step=None),
+    component("RadioItems", id="metric_toggle", value="TOTALREVENUE", options=[
+        {"label": "Revenue", "value": "TOTALREVENUE"}, {"label": "Total Loss", "value": "TOTALLOSS"},
+    ]),
+    component("Store", id="cross_filter", data={}),
+    {"type": "Div", "namespace": "dash_html_components", "props": {"children": [
+        component("Button", id="clear_selection", n_clicks=0),
+        component("Span", id="selection_summary"),
+    ]}},
+    component("Graph", id="bar_chart"),
+    component("Graph", id="pie_chart"),
+    component("Checklist", id="year_selector", value=[2003, 2004, 2005], options=[
+        {"label": str(y), "value": y} for y in (2005, 2004, 2003)
+    ]),
+    component("Graph", id="line_chart"),
+    component("DataTable", id="customer_table", page_current=0, page_size=15, sort_by=[], filter_query="",
+              page_action="custom", sort_action="custom", filter_action="custom"),
+]}}
+
+
+def dep(output, inputs, state=()):
+    return {
+        "output": output,
+        "inputs": [dict(zip(("id", "property"), i.split("."))) for i in inputs],
+        "state": [dict(zip(("id", "property"), s.split("."))) for s in state],
+        "clientside_function": None,
+    }
+
+
+SLICERS = ["qtr_selector.value", "metric_toggle.value", "year_selector.value"]
+JV1_DEPENDENCIES = [
+    dep("cross_filter.data", [
+        "bar_chart.clickData", "bar_chart.selectedData", "pie_chart.clickData", "line_chart.clickData",
+        "line_chart.selectedData", "clear_selection.n_clicks", "qtr_selector.value",
+    ], ["cross_filter.data"]),
+    dep("..bar_chart.figure...pie_chart.figure...line_chart.figure...selection_summary.children..",
+        SLICERS + ["cross_filter.data"]),
+    dep("..customer_table.data...customer_table.page_count...customer_table.page_current..", [
+        "customer_table.page_current", "customer_table.page_size", "customer_table.sort_by",
+        "customer_table.filter_query", *SLICERS, "cross_filter.data",
+    ]),
+]
+# positional parameters of update_selection, update_charts and update_table
+ARITY = {JV1_DEPENDENCIES[0]["output"]: 8, JV1_DEPENDENCIES[1]["output"]: 4, JV1_DEPENDENCIES[2]["output"]: 8}
+
+
+@pytest.fixture
+def scenario(monkeypatch):
+    responses = {"/_dash-layout": JV1_LAYOUT, "/_dash-dependencies": JV1_DEPENDENCIES}
+    monkeypatch.setattr(loadtest, "_get_json", lambda url, timeout: responses[url[len("http://jv1"):]])
+    return loadtest.DashScenario("http://jv1")
+
+
+def test_only_slicers_are_randomized(scenario):
+    assert scenario.slicers == ["qtr_selector", "metric_toggle", "year_selector"]
+
+
+def test_random_requests_send_every_input_and_state(scenario):
+    rng = random.Random(0)
+    selection = scenario.initial_selection()
+    fired = set()
+    for _ in range(200):
+        bodies = scenario.random_requests(rng, selection)
+        changed = bodies[0]["changedPropIds"][0]
+        # a slicer change fires every callback listening to it, as in the browser
+        assert [b["output"] for b in bodies] == [
+            c["output"] for c in JV1_DEPENDENCIES if changed in [f"{i['id']}.{i['property']}" for i in c["inputs"]]
+        ]
+        for body in bodies:
+            fired.add(body["output"])
+            assert changed in SLICERS
+            assert len(body["inputs"]) + len(body["state"]) == ARITY[body["output"]]
+            values = {f"{i['id']}.{i['property']}": i["value"] for i in body["inputs"] + body["state"]}
+            assert values.get("qtr_selector.value", 1) in (1, 2, 3, 4)
+            if "customer_table.page_size" in values:
+                assert (values["customer_table.page_current"], values["customer_table.page_size"]) == (0, 15)
+                assert values["customer_table.sort_by"] == [] and values["customer_table.filter_query"] == ""
+                assert values["year_selector.value"] and set(values["year_selector.value"]) <= {2003, 2004, 2005}
+            if body["state"]:
+                assert body["state"] == [{"id": "cross_filter", "property": "data", "value": {}}]
+    assert fired == set(ARITY)
+
+
+def test_table_request_values_answer_a_page(scenario):
+    frame = dimensions.encode(schemas.DBT.read_csv("DBT.csv"), data_sources.DBT_DIMENSIONS)
+    rows = row_index.for_dbt(frame)
+    rng = random.Random(1)
+    selection = scenario.initial_selection()
+    for _ in range(20):
+        for body in scenario.random_requests(rng, selection):
+            if not body["output"].startswith("..customer_table"):
+                continue
+            page_current, page_size, sort_by, filter_query, qtr, metric, years, _ = [i["value"] for i in body["inputs"]]
+            records, pages, page = rows.page(
+                {"YEAR_ID": years, "QTR_ID": [qtr]}, filter_query, sort_by, page_current, page_size,
+                default_sort=(metric, False),
+            )
+            assert len(records) <= page_size and page == 0
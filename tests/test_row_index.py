@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_sources
+import dimensions
+import row_index
+import schemas
+
+
+@pytest.fixture(scope="module")
+def dbt():
+    return dimensions.encode(schemas.DBT.read_csv("DBT.csv"), data_sources.DBT_DIMENSIONS)
+
+
+def test_parse_filter_query():
+    assert row_index.parse_filter_query('{COUNTRY} icontains usa && {PROFIT} > 1000.5 && {QTR_ID} = 2') == [
+        ("COUNTRY", "contains", "usa", False),
+        ("PROFIT", "gt", 1000.5, True),
+        ("QTR_ID", "eq", 2, True),
+    ]
+    assert row_index.parse_filter_query('{CUSTOMERNAME} s= "Mini Gifts"') == [("CUSTOMERNAME", "eq", "Mini Gifts", True)]
+    assert row_index.parse_filter_query("") == []
+
+
+def reference(frame, equals, query):
+    """Row positions by plain boolean masks."""
+    mask = np.ones(len(frame), dtype=bool)
+    for column, values in equals.items():
+        if values is not None:
+            mask &= frame[column].isin(values).to_numpy()
+    for column, op, value, case in row_index.parse_filter_query(query):
+        values = frame[column]
+        if op == "contains":
+            text = values.astype(str)
+            mask &= (text if case else text.str.lower()).str.contains(value if case else value.lower(), regex=False).to_numpy()
+        elif isinstance(value, str):
+            mask &= (values.astype(str) == value).to_numpy() if op == "eq" else (values.astype(str) != value).to_numpy()
+        else:
+            compare = {"eq": "__eq__", "ne": "__ne__", "lt": "__lt__", "le": "__le__", "gt": "__gt__", "ge": "__ge__"}[op]
+            mask &= getattr(pd.to_numeric(values), compare)(value).fillna(False).to_numpy(dtype=bool)
+    return np.flatnonzero(mask)
+
+
+QUERIES = [
+    ({}, ""),
+    ({"YEAR_ID": [2004]}, ""),
+    ({"YEAR_ID": [2003, 2005], "QTR_ID": [1, 4]}, "{PROFIT} > 20000"),
+    ({}, "{COUNTRY} contains USA"),
+    ({}, "{COUNTRY} icontains usa && {TOTALREVENUE} <= 30000"),
+    ({"COUNTRY": ["France", "Spain"]}, "{QTR_ID} != 2"),
+    ({}, "{CUSTOMERNAME} = Mini Gifts Distributors Ltd."),
+    ({}, "{TOTALLOSS} >= 5000 && {TOTALLOSS} < 9000"),
+    ({"YEAR_ID": [1999]}, ""),
+]
+
+
+@pytest.mark.parametrize("equals, query", QUERIES)
+def test_select_matches_masks(dbt, equals, query):
+    index = row_index.for_dbt(dbt)
+    selected = index.select(equals, row_index.parse_filter_query(query))
+    expected = reference(dbt, equals, query)
+    got = np.arange(len(dbt)) if selected is None else selected
+    np.testing.assert_array_equal(got, expected)
+
+
+@pytest.mark.parametrize("sort", [None, "PROFIT", "COUNTRY"])
+def test_page_matches_sorted_slice(dbt, sort):
+    index = row_index.for_dbt(dbt)
+    equals, query = {"YEAR_ID": [2003, 2004]}, "{TOTALREVENUE} > 10000"
+    rows = dbt.iloc[reference(dbt, equals, query)]
+    sort_by = [{"column_id": sort, "direction": "desc"}] if sort else []
+    if sort:
+        keys = rows[sort].astype(str) if sort == "COUNTRY" else rows[sort]
+        rows = rows.iloc[np.argsort(-keys.rank(method="dense").to_numpy(), kind="stable")]
+    size = 20
+    pages = -(-len(rows) // size)
+    for page in range(pages):
+        records, count, current = index.page(equals, query, sort_by, page=page, size=size)
+        assert (count, current) == (pages, page)
+        expected = rows.iloc[page * size:(page + 1) * size]
+        assert [r["CUSTOMERNAME"] for r in records] == expected["CUSTOMERNAME"].astype(str).tolist()
+        np.testing.assert_allclose([r["PROFIT"] for r in records], expected["PROFIT"].to_numpy())
+    # a page past the end is clamped to the last one
+    assert index.page(equals, query, sort_by, page=pages + 5, size=size)[2] == pages - 1
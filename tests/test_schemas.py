@@ -0,0 +1,64 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import schemas
+
+
+def dv2_text(edit=None):
+    lines = open("DV2.csv", encoding="latin1").read().splitlines()
+    if edit:
+        for row, column, value in edit:
+            cells = lines[row].split(",")
+            cells[column] = value
+            lines[row] = ",".join(cells)
+    return "\n".join(lines) + "\n"
+
+
+def test_matches_plain_read():
+    for schema, path in [(schemas.DBT, "DBT.csv"), (schemas.DV2, "DV2.csv"), (schemas.PMC, "PMC Hospital Infrastructure.csv")]:
+        frame = schema.read_csv(path)
+        raw = pd.read_csv(path, encoding="latin1", na_values=schema.na_values)
+        assert len(frame) == len(raw)
+        mapping = schema.match(raw.columns)
+        for header, column in mapping.items():
+            if schema._is_numeric(column):
+                expected = pd.to_numeric(raw[header], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+                np.testing.assert_array_equal(frame[column].to_numpy(dtype=float, na_value=np.nan), expected)
+            else:
+                assert frame[column].astype(object).where(frame[column].notna(), None).tolist() == \
+                    raw[header].astype(object).where(raw[header].notna(), None).tolist()
+
+
+def test_blank_and_stray_text_in_int_column():
+    # Car Year is column 5: one blank cell and one stray text cell
+    frame = schemas.DV2.read_csv(io.StringIO(dv2_text([(1, 5, ""), (2, 5, "unknown")])))
+    plain = pd.read_csv(io.StringIO(dv2_text()), encoding="latin1")
+    assert len(frame) == len(plain)
+    assert str(frame["Car Year"].dtype) == "Int64"
+    assert frame["Car Year"].isna().tolist()[:3] == [True, True, False]
+    assert frame["Car Year"].iloc[2:].tolist() == plain["Car Year"].iloc[2:].tolist()
+
+
+def test_reordered_headers():
+    plain = pd.read_csv("DBT.csv", encoding="latin1")
+    shuffled = plain[plain.columns[::-1]].to_csv(index=False)
+    frame = schemas.DBT.read_csv(io.StringIO(shuffled))
+    assert list(frame.columns) == [c for c in plain.columns[::-1] if c in schemas.DBT.columns]
+    for column in schemas.DBT.columns:
+        assert frame[column].astype(object).tolist() == plain[column].astype(object).tolist()
+
+
+def test_missing_column_fails_loudly():
+    plain = pd.read_csv("DBT.csv", encoding="latin1").drop(columns=["COUNTRY"])
+    with pytest.raises(schemas.SchemaError, match="COUNTRY"):
+        schemas.DBT.read_csv(io.StringIO(plain.to_csv(index=False)))
+
+
+def test_chunked_read_equals_full_read():
+    full = schemas.DV2.read_csv("DV2.csv")
+    chunks = pd.concat(list(schemas.DV2.read_csv("DV2.csv", chunksize=1000)), ignore_index=True)
+    for column in full.columns:
+        assert full[column].astype(object).tolist() == chunks[column].astype(object).tolist()
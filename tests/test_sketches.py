@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_sources
+import schemas
+import sketches
+import stress_data
+
+
+@pytest.fixture(scope="module")
+def dv2():
+    return data_sources.add_dv2_periods(schemas.DV2.read_csv("DV2.csv"))
+
+
+def selections(frame):
+    makes = sorted(frame["Car Make"].dropna().unique())
+    months = sorted(frame["Month"].dropna().unique())
+    return [
+        {},
+        {"Car Make": makes[:1]},
+        {"Car Make": makes[1:3], "Month": months[:4]},
+        {"Month": months[-2:]},
+    ]
+
+
+def filtered(frame, filters):
+    mask = np.ones(len(frame), dtype=bool)
+    for column, values in filters.items():
+        mask &= frame[column].isin(values).to_numpy()
+    return frame[mask]
+
+
+def test_top_buyer_is_exact_below_capacity(dv2):
+    indexes = sketches.build([dv2], sketches.DV2_SKETCHES)
+    for filters in selections(dv2):
+        top = sketches.heavy_hitters(indexes, filters, n=5)
+        counts = filtered(dv2, filters)["Customer Name"].value_counts()
+        assert (top["error"] == 0).all()
+        assert top["count"].tolist() == counts.iloc[:5].tolist()
+        for label, count in zip(top["Customer Name"], top["count"]):
+            assert counts[label] == count
+
+
+def test_trimmed_counts_stay_within_their_bound():
+    # Zipf-distributed customers, many more per cell than the summaries keep
+    chunks = [data_sources.add_dv2_periods(chunk) for chunk in stress_data.chunks("dv2", 60_000, chunk_rows=15_000)]
+    rows = pd.concat(chunks, ignore_index=True)
+    index_capacity = 16
+    index = sketches.SketchIndex(["Car Make", "Month"], "Customer Name", True, capacity=index_capacity)
+    for chunk in chunks:
+        index.update(chunk)
+    assert all(len(c) <= index_capacity for c in index.counters)
+    assert index.errors.any()
+    for filters in selections(rows):
+        selected = filtered(rows, filters)
+        top = index.top(filters, n=3)
+        counts = selected["Customer Name"].value_counts()
+        error = int(top["error"].iat[0])
+        assert error <= len(selected) / (index_capacity + 1)
+        for label, count in zip(top["Customer Name"], top["count"]):
+            assert count <= counts[label] <= count + error
+        # no value outside the answer can beat the reported leader by more than the bound
+        assert counts.iloc[0] <= top["count"].iat[0] + error
+
+
+def test_distinct_estimates_match_exact_counts(dv2):
+    indexes = sketches.build([dv2], sketches.DV2_SKETCHES)
+    for filters in selections(dv2):
+        exact = filtered(dv2, filters)["Customer Name"].nunique()
+        estimate = sketches.unique_values(indexes, filters)
+        # HLL with p=10: ~3% standard error
+        assert abs(estimate - exact) <= 0.1 * exact + 2
+
+
+def test_chunked_build_equals_one_pass(dv2):
+    whole = sketches.build([dv2], sketches.DV2_SKETCHES)
+    streamed = sketches.build([dv2.iloc[i:i + 500] for i in range(0, len(dv2), 500)], sketches.DV2_SKETCHES)
+    for filters in selections(dv2):
+        assert sketches.unique_values(whole, filters) == sketches.unique_values(streamed, filters)
+        pd.testing.assert_frame_equal(
+            sketches.heavy_hitters(whole, filters, 3).sort_values(["count", "Customer Name"]).reset_index(drop=True),
+            sketches.heavy_hitters(streamed, filters, 3).sort_values(["count", "Customer Name"]).reset_index(drop=True),
+        )
+
+
+@pytest.mark.parametrize("keys", [["Salesperson", "Month"], ["Car Make", "Quarter"]])
+def test_sparse_and_dense_cells_hold_the_exact_registers(dv2, keys):
+    # salesperson x month cells all stay sparse; most make x quarter cells turn dense
+    index = sketches.SketchIndex(keys, "Customer Name")
+    for start in range(0, len(dv2), 700):
+        index.update(dv2.iloc[start:start + 700])
+    # a plain dense array per cell, filled from every row at once
+    rows = dv2.dropna(subset=keys + ["Customer Name"])
+    cells = np.array([index._cells[key] for key in zip(*(rows[k] for k in keys))])
+    register, rank = sketches._hll_ranks(sketches.hash_values(rows["Customer Name"]), index.precision)
+    dense = np.zeros((len(index), 1 << index.precision), dtype=np.uint8)
+    np.maximum.at(dense, (cells, register), rank.astype(np.uint8))
+    assert len(index.hll) < len(index)
+    for cell in range(len(index)):
+        np.testing.assert_array_equal(index.registers(np.array([cell])), dense[cell])
+    selected = np.flatnonzero(index._selected({keys[1]: sorted(rows[keys[1]].unique())[:3]}))
+    np.testing.assert_array_equal(index.registers(selected), dense[selected].max(axis=0))
+    assert index.nbytes() <= dense.nbytes
+
+
+def test_the_covering_index_with_fewest_cells_answers(dv2, monkeypatch):
+    indexes = sketches.build([dv2], sketches.DV2_SKETCHES)
+    answered = []
+    for index in indexes.values():
+        monkeypatch.setattr(index, "distinct", lambda filters, index=index: answered.append(index) or 0.0)
+    months = sorted(dv2["Month"].dropna().unique())
+    for filters in [{}, {"Month": months[:2]}, {"Car Make": ["Ford"]}]:
+        sketches.unique_values(indexes, filters)
+        assert answered.pop() is indexes["make"]
+    sketches.unique_values(indexes, {"Salesperson": ["Eric Johnson"], "Month": months})
+    assert answered.pop() is indexes["salesperson"]
@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_sources
+import dimensions
+import schemas
+import snapshot
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path))
+    return tmp_path
+
+
+def mixed_frame():
+    return pd.DataFrame({
+        "int": np.arange(6, dtype=np.int64),
+        "float": [1.5, np.nan, 3.0, 4.25, np.nan, 6.0],
+        "flag": [True, False, True, True, False, False],
+        "when": pd.to_datetime(["2024-01-01", None, "2024-03-05", "2024-04-01", "2024-05-09", "2024-06-30"]),
+        "cat": pd.Categorical(["b", "a", None, "b", "c", "a"], categories=["c", "b", "a"]),
+        "text": pd.Series(["x", None, "y", "x", "z", None], dtype="str"),
+        "obj": pd.Series(["p", "q", None, "p", "q", "r"], dtype=object),
+        "nullable_int": pd.array([2003, None, 2004, 2005, None, 2003], dtype="Int64"),
+        "nullable_float": pd.array([0.5, None, 1.5, 2.5, 3.5, None], dtype="Float64"),
+        "nullable_bool": pd.array([True, None, False, True, None, False], dtype="boolean"),
+    })
+
+
+def test_round_trip_every_column_kind():
+    frame = mixed_frame()
+    snapshot.save("mixed-0", {"frame": frame})
+    loaded = snapshot.load("mixed-0")["frame"]
+    pd.testing.assert_frame_equal(loaded, frame)
+
+
+def test_round_trip_keeps_a_non_range_index():
+    frame = mixed_frame().set_index(["cat", "int"]).iloc[::-1]
+    snapshot.save("indexed-0", {"grouped": frame, "series_like": frame[["float"]]})
+    loaded = snapshot.load("indexed-0")
+    pd.testing.assert_frame_equal(loaded["grouped"], frame)
+    pd.testing.assert_frame_equal(loaded["series_like"], frame[["float"]])
+
+
+def test_numeric_columns_are_memory_mapped(snapshot_dir):
+    snapshot.save("mapped-0", {"frame": mixed_frame()})
+    loaded = snapshot.load("mapped-0")["frame"]
+    assert not loaded["int"].to_numpy().flags.owndata
+    assert not loaded["cat"].array.codes.flags.owndata
+    assert snapshot.load("missing-0") is None
+
+
+def test_dbt_and_encoded_dv2_match_a_fresh_read():
+    dbt = schemas.DBT.read_csv("DBT.csv")
+    dv2 = data_sources.add_dv2_periods(schemas.DV2.read_csv("DV2.csv"))
+    dimensions.encode(dv2, data_sources.DV2_DIMENSIONS)
+    snapshot.save("csv-0", {"dbt": dbt, "dv2": dv2})
+    loaded = snapshot.load("csv-0")
+    pd.testing.assert_frame_equal(loaded["dbt"], dbt)
+    pd.testing.assert_frame_equal(loaded["dv2"], dv2)
+    # aggregates over the mapped frame equal the ones over the parsed frame
+    pd.testing.assert_series_equal(
+        loaded["dv2"].groupby("Car Make", observed=True)["Sale Price"].sum(),
+        dv2.groupby("Car Make", observed=True)["Sale Price"].sum(),
+    )
+
+
+def test_cached_builds_once_and_prunes_older_versions(snapshot_dir, tmp_path_factory):
+    source = tmp_path_factory.mktemp("src") / "data.csv"
+    source.write_text("a\n1\n2\n")
+    calls = []
+
+    def build():
+        calls.append(1)
+        return pd.read_csv(source)
+
+    first = snapshot.cached("demo", build, sources=[str(source)])
+    again = snapshot.cached("demo", build, sources=[str(source)])
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(again, first)
+
+    source.write_text("a\n1\n2\n3\n")
+    os.utime(source, (1, 1))
+    changed = snapshot.cached("demo", build, sources=[str(source)])
+    assert len(calls) == 2
+    assert changed["a"].tolist() == [1, 2, 3]
+    assert [e for e in os.listdir(snapshot_dir) if e.startswith("demo-")] and len(os.listdir(snapshot_dir)) == 1
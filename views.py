@@ -0,0 +1,86 @@
+# Read-only filtered views over the shared dashboard frames.
+#
+# The dashboards used to filter with `df.copy()` followed by one boolean
+# selection per slicer, materializing a full frame at each step, and then
+# added helper columns to the result. FilteredView instead combines every
+# predicate into one mask, evaluates it once and keeps only the matching row
+# positions (nothing at all when no filter applies). Columns are taken from
+# the shared frame on first access and cached; charts that need a frame ask
+# for just their columns with view[[...]]. Views cannot be assigned to, so a
+# derived column has to be built as a separate Series instead of mutating
+# the shared data. download_button() exports a view only when the user asks
+# for the file, so the rows are not serialized on every rerun.
+
+import numpy as np
+
+import out_of_core
+import query_backend
+
+
+class FilteredView:
+    """Rows of frame matching filters ({column: values}) and an optional (term, columns) search."""
+
+    def __init__(self, frame, filters=None, search=None):
+        self.base = frame
+        mask = out_of_core.filter_mask(frame, filters or {})
+        if search and search[0]:
+            mask &= query_backend.search_mask(frame, *search)
+        # None selects every row without an index array
+        self.index = None if mask.all() else np.flatnonzero(mask)
+        self._columns = {}
+
+    @classmethod
+    def of_rows(cls, frame, index):
+        """View of frame's rows at the sorted positions index (None: all rows), selected elsewhere."""
+        view = cls(frame.iloc[:0])
+        view.base, view.index = frame, index
+        return view
+
+    def __len__(self):
+        return len(self.base) if self.index is None else len(self.index)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    @property
+    def columns(self):
+        return self.base.columns
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._columns:
+                column = self.base[key]
+                self._columns[key] = column if self.index is None else column.take(self.index)
+            return self._columns[key]
+        return self.to_frame(key)
+
+    def __setitem__(self, key, value):
+        raise TypeError("FilteredView is read-only; build derived columns as separate Series")
+
+    def nbytes(self):
+        """Memory the view adds on top of its base frame: the row index and the columns taken so far."""
+        if self.index is None:
+            return 0
+        return self.index.nbytes + sum(int(c.memory_usage(deep=True)) for c in self._columns.values())
+
+    def to_frame(self, columns=None):
+        """The selected rows (of columns, default all) as a DataFrame."""
+        frame = self.base if columns is None else self.base[list(columns)]
+        return frame if self.index is None else frame.take(self.index)
+
+
+def download_button(view, label, file_name, key, state):
+    """Streamlit CSV export of view, built on demand and kept until state (the filters) changes."""
+    import streamlit as st
+
+    token = repr(state)
+    if st.session_state.get(f"{key}-state") != token:
+        # built for other filters: drop it rather than offer stale rows
+        st.session_state.pop(key, None)
+    if key not in st.session_state and st.button(f"Prepare {label}", key=f"{key}-prepare"):
+        # kept as plain bytes so the memory panel counts it as an export buffer
+        st.session_state[key] = view.to_frame().to_csv(index=False).encode("utf-8")
+        st.session_state[f"{key}-state"] = token
+    if key in st.session_state:
+        st.download_button(label, st.session_state[key], file_name, "text/csv", key=f"{key}-download")
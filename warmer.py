@@ -0,0 +1,236 @@
+# Background warming of the most common dashboard filter states.
+#
+# A Warmer is a process-wide result cache plus a daemon thread. Request code
+# calls warmer.get(state), which serves a cached result or computes and
+# stores it. The thread precomputes the states users are most likely to ask
+# for next:
+#   - the states most often recorded in the query log (QUERY_LOG, one JSON
+#     line per request, so it survives restarts and deployments);
+#   - then the enumerated low-cardinality filter space (e.g. years x quarters
+#     x metric).
+# It only works while the server is idle, meaning no request in the last
+# IDLE_SECONDS. The data version is checked on every request and every
+# REFRESH_SECONDS in the background. When the data changes, on_refresh()
+# reloads it outside the cache lock (requests keep being served from the old
+# data meanwhile), then the cache is dropped and the thread is woken to warm
+# it again. Neither the first user after a deployment nor the first after a
+# data update pays the cold cost, and nobody is served results computed from
+# the old data once the new data is in. The query log is rotated at
+# QUERY_LOG_MAX_BYTES (one older generation is kept and read).
+#
+# Resources that must be looked up on the request thread (Streamlit cached
+# resources) are passed to get() after the state; compute(state, *resources)
+# and a callable states(*resources) receive them. The background thread
+# reuses the last ones a request passed, and waits for a request to bring
+# new ones after a data change.
+
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+QUERY_LOG = os.environ.get("QUERY_LOG")
+IDLE_SECONDS = 2.0
+REFRESH_SECONDS = 60.0
+CACHE_SIZE = 512
+LOG_TOP = 50
+QUERY_LOG_MAX_BYTES = int(os.environ.get("QUERY_LOG_MAX_MB", "8")) * 2**20
+
+_log_counts = {}
+
+
+def freeze(state):
+    """Hashable cache key for a state made of dicts, lists, tuples and scalars."""
+    if isinstance(state, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in state.items()))
+    if isinstance(state, (list, tuple)):
+        return tuple(freeze(v) for v in state)
+    return state.item() if hasattr(state, "item") else state
+
+
+def _jsonable(value):
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def _log_files(path):
+    return [f for f in (f"{path}.1", path) if os.path.exists(f)]
+
+
+def _stamp(files):
+    return tuple((f, os.stat(f).st_size, os.stat(f).st_mtime_ns) for f in files)
+
+
+def read_query_log(name, path=QUERY_LOG, top=LOG_TOP):
+    """The top most frequent logged states for name, most frequent first.
+
+    The log is parsed again only when it (or its rotated generation) changed.
+    """
+    if not path:
+        return []
+    files = _log_files(path)
+    stamp = _stamp(files)
+    cached = _log_counts.get((path, name))
+    if cached and cached[0] == stamp:
+        counts, states = cached[1]
+    else:
+        counts = Counter()
+        states = {}
+        for log in files:
+            with open(log, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("cache") == name:
+                        key = freeze(entry["state"])
+                        counts[key] += 1
+                        states[key] = entry["state"]
+        _log_counts[(path, name)] = (stamp, (counts, states))
+    return [states[key] for key, _ in counts.most_common(top)]
+
+
+def append_query_log(path, line, max_bytes=QUERY_LOG_MAX_BYTES):
+    """Append one line to the log, moving it to path.1 (replacing the older one) once it is full."""
+    if os.path.exists(path) and os.path.getsize(path) >= max_bytes:
+        os.replace(path, f"{path}.1")
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write(line + "\n")
+
+
+class Warmer(threading.Thread):
+    """Shared cache of compute(state) results, filled in the background while idle."""
+
+    def __init__(self, name, compute, states=(), version=None, on_refresh=None, log_path=QUERY_LOG, size=CACHE_SIZE,
+                 resources=()):
+        super().__init__(daemon=True, name=f"warmer-{name}")
+        self.cache_name = name
+        self.compute = compute
+        # a list, or a callable returning one (re-evaluated after each data change)
+        self.states = states
+        self.version = version or (lambda: None)
+        self.on_refresh = on_refresh
+        self.log_path = log_path
+        self.size = size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._last_request = 0.0
+        self._data_version = self.version()
+        # (data version they were resolved for, resources) for the background thread
+        self._resources = (self._data_version, tuple(resources))
+        self.warmed = 0
+
+    # ----------------- Request path -----------------
+    def get(self, state, *resources):
+        """compute(state, *resources), served from the cache when it is already there."""
+        self._last_request = time.monotonic()
+        self._log(state)
+        self.check_version()
+        key = freeze(state)
+        with self._lock:
+            if resources:
+                if self._resources[0] != self._data_version:
+                    # the background thread was waiting for resources of the new data
+                    self._wake.set()
+                self._resources = (self._data_version, resources)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            data_version = self._data_version
+        result = self.compute(state, *resources)
+        self._put(key, result, data_version)
+        return result
+
+    def _put(self, key, result, data_version):
+        with self._lock:
+            if data_version != self._data_version:
+                # computed from data that has since been replaced
+                return
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+
+    def _log(self, state):
+        if not self.log_path:
+            return
+        line = json.dumps({"cache": self.cache_name, "state": state}, default=_jsonable)
+        with self._log_lock:
+            append_query_log(self.log_path, line)
+
+    # ----------------- Background -----------------
+    def start(self):
+        super().start()
+        return self
+
+    def _wait_idle(self):
+        while time.monotonic() - self._last_request < IDLE_SECONDS:
+            time.sleep(IDLE_SECONDS / 4)
+
+    def warm_once(self):
+        """Precompute logged then enumerated states that are not cached yet."""
+        with self._lock:
+            resolved_for, resources = self._resources
+            if resources and resolved_for != self._data_version:
+                # resolved for the old data: wait for a request to pass the new ones
+                return
+        states = self.states(*resources) if callable(self.states) else list(self.states)
+        for state in read_query_log(self.cache_name, self.log_path) + states:
+            key = freeze(state)
+            with self._lock:
+                if key in self._cache:
+                    continue
+                data_version = self._data_version
+                if resources and self._resources[0] != data_version:
+                    return
+            self._wait_idle()
+            try:
+                self._put(key, self.compute(state, *resources), data_version)
+            except Exception:
+                # a state that fails here fails for the user too; leave it to the request path
+                continue
+            self.warmed += 1
+
+    def check_version(self):
+        """Drop the cache (after on_refresh) if the data version changed; True if it did."""
+        data_version = self.version()
+        with self._lock:
+            if data_version == self._data_version:
+                return False
+        # one reload at a time; other callers keep being served the current data meanwhile
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            with self._lock:
+                if data_version == self._data_version:
+                    return False
+            # the reload runs without the cache lock, so requests are not held behind it
+            if self.on_refresh:
+                self.on_refresh()
+            with self._lock:
+                self._data_version = data_version
+                # data refresh: everything cached was derived from the old data
+                self._cache.clear()
+        finally:
+            self._refresh_lock.release()
+        self._wake.set()
+        return True
+
+    def run(self):
+        while True:
+            self.warm_once()
+            # woken early by a data change seen on the request path
+            self._wake.wait(REFRESH_SECONDS)
+            self._wake.clear()
+            self.check_version()
+
+
+def filter_space(years, quarters, metrics):
+    """(quarter, metric, years) states: every year on its own and all years together, latest first."""
+    years = sorted(years, reverse=True)
+    selections = [years] + [[year] for year in years]
+    return [(quarter, metric, selection) for selection in selections for quarter in quarters for metric in metrics]